@@ -0,0 +1 @@
+# Benchmarks for expense_tracker hot paths (not shipped with the app)
@@ -0,0 +1,70 @@
+"""Peak-memory benchmark: streaming reports versus loading the whole ledger.
+
+Each measurement runs in a fresh interpreter so the peak RSS belongs to
+that scan alone. Streaming has to stay flat as the ledger grows: the run
+fails if its peak at any size is more than FLAT_TOLERANCE above the peak
+at the smallest size.
+
+Run from the repository root:  python -m benchmarks.bench_memory [rows ...]
+"""
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.generator import generate_ledger
+
+FLAT_TOLERANCE = 0.10
+
+
+def child(path: str, mode: str) -> int:
+    from expense_tracker.reporting import ReportGenerator
+    from expense_tracker.storage import StorageManager
+
+    store = StorageManager(Path(path))
+    reports = ReportGenerator()
+    with contextlib.redirect_stdout(io.StringIO()):
+        source = store.iter_transactions() if mode == "stream" else store.load()
+        reports.aggregate_by_month(source)
+    # ru_maxrss is reported in KiB on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return 0
+
+
+def measure(path: Path, mode: str) -> int:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_memory", "--child", str(path), mode],
+        check=True, capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    return int(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) > 1 and argv[1] == "--child":
+        return child(argv[2], argv[3])
+    sizes = sorted(int(a) for a in argv[1:]) or [25_000, 100_000, 400_000]
+    print(f"{'rows':>10} {'file MiB':>9} {'stream MiB':>11} {'load MiB':>9}")
+    peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = Path(tmp) / f"ledger_{rows}.csv"
+            generate_ledger(path, rows)
+            stream_kib = measure(path, "stream")
+            load_kib = measure(path, "load")
+            peaks.append(stream_kib)
+            print(f"{rows:>10} {path.stat().st_size / 2**20:>9.1f} {stream_kib / 1024:>11.1f} {load_kib / 1024:>9.1f}")
+    limit = peaks[0] * (1 + FLAT_TOLERANCE)
+    grown = [rows for rows, kib in zip(sizes, peaks) if kib > limit]
+    if grown:
+        print(f"FAIL: streaming peak grew past {limit / 1024:.1f} MiB at {', '.join(map(str, grown))} rows")
+        return 1
+    print(f"Streaming peak stayed within {FLAT_TOLERANCE:.0%} of the smallest ledger's.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
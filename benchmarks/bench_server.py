@@ -0,0 +1,140 @@
+"""Load test for the JSON API: requests per second and latency percentiles.
+
+Starts `python -m expense_tracker serve` on a generated ledger (or targets
+a running server with --url), then keeps --clients keep-alive connections
+busy for --seconds with a mix of listings, reports and adds. Prints one
+row per endpoint and one for all requests; any non-2xx answer counts as an
+error and makes the run fail.
+
+Run from the repository root:  python -m benchmarks.bench_server [--clients N]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmarks.generator import generate_ledger
+
+# (name, weight, method, target, body)
+MIX = [
+    ("list", 50, "GET", "/transactions?start=20250101&end=20250131&page_size=50", None),
+    ("report.monthly", 15, "GET", "/reports/monthly", None),
+    ("report.category", 15, "GET", "/reports/category?start=20250101&end=20250630", None),
+    ("add", 20, "POST", "/transactions", {"date": "20250815", "amount": "4.20", "category": "Food", "description": "load test"}),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _request(reader, writer, host: str, method: str, target: str, body: bytes) -> int:
+    head = f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    writer.write((head + "\r\n").encode("latin-1") + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host: str, port: int, deadline: float, rnd: random.Random, samples: dict, errors: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    names = [m[0] for m in MIX]
+    weights = [m[1] for m in MIX]
+    routes = {m[0]: m[2:] for m in MIX}
+    try:
+        while time.perf_counter() < deadline:
+            name = rnd.choices(names, weights)[0]
+            method, target, body = routes[name]
+            payload = json.dumps(body).encode() if body else b""
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, host, method, target, payload)
+            samples[name].append(time.perf_counter() - t0)
+            if not 200 <= status < 300:
+                errors[name] = errors.get(name, 0) + 1
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+async def run_load(host: str, port: int, clients: int, seconds: float) -> tuple[dict, dict, float]:
+    samples = {m[0]: [] for m in MIX}
+    errors: dict[str, int] = {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, t0 + seconds, random.Random(i), samples, errors) for i in range(clients)))
+    return samples, errors, time.perf_counter() - t0
+
+
+def _report(samples: dict, errors: dict, elapsed: float):
+    print(f"{'endpoint':<16} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    everything = sorted(v for values in samples.values() for v in values)
+    rows = [(name, sorted(values)) for name, values in samples.items() if values] + [("all", everything)]
+    for name, values in rows:
+        if not values:
+            continue
+        failed = sum(errors.values()) if name == "all" else errors.get(name, 0)
+        print(f"{name:<16} {len(values):>8} {len(values) / elapsed:>8.0f} {_percentile(values, 0.50) * 1000:>8.2f} {_percentile(values, 0.99) * 1000:>8.2f} {failed:>6}")
+
+
+def _wait_for_port(host: str, port: int, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start listening on {host}:{port}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.bench_server", description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--rows", type=int, default=50_000, help="ledger size for the server this script starts")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        samples, errors, elapsed = asyncio.run(run_load(url.hostname, url.port or 80, args.clients, args.seconds))
+        _report(samples, errors, elapsed)
+        return 1 if errors else 0
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = generate_ledger(Path(tmp) / "ledger.csv", args.rows)
+        port = _free_port()
+        cmd = [sys.executable, "-m", "expense_tracker", "--data", str(ledger), "serve", "--port", str(port)]
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_for_port("127.0.0.1", port, proc)
+            print(f"{args.clients} clients for {args.seconds:g}s against a {args.rows}-row ledger")
+            samples, errors, elapsed = asyncio.run(run_load("127.0.0.1", port, args.clients, args.seconds))
+        finally:
+            proc.terminate()
+            proc.wait()
+    _report(samples, errors, elapsed)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
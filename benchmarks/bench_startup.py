@@ -0,0 +1,90 @@
+"""Startup regression check for the scripted CLI, using -X importtime.
+
+Each scenario runs in a fresh interpreter. Two times are reported, both on
+top of an interpreter that has already imported argparse, csv and pathlib
+(the floor for any CLI of this shape): the import time -X importtime
+attributes to the command, and the wall time until its first byte of output
+(or its exit, for commands that print nothing), best of a few runs. A
+scenario fails if either exceeds its budget or it imports a module it has
+no use for. --help must answer in single-digit milliseconds; the commands
+that open the ledger pay for datetime, decimal and the storage modules on
+top. --scale adjusts every budget.
+
+Run from the repository root:  python -m benchmarks.bench_startup [--scale N]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generator import generate_ledger
+
+# modules that only the interactive app, parallel scans or other backends need
+HEAVY = ["multiprocessing", "concurrent.futures", "expense_tracker.ui", "expense_tracker.importer"]
+
+# (name, CLI arguments, import budget in ms, first output budget in ms, modules that must stay unimported)
+SCENARIOS = [
+    ("help", ["--help"], 10, 10, HEAVY + ["expense_tracker.storage", "expense_tracker.reporting"]),
+    ("add", ["add", "--date", "20240101", "--amount", "1.50", "--category", "Bench"], 45, 60, HEAVY),
+    ("list", ["list", "--start", "20240101", "--end", "20240131"], 45, 60, HEAVY),
+    ("report", ["report", "monthly"], 45, 60, HEAVY),
+]
+RUNS = 10
+FLOOR = "import argparse, csv, pathlib, runpy"
+
+
+def import_times(args: list[str]) -> dict[str, int]:
+    # module -> self time in microseconds, as printed by -X importtime
+    out = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True, cwd=os.getcwd())
+    if out.returncode not in (0,):
+        raise RuntimeError(f"{' '.join(args)} failed: {out.stderr.strip().splitlines()[-1:]}")
+    times: dict[str, int] = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def first_output(args: list[str]) -> float:
+    # ms from spawning the interpreter to its first byte on stdout, best of RUNS
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=os.getcwd())
+        proc.stdout.read(1)
+        best = min(best, (time.perf_counter() - start) * 1000)
+        proc.stdout.read()
+        proc.wait()
+    return best
+
+
+def main(argv: list[str]) -> int:
+    scale = float(argv[argv.index("--scale") + 1]) if "--scale" in argv else 1.0
+    baseline = import_times(["-c", FLOOR])
+    floor = first_output(["-c", FLOOR + "; print()"])
+    failures = 0
+    print(f"{'scenario':<10} {'import ms':>10} {'budget ms':>10} {'output ms':>10} {'budget ms':>10}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Path(tmp) / "ledger.csv"
+        generate_ledger(ledger, 1000)
+        for name, args, budget, output_budget, forbidden in SCENARIOS:
+            cli = ["-m", "expense_tracker.cli", "--data", str(ledger), *args]
+            runs = [import_times(cli) for _ in range(RUNS)]
+            times = min(runs, key=lambda t: sum(us for mod, us in t.items() if mod not in baseline))
+            extra = sum(us for mod, us in times.items() if mod not in baseline) / 1000
+            output = first_output(cli) - floor
+            leaked = [m for m in forbidden if m in times]
+            limit, output_limit = budget * scale, output_budget * scale
+            ok = extra <= limit and output <= output_limit and not leaked
+            failures += not ok
+            note = "ok" if ok else ("imports " + ", ".join(leaked) if leaked else "over budget")
+            print(f"{name:<10} {extra:>10.1f} {limit:>10.0f} {output:>10.1f} {output_limit:>10.0f}  {note}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
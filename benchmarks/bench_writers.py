@@ -0,0 +1,97 @@
+"""Write-throughput benchmark: concurrent appends with and without group commit.
+
+Every mode starts from the same ledger and runs a fixed number of appends
+per writer; the table shows completed writes per second. Separate
+processes are serialized by the lock file, so each of their appends still
+rewrites the CSV; threads sharing a group-commit store fold whatever
+arrives within one window into a single rewrite. Every run checks
+that no write was lost.
+
+Run from the repository root:  python -m benchmarks.bench_writers [writers ...]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.generator import generate_ledger
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.storage import StorageManager
+
+
+def _appends(store: StorageManager, writer: int, count: int):
+    for i in range(count):
+        store.append(Transaction(f"bench-{writer}-{i}", date(2025, 8, 1), Decimal("1.00"), "Food", "bench"))
+
+
+def _process_writer(path: str, writer: int, count: int, journaled: bool):
+    with contextlib.redirect_stdout(io.StringIO()):
+        store = StorageManager(Path(path), journaled=journaled)
+        _appends(store, writer, count)
+        store.close()
+
+
+def run_processes(path: Path, writers: int, count: int, journaled: bool) -> float:
+    procs = [multiprocessing.Process(target=_process_writer, args=(str(path), w, count, journaled)) for w in range(writers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return time.perf_counter() - t0
+
+
+def run_threads(path: Path, writers: int, count: int, group_commit: bool) -> float:
+    store = StorageManager(path, group_commit=group_commit)
+    store.load()
+    threads = [threading.Thread(target=_appends, args=(store, w, count)) for w in range(writers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+MODES = {
+    "processes": lambda path, w, n: run_processes(path, w, n, journaled=False),
+    "processes+journal": lambda path, w, n: run_processes(path, w, n, journaled=True),
+    "threads": lambda path, w, n: run_threads(path, w, n, group_commit=False),
+    "threads+group": lambda path, w, n: run_threads(path, w, n, group_commit=True),
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.bench_writers", description=__doc__.splitlines()[0])
+    parser.add_argument("writers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--rows", type=int, default=20_000, help="ledger size before the appends")
+    parser.add_argument("--appends", type=int, default=20, help="appends per writer")
+    args = parser.parse_args(argv)
+
+    print(f"{'writers':>7} {'mode':<18} {'seconds':>8} {'writes/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = generate_ledger(Path(tmp) / "source.csv", args.rows)
+        for writers in args.writers:
+            for mode, run in MODES.items():
+                path = Path(tmp) / f"{mode}-{writers}.csv"
+                path.write_bytes(source.read_bytes())
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds = run(path, writers, args.appends)
+                    stored = StorageManager(path, journaled=True).count()
+                expected = args.rows + writers * args.appends
+                if stored != expected:
+                    print(f"LOST WRITES in {mode}: {stored} rows, expected {expected}")
+                    return 1
+                print(f"{writers:>7} {mode:<18} {seconds:>8.3f} {writers * args.appends / seconds:>9.0f}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Deterministic synthetic ledgers shaped like data/transactions.csv.
+
+Category weights, descriptions and amount ranges follow the sample ledger
+(about 100 transactions a month, two-decimal amounts between roughly 1.50
+and 60.00). Larger ledgers stretch over more years, up to MAX_YEARS, and
+then grow denser. The same seed and row count always give the same file.
+"""
+import csv
+import random
+import uuid
+from bisect import bisect
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+from expense_tracker.config import CSV_HEADER, ENCODING
+
+# category: (weight, min amount, max amount, descriptions), from data/transactions.csv
+PROFILE = {
+    "Books & Learning": (39, 3.00, 57.50, ["Course photocopying", "Library late fee", "Online course fee", "Textbook purchase"]),
+    "Laundry": (36, 2.50, 58.50, ["Dry cleaning", "Laundry tokens"]),
+    "Utilities": (34, 2.00, 59.50, ["Amazon Prime Student", "Mobile data top-up", "Netflix subscription", "Spotify subscription"]),
+    "Miscellaneous": (33, 2.00, 58.50, ["Birthday gift", "Charity donation", "Cinema popcorn"]),
+    "Entertainment": (32, 8.00, 59.00, ["Bar quiz entry", "Board game cafe", "Cinema ticket", "Student union event"]),
+    "Stationery": (29, 2.50, 59.50, ["Notebook pack", "Pens and highlighters", "Printer paper", "USB flash drive"]),
+    "Groceries": (27, 2.50, 59.50, ["Aldi weekly groceries", "Local market fruits & veg", "Sainsburys basics", "Tesco Metro shop"]),
+    "Personal Care": (25, 3.50, 59.00, ["Haircut at local salon", "Shampoo and soap", "Toiletries set"]),
+    "Transport": (23, 1.50, 59.50, ["Bus day rover", "Oyster top-up", "Santander bike hire", "Train to Reading", "Tube single journey"]),
+    "Food": (22, 2.00, 59.50, ["Campus canteen meal", "Costa coffee", "Greggs sausage roll", "Nando student deal", "Pret flat white"]),
+}
+
+ROWS_PER_DAY = 100 / 30
+MAX_YEARS = 30
+LAST_DAY = date(2025, 8, 31)
+
+
+def span_days(rows: int) -> int:
+    return int(min(max(rows / ROWS_PER_DAY, 90), MAX_YEARS * 365))
+
+
+def iter_rows(rows: int, seed: int = 1, invalid_every: int = 0):
+    """Yield CSV rows (lists of strings) without building the ledger in memory."""
+    rnd = random.Random(seed)
+    categories = list(PROFILE)
+    cumulative = list(accumulate(PROFILE[c][0] for c in categories))
+    total = cumulative[-1]
+    days = span_days(rows)
+    first = LAST_DAY - timedelta(days=days - 1)
+    day_strings = [(first + timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+    for i in range(rows):
+        category = categories[bisect(cumulative, rnd.random() * total)]
+        _, low, high, descriptions = PROFILE[category]
+        d = day_strings[rnd.randrange(days)]
+        if invalid_every and i % invalid_every == invalid_every - 1:
+            d = "2025-13-45"
+        cents = rnd.randrange(int(low * 100), int(high * 100) + 1)
+        yield [str(uuid.UUID(int=rnd.getrandbits(128), version=4)), d, f"{cents // 100}.{cents % 100:02d}", category, rnd.choice(descriptions)]
+
+
+def generate_ledger(path: Path, rows: int, seed: int = 1, invalid_every: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding=ENCODING, newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(iter_rows(rows, seed, invalid_every))
+    return path
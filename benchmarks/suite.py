@@ -0,0 +1,471 @@
+"""Benchmark suite for the storage and report hot paths, with JSON baselines.
+
+Every case runs against a synthetic ledger from benchmarks.generator and
+records the best wall time of several runs, the throughput and the peak
+Python heap (tracemalloc, measured in a separate run so it does not skew
+the timings). With --baseline the results are compared with a stored
+run and any case that got slower by more than --threshold fails.
+
+Run from the repository root:
+    python -m benchmarks.suite --rows 1000 100000 --baseline benchmarks/baselines/local.json
+    python -m benchmarks.suite --rows 1000 100000 --baseline benchmarks/baselines/local.json --update-baseline
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.generator import generate_ledger
+from expense_tracker.budgets import BudgetMonitor, Budgets
+from expense_tracker.config import ENCODING
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.reporting import ReportGenerator, Rollup, TransactionTable
+from expense_tracker.reporting.batch import ReportExport, export_reports
+from expense_tracker.reporting.engine import summary_specs
+from expense_tracker.storage import PartitionedStorageManager, SqliteStorageManager, StorageManager
+from expense_tracker.storage.parallel import ParallelScan
+
+DEFAULT_THRESHOLD = 0.20
+# differences below this are timer noise, whatever the ratio
+MIN_REGRESSION_S = 0.005
+POINT_OPS = 100
+
+CASES: dict[str, object] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+class Context:
+    """Shared fixtures for one ledger size; each case copies what it mutates."""
+
+    def __init__(self, ledger: Path, workdir: Path, rows: int):
+        self.ledger = ledger
+        self.workdir = workdir
+        self.rows = rows
+        self._txs: list[Transaction] | None = None
+        self._dict_rows: list[dict] | None = None
+        self._partitioned: Path | None = None
+
+    @property
+    def txs(self) -> list[Transaction]:
+        if self._txs is None:
+            self._txs = StorageManager(self.ledger, parallel_threshold=None).load()
+        return self._txs
+
+    @property
+    def dict_rows(self) -> list[dict]:
+        if self._dict_rows is None:
+            with self.ledger.open("r", encoding=ENCODING, newline="") as fh:
+                self._dict_rows = list(csv.DictReader(fh))
+        return self._dict_rows
+
+    def copy(self, name: str = "ledger.csv") -> Path:
+        target = self.workdir / name
+        for sidecar in target.parent.glob(target.name + ".*"):
+            sidecar.unlink()
+        shutil.copyfile(self.ledger, target)
+        return target
+
+    def partitioned(self) -> Path:
+        # migrated once per ledger size; cases that read it share the directory
+        if self._partitioned is None:
+            self._partitioned = self.workdir / "partitioned"
+            PartitionedStorageManager(self._partitioned, rollups=True).migrate_from_csv(self.ledger)
+        return self._partitioned
+
+    def last_month(self) -> tuple[date, date]:
+        # a range inside the newest month, so no rollup can answer it
+        last = max(tx.date for tx in self.txs)
+        return date(last.year, last.month, 2), date(last.year, last.month, 27)
+
+    def sample_ids(self, n: int = POINT_OPS) -> list[str]:
+        return random.Random(7).sample([tx.id for tx in self.txs], min(n, len(self.txs)))
+
+
+# each setup returns (callable to time, number of items it processes)
+
+@case("transaction.from_csv_row")
+def _(ctx: Context):
+    rows = ctx.dict_rows
+    return (lambda: [Transaction.from_csv_row(r) for r in rows]), len(rows)
+
+
+@case("storage.load.cold")
+def _(ctx: Context):
+    return (lambda: StorageManager(ctx.ledger, parallel_threshold=None).load()), ctx.rows
+
+
+@case("storage.load.parallel")
+def _(ctx: Context):
+    return (lambda: StorageManager(ctx.ledger, parallel_threshold=0).load()), ctx.rows
+
+
+@case("storage.load.warm")
+def _(ctx: Context):
+    store = StorageManager(ctx.ledger, parallel_threshold=None)
+    store.load()
+    return store.load, ctx.rows
+
+
+@case("storage.load.snapshot")
+def _(ctx: Context):
+    ledger = ctx.copy("snapshot.csv")
+    StorageManager(ledger, snapshot=True, parallel_threshold=None).load()
+    return (lambda: StorageManager(ledger, snapshot=True, parallel_threshold=None).load()), ctx.rows
+
+
+@case("storage.iter_transactions")
+def _(ctx: Context):
+    return (lambda: sum(1 for _ in StorageManager(ctx.ledger, stream_threshold=0).iter_transactions())), ctx.rows
+
+
+@case("storage.save")
+def _(ctx: Context):
+    store = StorageManager(ctx.workdir / "saved.csv")
+    txs = ctx.txs
+    return (lambda: store.save(txs)), len(txs)
+
+
+@case("storage.append.journaled")
+def _(ctx: Context):
+    store = StorageManager(ctx.copy(), journaled=True, compact_threshold=1 << 30, parallel_threshold=None)
+    store.load()
+    new = [Transaction(f"bench-{i}", date(2025, 8, 1), Decimal("1.00"), "Food", "bench") for i in range(POINT_OPS)]
+
+    def run():
+        for tx in new:
+            store.append(tx)
+    return run, POINT_OPS
+
+
+@case("storage.update.in_place")
+def _(ctx: Context):
+    store = StorageManager(ctx.copy(), parallel_threshold=None)
+    store.load()
+    edits = [Transaction(tx.id, tx.date, tx.amount, tx.category, tx.description) for tx in map(store.get, ctx.sample_ids())]
+    # the first record-level write scans the byte offsets; keep that out of the per-op timing
+    store.update(edits[0])
+
+    def run():
+        for tx in edits:
+            store.update(tx)
+    return run, len(edits)
+
+
+@case("storage.delete.in_place")
+def _(ctx: Context):
+    store = StorageManager(ctx.copy(), parallel_threshold=None)
+    store.load()
+    ids = ctx.sample_ids(POINT_OPS + 1)
+    store.delete(ids.pop())
+
+    def run():
+        for tx_id in ids:
+            store.delete(tx_id)
+    return run, len(ids)
+
+
+@case("storage.query.date_index")
+def _(ctx: Context):
+    store = StorageManager(ctx.ledger, date_index=True, parallel_threshold=None)
+    store.query()
+    days = sorted({tx.date for tx in ctx.txs})
+    rnd = random.Random(3)
+    ranges = [tuple(sorted(rnd.sample(days, 2))) if len(days) > 1 else (days[0], days[0]) for _ in range(POINT_OPS)]
+    return (lambda: [store.query(s, e) for s, e in ranges]), POINT_OPS
+
+
+# a word, a prefix, a two-word substring search and one without matches
+SEARCH_QUERIES = ["netflix", "pret*", "campus meal", "no such thing"]
+
+
+@case("search.scan")
+def _(ctx: Context):
+    store = StorageManager(ctx.ledger, parallel_threshold=None)
+    store.load()
+    return (lambda: [store.search(q) for q in SEARCH_QUERIES]), len(SEARCH_QUERIES)
+
+
+@case("search.index")
+def _(ctx: Context):
+    store = StorageManager(ctx.copy("search.csv"), search_index=True, parallel_threshold=None)
+    store.search("warm up")
+    return (lambda: [store.search(q) for q in SEARCH_QUERIES]), len(SEARCH_QUERIES)
+
+
+@case("search.index.open")
+def _(ctx: Context):
+    # a new process: parse the ledger, then open the persisted index
+    ledger = ctx.copy("search-open.csv")
+    StorageManager(ledger, search_index=True, parallel_threshold=None).search("build it")
+
+    def run():
+        store = StorageManager(ledger, search_index=True, parallel_threshold=None)
+        return store.search("netflix")
+    return run, ctx.rows
+
+
+@case("report.by_month.list")
+def _(ctx: Context):
+    reports, txs = ReportGenerator(), ctx.txs
+    return (lambda: reports.aggregate_by_month(txs)), len(txs)
+
+
+@case("report.by_category.list")
+def _(ctx: Context):
+    reports, txs = ReportGenerator(), ctx.txs
+    return (lambda: reports.aggregate_by_category(txs, date(2024, 1, 1), date(2024, 12, 31))), len(txs)
+
+
+@case("report.by_month.stream")
+def _(ctx: Context):
+    reports = ReportGenerator()
+    return (lambda: reports.aggregate_by_month(StorageManager(ctx.ledger, stream_threshold=0).iter_transactions())), ctx.rows
+
+
+@case("report.by_month.parallel")
+def _(ctx: Context):
+    reports = ReportGenerator()
+    return (lambda: reports.aggregate_by_month(ParallelScan(ctx.ledger))), ctx.rows
+
+
+@case("report.by_month.snapshot")
+def _(ctx: Context):
+    # a cold manager each run: open the mapping and scan it without parsing the CSV
+    reports, ledger = ReportGenerator(), ctx.copy("snapshot.csv")
+    StorageManager(ledger, snapshot=True, parallel_threshold=None).load()
+    return (lambda: reports.aggregate_by_month(StorageManager(ledger, snapshot=True).report_source())), ctx.rows
+
+
+@case("report.by_category.month.cold")
+def _(ctx: Context):
+    reports, (start, end) = ReportGenerator(), ctx.last_month()
+
+    def run():
+        store = StorageManager(ctx.ledger, rollups=True, date_index=True, parallel_threshold=None)
+        return reports.aggregate_by_category(store.report_source(start, end), start, end)
+    return run, ctx.rows
+
+
+@case("report.by_category.month.partitioned")
+def _(ctx: Context):
+    reports, (start, end), path = ReportGenerator(), ctx.last_month(), ctx.partitioned()
+
+    def run():
+        store = PartitionedStorageManager(path, rollups=True, date_index=True, parallel_threshold=None)
+        return reports.aggregate_by_category(store.report_source(start, end), start, end)
+    return run, ctx.rows
+
+
+@case("report.engine.summary")
+def _(ctx: Context):
+    # yearly, monthly, weekly, category and month x category out of one pass
+    reports, txs, specs = ReportGenerator(), ctx.txs, summary_specs()
+    return (lambda: reports.run(specs, txs)), len(txs)
+
+
+@case("report.engine.separate")
+def _(ctx: Context):
+    reports, txs, specs = ReportGenerator(), ctx.txs, summary_specs()
+    return (lambda: [reports.run([spec], txs) for spec in specs]), len(txs)
+
+
+@case("report.engine.convert")
+def _(ctx: Context):
+    # the summary views in USD with every third row in EUR and every third in GBP,
+    # converted per (day, category, currency) group with one rate per month
+    txs = [Transaction(tx.id, tx.date, tx.amount, tx.category, tx.description, (None, "EUR", "GBP")[i % 3]) for i, tx in enumerate(ctx.txs)]
+    rates = ctx.workdir / "rates.csv"
+    months = sorted({(tx.date.year, tx.date.month) for tx in txs})
+    with rates.open("w", encoding=ENCODING, newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["date", "from", "to", "rate"])
+        for n, (year, month) in enumerate(months):
+            writer.writerow([f"{year:04d}{month:02d}01", "EUR", "USD", f"1.{800 + n % 100:04d}"])
+            writer.writerow([f"{year:04d}{month:02d}01", "GBP", "USD", f"1.{2000 + n % 100:04d}"])
+    reports, specs = ReportGenerator(rates_path=rates), summary_specs()
+    return (lambda: reports.run(specs, txs)), len(txs)
+
+
+def _batch(ctx: Context):
+    exports = [ReportExport(spec, ctx.workdir / "exports" / f"{spec.name}.csv.gz", True) for spec in summary_specs()]
+    store = StorageManager(ctx.ledger, rollups=True, parallel_threshold=None)
+    return exports, store, ctx.workdir / "exports.state.json"
+
+
+@case("report.export.batch")
+def _(ctx: Context):
+    # every summary view computed together and written gzipped side by side
+    exports, store, _ = _batch(ctx)
+    return (lambda: export_reports(store, exports, force=True)), ctx.rows
+
+
+@case("report.export.batch.unchanged")
+def _(ctx: Context):
+    # a rerun over an untouched ledger only compares file signatures
+    exports, store, state = _batch(ctx)
+    export_reports(store, exports, state, force=True)
+    return (lambda: export_reports(store, exports, state)), ctx.rows
+
+
+@case("budget.check")
+def _(ctx: Context):
+    # the check every write runs: one running-total lookup per month x category it touches
+    store = StorageManager(ctx.ledger, rollups=True, parallel_threshold=None)
+    budgets = Budgets()
+    for category in {tx.category for tx in ctx.txs}:
+        budgets.set_limit(category, Decimal(100))
+    monitor = BudgetMonitor(store, budgets, notify=lambda alert: None)
+    store.rollup()
+    changes = [[(None, tx)] for tx in ctx.txs[:POINT_OPS]]
+    return (lambda: [monitor(c) for c in changes]), len(changes)
+
+
+@case("report.table.from_csv")
+def _(ctx: Context):
+    return (lambda: TransactionTable.from_csv(ctx.ledger)), ctx.rows
+
+
+@case("report.table.by_category")
+def _(ctx: Context):
+    reports, table = ReportGenerator(), TransactionTable.from_transactions(ctx.txs)
+    return (lambda: reports.aggregate_by_category(table, date(2024, 1, 1), date(2024, 12, 31))), len(table)
+
+
+@case("report.rollup.build")
+def _(ctx: Context):
+    txs = ctx.txs
+    return (lambda: Rollup.from_transactions(txs)), len(txs)
+
+
+@case("sqlite.save")
+def _(ctx: Context):
+    store = SqliteStorageManager(ctx.workdir / "bench.db")
+    txs = ctx.txs
+    return (lambda: store.save(txs)), len(txs)
+
+
+@case("sqlite.load")
+def _(ctx: Context):
+    store = SqliteStorageManager(ctx.workdir / "bench.db")
+    store.save(ctx.txs)
+    return store.load, len(ctx.txs)
+
+
+@case("sqlite.by_month")
+def _(ctx: Context):
+    store = SqliteStorageManager(ctx.workdir / "bench.db")
+    store.save(ctx.txs)
+    return store.aggregate_by_month, len(ctx.txs)
+
+
+def measure(setup, ctx: Context, repeat: int, memory: bool) -> dict:
+    best = float("inf")
+    items = 0
+    # warnings for invalid rows are part of the workload, not of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            fn, items = setup(ctx)
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        peak = None
+        if memory:
+            fn, _ = setup(ctx)
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    result = {"seconds": round(best, 6), "items": items, "items_per_s": round(items / best, 1) if best else None}
+    if peak is not None:
+        result["peak_mib"] = round(peak / (1 << 20), 3)
+    return result
+
+
+def run_suite(sizes: list[int], repeat: int, memory: bool, only: str | None, seed: int) -> dict:
+    results: dict[str, dict] = {}
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            ledger = generate_ledger(workdir / "source" / "ledger.csv", rows, seed)
+            ctx = Context(ledger, workdir, rows)
+            per_size = results[str(rows)] = {}
+            for name, setup in CASES.items():
+                if only and only not in name:
+                    continue
+                per_size[name] = measure(setup, ctx, repeat, memory)
+                r = per_size[name]
+                mem = f"{r['peak_mib']:>9.1f}" if "peak_mib" in r else f"{'-':>9}"
+                print(f"{rows:>9} {name:<28} {r['seconds']:>10.4f} {r['items_per_s'] or 0:>14,.0f} {mem}", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for rows, cases in results.items():
+        for name, r in cases.items():
+            old = baseline.get(rows, {}).get(name)
+            if not old:
+                continue
+            if r["seconds"] > old["seconds"] * (1 + threshold) and r["seconds"] - old["seconds"] > MIN_REGRESSION_S:
+                regressions.append(f"{name} @ {rows} rows: {old['seconds']:.4f}s -> {r['seconds']:.4f}s (+{r['seconds'] / old['seconds'] - 1:.0%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.suite", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="ledger sizes (1e3 to 1e7)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc run")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON baseline to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="merge these results into --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown as a fraction (default 0.20)")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>9} {'case':<28} {'seconds':>10} {'items/s':>14} {'peak MiB':>9}")
+    results = run_suite(args.rows, args.repeat, args.memory, args.only, args.seed)
+    document = {"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2), encoding=ENCODING)
+    if not args.baseline:
+        return 0
+    stored = json.loads(args.baseline.read_text(encoding=ENCODING)) if args.baseline.exists() else {"results": {}}
+    if args.update_baseline:
+        for rows, cases in results.items():
+            stored["results"].setdefault(rows, {}).update(cases)
+        stored.update({k: v for k, v in document.items() if k != "results"})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(stored, indent=2), encoding=ENCODING)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    regressions = compare(results, stored["results"], args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No case slower than baseline by more than {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
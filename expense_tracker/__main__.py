@@ -0,0 +1,9 @@
+import sys
+
+if len(sys.argv) > 1:
+    # scripted use goes straight to the CLI without importing the interactive app
+    from expense_tracker.cli import main
+else:
+    from expense_tracker.app import main
+
+sys.exit(main())
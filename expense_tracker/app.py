@@ -1,27 +1,45 @@
 from pathlib import Path
 import logging
+import sys
 
-from expense_tracker.config import DEFAULT_CSV
-from expense_tracker.storage import StorageManager
-from expense_tracker.reporting import ReportGenerator
-from expense_tracker.ui import CLIApp
+from expense_tracker.config import DEFAULT_CSV, DEFAULT_DB, DEFAULT_PARTITION_DIR, RATES_FILE, STORE_FEATURES
 
 LOG = logging.getLogger(__name__)
 
 
-def main():
+def main(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        # scripted use: run one subcommand without prompting
+        from expense_tracker.cli import main as cli_main
+
+        return cli_main(argv)
+    from expense_tracker.cli import open_store
+    from expense_tracker.reporting import ReportGenerator
+    from expense_tracker.ui import CLIApp
+
     logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     LOG.info("Starting Expense Tracker")
+    backend = input("Storage backend [csv] (csv/sqlite/partitioned): ").strip().lower() or "csv"
+    if backend not in ("csv", "sqlite", "partitioned"):
+        LOG.error("Unknown storage backend '%s'", backend)
+        return
+    default_path = {"sqlite": DEFAULT_DB, "partitioned": DEFAULT_PARTITION_DIR}.get(backend, DEFAULT_CSV)
     # Allow user to override default path at startup
-    csv_path_input = input(f"Data file [{DEFAULT_CSV}] (Press Enter to accept): ").strip()
-    csv_path = Path(csv_path_input) if csv_path_input else DEFAULT_CSV
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    path_input = input(f"Data file [{default_path}] (Press Enter to accept): ").strip()
+    data_path = Path(path_input) if path_input else default_path
 
-    store = StorageManager(csv_path)
-    reports = ReportGenerator()
+    # the menu's adds, edits and deletes always go through the journal
+    store, migrated = open_store(backend, data_path, features=(*STORE_FEATURES, "journal"))
+    if migrated:
+        LOG.info("Migrated %d transactions from %s", migrated, data_path.with_suffix(".csv"))
+    reports = ReportGenerator(rates_path=store.path.with_name(RATES_FILE.name))
     app = CLIApp(store, reports)
-    app.run()
+    try:
+        app.run()
+    finally:
+        store.close()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
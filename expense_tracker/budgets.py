@@ -0,0 +1,184 @@
+import json
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable
+
+from expense_tracker.config import BUDGET_ALERT_PERCENTS, BUDGETS_SUFFIX, DEFAULT_CURRENCY, ENCODING, RATES_FILE
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.reporting.report_service import ReportGenerator
+from expense_tracker.reporting.rollup import month_key
+from expense_tracker.utils import parse_amount
+
+BUDGETS_FORMAT = 1
+
+
+def budgets_path(store_path: Path) -> Path:
+    store_path = Path(store_path)
+    return store_path.with_name(store_path.name + BUDGETS_SUFFIX)
+
+
+def _month(month: str) -> str:
+    if len(month) != 6 or not month.isdigit() or not 1 <= int(month[4:]) <= 12:
+        raise ValidationError(f"invalid month '{month}': expected YYYYMM")
+    return month
+
+
+@dataclass
+class BudgetAlert:
+    month: str
+    category: str
+    limit: Decimal
+    total: Decimal
+    # the alert level crossed, as a percentage of the limit
+    percent: int
+
+    def __str__(self) -> str:
+        return f"Budget alert: {self.category} spending in {self.month} is {self.total}, past {self.percent}% of the {self.limit} limit"
+
+
+@dataclass
+class Budgets:
+    """Monthly spending limits per category, in DEFAULT_CURRENCY.
+
+    `limits` apply to every month; `months` override them for single
+    months (YYYYMM). An alert fires when a month's total for the category
+    first reaches each of `levels` percent of its limit.
+    """
+
+    limits: dict[str, Decimal] = field(default_factory=dict)
+    months: dict[str, dict[str, Decimal]] = field(default_factory=dict)
+    levels: tuple[int, ...] = BUDGET_ALERT_PERCENTS
+
+    def limit(self, month: str, category: str) -> Decimal | None:
+        override = self.months.get(month)
+        if override is not None and category in override:
+            return override[category]
+        return self.limits.get(category)
+
+    def categories(self, month: str) -> list[str]:
+        return sorted(set(self.limits).union(self.months.get(month, ())))
+
+    def set_limit(self, category: str, amount: Decimal, month: str | None = None):
+        if not amount.is_finite() or amount <= 0:
+            raise ValidationError("a budget limit must be greater than zero")
+        target = self.months.setdefault(_month(month), {}) if month else self.limits
+        target[category] = amount
+
+    def remove_limit(self, category: str, month: str | None = None) -> bool:
+        target = self.months.get(_month(month), {}) if month else self.limits
+        if target.pop(category, None) is None:
+            return False
+        if month and not target:
+            del self.months[month]
+        return True
+
+    def crossed(self, month: str, category: str, before: Decimal, after: Decimal) -> list[BudgetAlert]:
+        """Alerts for the levels a total moving from `before` to `after` went past."""
+        limit = self.limit(month, category)
+        if limit is None or not (before.is_finite() and after.is_finite()) or after <= before:
+            return []
+        return [BudgetAlert(month, category, limit, after, level) for level in self.levels if before < limit * level / 100 <= after]
+
+    @classmethod
+    def load(cls, path: Path) -> "Budgets":
+        # no file simply means no budgets yet
+        path = Path(path)
+        try:
+            with path.open("r", encoding=ENCODING) as fh:
+                document = json.load(fh)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as ex:
+            raise StorageError(f"could not read budgets {path}: {ex}")
+        try:
+            if document.get("format") != BUDGETS_FORMAT:
+                raise ValidationError(f"unsupported budgets format in {path}")
+            budgets = cls(levels=tuple(sorted(int(p) for p in document.get("levels", BUDGET_ALERT_PERCENTS))))
+            for category, amount in document.get("limits", {}).items():
+                budgets.set_limit(category, parse_amount(str(amount)))
+            for month, limits in document.get("months", {}).items():
+                for category, amount in limits.items():
+                    budgets.set_limit(category, parse_amount(str(amount)), month)
+        except (AttributeError, TypeError, ValueError) as ex:
+            raise ValidationError(f"invalid budgets in {path}: {ex}")
+        return budgets
+
+    def save(self, path: Path):
+        path = Path(path)
+        document = {
+            "format": BUDGETS_FORMAT,
+            "levels": list(self.levels),
+            "limits": {c: str(a) for c, a in sorted(self.limits.items())},
+            "months": {m: {c: str(a) for c, a in sorted(limits.items())} for m, limits in sorted(self.months.items())},
+        }
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding=ENCODING, delete=False, dir=str(path.parent)) as tmp:
+                json.dump(document, tmp, indent=1)
+                tmp_name = tmp.name
+            os.replace(tmp_name, str(path))
+        except Exception as ex:
+            raise StorageError(f"could not write budgets {path}: {ex}")
+
+
+def print_alert(alert: BudgetAlert):
+    print(alert, file=sys.stderr)
+
+
+class BudgetMonitor:
+    """Checks `budgets` on every write to `store` and hands crossed levels to `notify`.
+
+    Only the month x category totals a write touches are looked at, read
+    from the store's running totals (the rollup for CSV and partitioned
+    ledgers, which persists across restarts, an indexed query for
+    SQLite), so each check costs the same whatever the size of the ledger.
+    Amounts in other currencies are converted with the rates in
+    `rates_path`, by default rates.csv next to the ledger.
+    """
+
+    def __init__(self, store, budgets: Budgets, notify: Callable[[BudgetAlert], None] = print_alert, rates_path: Path | None = None):
+        self.store = store
+        self.budgets = budgets
+        self.notify = notify
+        self.reports = ReportGenerator(DEFAULT_CURRENCY, rates_path or Path(store.path).with_name(RATES_FILE.name))
+        if not store.rollups:
+            # every write reads its month's totals; without the sidecar each
+            # new process would rebuild them from the whole ledger
+            store.enable_rollups()
+        store.watch(self)
+
+    def _amount(self, tx: Transaction) -> Decimal:
+        return self.reports.rates().convert(tx.amount, tx.date, tx.currency, DEFAULT_CURRENCY) if tx.currency else tx.amount
+
+    def spent(self, month: str, category: str) -> Decimal:
+        totals = self.reports.converted(self.store.month_category_totals(month, category))
+        return totals.get(category, Decimal(0))
+
+    def __call__(self, changes: list[tuple[Transaction | None, Transaction | None]]):
+        deltas: dict[tuple[str, str], Decimal] = {}
+        for old, new in changes:
+            for tx, sign in ((old, -1), (new, 1)):
+                if tx is None:
+                    continue
+                key = (month_key(tx.date), tx.category)
+                if self.budgets.limit(*key) is not None:
+                    deltas[key] = deltas.get(key, Decimal(0)) + sign * self._amount(tx)
+        for (month, category), delta in deltas.items():
+            if not delta.is_finite() or delta <= 0:
+                continue
+            after = self.spent(month, category)
+            for alert in self.budgets.crossed(month, category, after - delta, after):
+                self.notify(alert)
+
+    def status(self, month: str) -> list[list]:
+        """[category, limit, spent, remaining, percent used] for every budgeted category in `month`."""
+        rows = []
+        for category in self.budgets.categories(_month(month)):
+            limit = self.budgets.limit(month, category)
+            spent = self.spent(month, category)
+            rows.append([category, limit, spent, limit - spent, f"{spent * 100 / limit:.0f}%"])
+        return rows
@@ -0,0 +1,409 @@
+# Non-interactive CLI for scripts and scheduled jobs. Only argparse and the
+# config are imported up front; each command imports what it needs, so
+# startup stays cheap for --help, argument errors and simple commands.
+import argparse
+import sys
+from pathlib import Path
+
+from expense_tracker.config import API_HOST, API_PORT, BUDGETS_SUFFIX, DEFAULT_CSV, DEFAULT_CURRENCY, DEFAULT_DB, DEFAULT_PARTITION_DIR, STORE_FEATURES
+
+FORMATS = ("csv", "jsonl")
+TX_FIELDS = ["id", "date", "amount", "category", "description", "currency"]
+REPORT_DIMENSIONS = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year", "category": "category"}
+REPORT_KINDS = (*REPORT_DIMENSIONS, "custom")
+# --features name -> storage manager option; all but date-index keep a sidecar file next to the ledger
+FEATURES = {"journal": "journaled", "date-index": "date_index", "search-index": "search_index", "rollups": "rollups", "snapshot": "snapshot"}
+
+
+def open_store(backend: str, data_path: Path | None = None, group_commit: bool = False, features=STORE_FEATURES):
+    """Open the store the interactive app uses; returns it with the number of rows migrated from CSV.
+
+    features names the optional sidecars of the CSV backends (see FEATURES);
+    SQLite has none and ignores them.
+    """
+    unknown = [name for name in features if name not in FEATURES]
+    if unknown:
+        from expense_tracker.exceptions import ValidationError
+
+        raise ValidationError(f"unknown feature(s) {', '.join(unknown)}; choose from {', '.join(FEATURES)}")
+    options = {FEATURES[name]: True for name in features}
+    data_path = Path(data_path) if data_path else {"sqlite": DEFAULT_DB, "partitioned": DEFAULT_PARTITION_DIR}.get(backend, DEFAULT_CSV)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    if backend == "partitioned":
+        from expense_tracker.storage import PartitionedStorageManager
+
+        # the directory sits next to the single-file ledger it is migrated from
+        if data_path.suffix == ".csv":
+            data_path = data_path.with_suffix("")
+        store = PartitionedStorageManager(data_path, group_commit=group_commit, **options)
+        return store, store.migrate_from_csv(data_path.with_suffix(".csv"))
+    if backend == "sqlite":
+        from expense_tracker.storage import SqliteStorageManager
+
+        store = SqliteStorageManager(data_path)
+        return store, store.migrate_from_csv(data_path.with_suffix(".csv"))
+    from expense_tracker.storage import StorageManager
+
+    return StorageManager(data_path, group_commit=group_commit, **options), 0
+
+
+class _Output:
+    """Writes records to stdout as CSV with a header row, or as JSON Lines."""
+
+    def __init__(self, fmt: str, fields: list[str], stream=None):
+        self.fields = fields
+        self.stream = stream or sys.stdout
+        if fmt == "jsonl":
+            import json
+
+            self._dumps = json.dumps
+            self._writer = None
+        else:
+            import csv
+
+            self._writer = csv.writer(self.stream, lineterminator="\n")
+            self._writer.writerow(fields)
+
+    def write(self, values: list):
+        if self._writer is not None:
+            self._writer.writerow(values)
+        else:
+            self.stream.write(self._dumps(dict(zip(self.fields, values))) + "\n")
+
+
+def _tx_values(tx) -> list[str]:
+    return [tx.id, tx.date.strftime("%Y%m%d"), f"{tx.amount}", tx.category, tx.description or "", tx.currency or DEFAULT_CURRENCY]
+
+
+def _date(s: str | None):
+    if not s:
+        return None
+    from expense_tracker.utils import parse_date_ymd
+
+    return parse_date_ymd(s)
+
+
+def _report_spec(args):
+    from expense_tracker.reporting.engine import ReportSpec
+    from expense_tracker.utils import parse_amount
+
+    group_by = args.group_by if args.kind == "custom" else REPORT_DIMENSIONS[args.kind]
+    spec = ReportSpec(
+        args.kind,
+        group_by,
+        args.measures or "sum",
+        _date(args.start),
+        _date(args.end),
+        categories=args.categories or None,
+        min_amount=parse_amount(args.min_amount) if args.min_amount else None,
+        max_amount=parse_amount(args.max_amount) if args.max_amount else None,
+        top=args.top,
+    )
+    if args.kind == "category" and spec.order_by is None:
+        # category totals have always been listed largest first
+        spec.order_by = spec.measures[0]
+    return spec
+
+
+def _generator(store, args):
+    from expense_tracker.config import RATES_FILE
+    from expense_tracker.reporting import ReportGenerator
+
+    return ReportGenerator(args.currency, args.rates or store.path.with_name(RATES_FILE.name))
+
+
+def _report(store, args):
+    spec = _report_spec(args)
+    return _generator(store, args).run_for_store(store, [spec])[spec.name]
+
+
+def cmd_add(store, args) -> int:
+    from expense_tracker.models.transaction import Transaction
+
+    tx = Transaction.from_input(args.date, args.amount, args.category, args.description, id=args.id, currency=args.currency)
+    store.append(tx)
+    _Output(args.format, TX_FIELDS).write(_tx_values(tx))
+    return 0
+
+
+def cmd_list(store, args) -> int:
+    out = _Output(args.format, TX_FIELDS)
+    if args.search:
+        txs = store.search(args.search, _date(args.start), _date(args.end), args.category)
+    else:
+        txs = store.iter_transactions(_date(args.start), _date(args.end), args.category)
+    for tx in txs:
+        out.write(_tx_values(tx))
+    return 0
+
+
+def cmd_edit(store, args) -> int:
+    from expense_tracker.exceptions import StorageError
+    from expense_tracker.models.transaction import Transaction
+
+    old = store.get(args.id)
+    if old is None:
+        raise StorageError(f"transaction {args.id} not found")
+    tx = Transaction.from_input(
+        args.date or old.date.strftime("%Y%m%d"),
+        args.amount or f"{old.amount}",
+        args.category or old.category,
+        old.description if args.description is None else args.description,
+        id=old.id,
+        currency=old.currency if args.currency is None else args.currency,
+    )
+    # fails instead of overwriting an edit another process made after our read
+    store.update(tx, expected=old)
+    _Output(args.format, TX_FIELDS).write(_tx_values(tx))
+    return 0
+
+
+def cmd_delete(store, args) -> int:
+    store.delete(args.id)
+    return 0
+
+
+def cmd_report(store, args) -> int:
+    result = _report(store, args)
+    out = _Output(args.format, result.headers)
+    for row in result.text_rows():
+        out.write(row)
+    return 0
+
+
+def cmd_export(store, args) -> int:
+    result = _report(store, args)
+    _generator(store, args).export_report_csv(Path(args.output), result.text_rows(), result.headers)
+    return 0
+
+
+def cmd_export_batch(store, args) -> int:
+    from expense_tracker.config import EXPORT_STATE_SUFFIX
+    from expense_tracker.reporting.batch import load_jobs
+
+    jobs = Path(args.jobs)
+    exports = load_jobs(jobs)
+    state = jobs.with_name(jobs.name + EXPORT_STATE_SUFFIX)
+    result = _generator(store, args).export_batch(store, exports, state, args.force)
+    out = _Output(args.format, ["written", "unchanged", "skipped", "failed"])
+    out.write([len(result.written), len(result.unchanged), len(result.skipped), len(result.errors)])
+    for err in result.errors:
+        print(err, file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def cmd_import(store, args) -> int:
+    from expense_tracker.importer import ColumnMapping, import_statement
+
+    mapping = ColumnMapping(
+        date=args.date_column,
+        amount=args.amount_column,
+        category=args.category_column or None,
+        description=args.description_column or None,
+        id=args.id_column,
+        currency=args.currency_column or None,
+        date_format=args.date_format,
+        default_currency=args.currency,
+        negate=args.negate,
+        delimiter=args.delimiter,
+    )
+    result = import_statement(store, Path(args.source), mapping)
+    out = _Output(args.format, ["accepted", "rejected", "duplicates"])
+    out.write([result.accepted, result.rejected, result.duplicates])
+    for err in result.errors:
+        print(err, file=sys.stderr)
+    return 0
+
+
+def cmd_compact(store, args) -> int:
+    if hasattr(store, "compact"):
+        store.compact()
+    return 0
+
+
+def cmd_budget(store, args) -> int:
+    from datetime import date
+
+    from expense_tracker.budgets import BudgetMonitor, Budgets, budgets_path
+    from expense_tracker.utils import parse_amount
+
+    path = budgets_path(store.path)
+    budgets = Budgets.load(path)
+    if args.action == "status":
+        today = date.today()
+        month = args.month or f"{today.year:04d}{today.month:02d}"
+        out = _Output(args.format, ["month", "category", "limit", "spent", "remaining", "used"])
+        for row in BudgetMonitor(store, budgets).status(month):
+            out.write([month] + [f"{v}" for v in row])
+        return 0
+    if args.action == "set":
+        budgets.set_limit(args.category, parse_amount(args.amount), args.month)
+    elif not budgets.remove_limit(args.category, args.month):
+        print(f"Error: no limit set for {args.category}", file=sys.stderr)
+        return 1
+    budgets.save(path)
+    return 0
+
+
+def _watch_budgets(store):
+    # only writes can cross a limit, and only a ledger with budgets pays for the import
+    path = store.path.with_name(store.path.name + BUDGETS_SUFFIX)
+    if not path.exists():
+        return
+    from expense_tracker.budgets import BudgetMonitor, Budgets
+
+    BudgetMonitor(store, Budgets.load(path))
+
+
+def cmd_serve(store, args) -> int:
+    from expense_tracker.server import serve
+
+    serve(store, args.host, args.port)
+    return 0
+
+
+def _conversion_options(p: argparse.ArgumentParser):
+    p.add_argument("--currency", help=f"report amounts in this currency, converting the others (default: {DEFAULT_CURRENCY})")
+    p.add_argument("--rates", type=Path, help="exchange rates CSV with date,from,to,rate columns (default: rates.csv next to the ledger)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="expense_tracker", description="Expense Tracker command line interface. Run without a command for the interactive menu.")
+    parser.add_argument("--backend", choices=("csv", "sqlite", "partitioned"), default="csv", help="storage backend (default: csv)")
+    parser.add_argument("--data", type=Path, help="data file (default: the bundled data directory)")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="output format (default: csv)")
+    parser.add_argument("--features", help=f"comma-separated sidecar files to keep next to a CSV ledger: {', '.join(FEATURES)} (default: {','.join(STORE_FEATURES) or 'none'})")
+    parser.add_argument("--profile", action="store_true", help="print hot-path timers and counters to stderr on exit")
+    parser.add_argument("--profile-out", metavar="PATH", help="also write cProfile stats to PATH (implies --profile)")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    p = sub.add_parser("add", help="add a transaction")
+    p.add_argument("--date", required=True, help="YYYYMMDD")
+    p.add_argument("--amount", required=True)
+    p.add_argument("--category", required=True)
+    p.add_argument("--description", default="")
+    p.add_argument("--id", help="explicit id (default: a new UUID)")
+    p.add_argument("--currency", help=f"three-letter code of the amount's currency (default: {DEFAULT_CURRENCY})")
+    p.set_defaults(func=cmd_add, budgets=True)
+
+    p = sub.add_parser("list", help="list transactions")
+    p.add_argument("--start", help="YYYYMMDD")
+    p.add_argument("--end", help="YYYYMMDD")
+    p.add_argument("--category")
+    p.add_argument("--search", help='words to find in descriptions and categories, e.g. "market" or "text*"')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("edit", help="change fields of a transaction")
+    p.add_argument("id")
+    p.add_argument("--date", help="YYYYMMDD")
+    p.add_argument("--amount")
+    p.add_argument("--category")
+    p.add_argument("--description")
+    p.add_argument("--currency")
+    p.set_defaults(func=cmd_edit, budgets=True)
+
+    p = sub.add_parser("delete", help="delete a transaction")
+    p.add_argument("id")
+    p.set_defaults(func=cmd_delete, budgets=True)
+
+    for name, func, help_text in (("report", cmd_report, "print an aggregated report"), ("export", cmd_export, "write an aggregated report to a CSV file")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("kind", choices=REPORT_KINDS)
+        p.add_argument("--start", help="YYYYMMDD")
+        p.add_argument("--end", help="YYYYMMDD")
+        p.add_argument("--group-by", default="month", help="custom reports: comma-separated day, week, month, year, category (default: month)")
+        p.add_argument("--measures", help="comma-separated sum, count, mean, min, max, median, p1..p100 (default: sum)")
+        p.add_argument("--categories", help="comma-separated categories to include")
+        p.add_argument("--min-amount")
+        p.add_argument("--max-amount")
+        p.add_argument("--top", type=int, help="keep the N rows largest by the first measure")
+        if name == "export":
+            p.add_argument("--output", "-o", required=True, help="destination CSV file")
+        _conversion_options(p)
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("export-batch", help="write every report of a JSON job file from one pass over the data")
+    p.add_argument("jobs", help='job file: {"reports": [{"name": ..., "output": ..., "group_by": ..., "gzip": ...}, ...]}')
+    p.add_argument("--force", action="store_true", help="rewrite every report, even those whose inputs have not changed")
+    _conversion_options(p)
+    p.set_defaults(func=cmd_export_batch)
+
+    p = sub.add_parser("import", help="import a bank or card statement CSV")
+    p.add_argument("source")
+    p.add_argument("--date-column", default="date")
+    p.add_argument("--date-format", default="%Y%m%d")
+    p.add_argument("--amount-column", default="amount")
+    p.add_argument("--category-column", default="category")
+    p.add_argument("--description-column", default="description")
+    p.add_argument("--id-column")
+    p.add_argument("--currency-column", default="currency")
+    p.add_argument("--currency", help=f"currency of rows without one (default: {DEFAULT_CURRENCY})")
+    p.add_argument("--negate", action="store_true", help="flip the sign of every amount")
+    p.add_argument("--delimiter", default=",")
+    p.set_defaults(func=cmd_import, budgets=True)
+
+    p = sub.add_parser("budget", help="show or change monthly spending limits per category")
+    actions = p.add_subparsers(dest="action", required=True, metavar="action")
+    a = actions.add_parser("status", help="spending against every limit for a month")
+    a.add_argument("--month", help="YYYYMM (default: the current month)")
+    a = actions.add_parser("set", help="set a category's limit")
+    a.add_argument("category")
+    a.add_argument("amount")
+    a.add_argument("--month", help="YYYYMM: only for this month (default: every month)")
+    a = actions.add_parser("remove", help="remove a category's limit")
+    a.add_argument("category")
+    a.add_argument("--month", help="YYYYMM: the override for this month (default: the every-month limit)")
+    p.set_defaults(func=cmd_budget)
+
+    p = sub.add_parser("compact", help="fold the journal into the CSV file")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("serve", help="serve the ledger as a JSON API over HTTP")
+    p.add_argument("--host", default=API_HOST)
+    p.add_argument("--port", type=int, default=API_PORT)
+    # requests from many clients write concurrently; let them share commits
+    p.set_defaults(func=cmd_serve, group_commit=True, budgets=True)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile or args.profile_out:
+        from expense_tracker import instrumentation
+
+        instrumentation.enable(args.profile_out)
+    from expense_tracker.exceptions import StorageError, ValidationError
+
+    features = [name for name in args.features.split(",") if name] if args.features is not None else STORE_FEATURES
+    try:
+        store, migrated = open_store(args.backend, args.data, getattr(args, "group_commit", False), features)
+    except (ValidationError, StorageError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if migrated:
+        print(f"Migrated {migrated} transactions from {store.path.with_suffix('.csv')}", file=sys.stderr)
+    try:
+        if getattr(args, "budgets", False):
+            # alerts go to stderr, so stdout stays machine-readable
+            _watch_budgets(store)
+        status = args.func(store, args)
+        # flushed here, so a closed pipe shows up below rather than at exit
+        sys.stdout.flush()
+        return status
+    except (ValidationError, StorageError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader went away (`... | head -1`); drop the rest of the output
+        import os
+
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+        return 141
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,5 +2,103 @@ from pathlib import Path
 
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 DEFAULT_CSV = DEFAULT_DATA_DIR / "transactions.csv"
+DEFAULT_DB = DEFAULT_DATA_DIR / "transactions.db"
+DEFAULT_PARTITION_DIR = DEFAULT_DATA_DIR / "transactions"
 ENCODING = "utf-8"
 CSV_HEADER = ["id", "date", "amount", "category", "description"]
+
+# Amounts are in DEFAULT_CURRENCY unless a row says otherwise in the optional
+# trailing currency column; ledgers that never use it keep CSV_HEADER as is
+DEFAULT_CURRENCY = "USD"
+CURRENCY_COLUMN = "currency"
+
+# Journaled storage: upsert/tombstone records appended next to the CSV
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_HEADER = ["op"] + CSV_HEADER + [CURRENCY_COLUMN]
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# In-place CSV edits: a record is only patched when it lies inside one page
+# of this size, and once the blank-line padding left by edits and deletes is
+# more than this share of the file, the next edit rewrites (compacts) it instead
+RECORD_PAGE_BYTES = 4096
+RECORD_PADDING_LIMIT = 0.25
+
+# Storage features the CLI and the app open a CSV ledger with (see FEATURES in
+# cli.py); --features narrows them for one run, and --features "" turns them off
+STORE_FEATURES = ("journal", "date-index", "search-index", "rollups", "snapshot")
+
+# Materialized report totals kept next to the CSV
+ROLLUP_SUFFIX = ".rollup.json"
+
+# Word and trigram index over descriptions and categories, kept next to the CSV
+SEARCH_SUFFIX = ".search.json"
+
+# Binary snapshot of the CSV, memory-mapped on open instead of re-parsing the text
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# Writers from every process take an advisory lock on this sidecar; a
+# writer that cannot get it within the timeout fails instead of waiting forever
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT_S = 30.0
+
+# Counter bumped after every in-place patch of the CSV; a reader that sees it
+# change reloads the whole file instead of only reading what was appended
+GENERATION_SUFFIX = ".generation"
+
+# Group commit: how long the first queued writer waits for others to join
+# its batch before the whole batch goes to disk in one rewrite
+GROUP_COMMIT_WINDOW_S = 0.005
+
+# JSON API server: listen address, page sizes for listings, the largest
+# request body accepted, and thread pools for store reads and writes (writes
+# block until their group commit lands, so that pool is the larger one)
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+API_DEFAULT_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+API_MAX_BODY_BYTES = 1 << 20
+API_READ_THREADS = 4
+API_WRITE_THREADS = 32
+
+# Partitioned storage: one CSV per month or year under a directory, listed
+# in a manifest; an existing directory keeps the granularity it was cut at
+PARTITION_GRANULARITY = "month"
+PARTITION_MANIFEST = "manifest.json"
+
+# Ledgers larger than this are streamed from disk for reports instead of cached
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+# Parallel chunked parsing: worker processes (None = one per CPU) and the
+# file size below which loading and aggregation stay serial
+PARALLEL_WORKERS = None
+PARALLEL_THRESHOLD_BYTES = 32 * 1024 * 1024
+
+# Rows validated per batch by the statement importer
+IMPORT_BATCH_SIZE = 10_000
+
+# Batch report export: files written at once, and the sidecar of a job file
+# that remembers what each report was last computed from
+EXPORT_WORKERS = 4
+EXPORT_STATE_SUFFIX = ".state.json"
+
+# Monthly spending limits per category, kept next to the ledger, and the
+# percentages of a limit at which an alert fires
+BUDGETS_SUFFIX = ".budgets.json"
+BUDGET_ALERT_PERCENTS = (80, 100)
+
+# Exchange rates for reports in another currency: a CSV of date,from,to,rate
+# rows next to the ledger, read on first use, and how many (date, currency)
+# lookups stay cached
+RATES_FILE = DEFAULT_DATA_DIR / "rates.csv"
+RATE_CACHE_SIZE = 1 << 16
+
+# Paged tables: rows per page, rows sampled to size the columns, and the
+# widest a column may grow before cells are truncated
+PAGE_SIZE = 20
+TABLE_WIDTH_SAMPLE = 200
+MAX_COLUMN_WIDTH = 40
+
+# Opt-in instrumentation: set to 1 for timers and counters on exit, and
+# point the second variable at a file to also write cProfile stats there
+PROFILE_ENV = "EXPENSE_TRACKER_PROFILE"
+PROFILE_OUT_ENV = "EXPENSE_TRACKER_PROFILE_OUT"
@@ -8,6 +8,11 @@ class StorageError(Exception):
     pass
 
 
+class ConflictError(StorageError):
+    """Raised when the ledger changed on disk after the caller read the version it expects."""
+    pass
+
+
 class OperationCancelled(Exception):
     """Raised when the user requests to cancel the current operation."""
     pass
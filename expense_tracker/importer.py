@@ -0,0 +1,147 @@
+import csv
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterator
+
+from expense_tracker.config import ENCODING, IMPORT_BATCH_SIZE
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.utils import parse_amount, parse_date
+
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass
+class ColumnMapping:
+    """Which source columns feed each transaction field."""
+
+    date: str = "date"
+    amount: str = "amount"
+    category: str | None = "category"
+    description: str | None = "description"
+    id: str | None = None
+    currency: str | None = "currency"
+    date_format: str = "%Y%m%d"
+    default_category: str = "Imported"
+    # for rows without a currency, e.g. every row of a card billed in EUR
+    default_currency: str | None = None
+    # card exports often list spending as negative numbers
+    negate: bool = False
+    delimiter: str = ","
+
+
+@dataclass
+class ImportResult:
+    accepted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+def content_hash(tx: Transaction) -> str:
+    # amount is normalized so 6.2 and 6.20 count as the same transaction
+    key = "\x1f".join((tx.date.strftime("%Y%m%d"), str(tx.amount.normalize()), tx.category.strip().lower(), (tx.description or "").strip().lower()))
+    if tx.currency:
+        # left out for the default currency, so earlier hashes stay valid
+        key += "\x1f" + tx.currency
+    return hashlib.sha1(key.encode(ENCODING)).hexdigest()
+
+
+def _batches(reader, size: int) -> Iterator[list[tuple[int, list[str]]]]:
+    # each row with the source line it starts on; blank lines and quoted
+    # fields spanning lines still count, so errors point at the right line
+    batch: list[tuple[int, list[str]]] = []
+    line = reader.line_num
+    for row in reader:
+        start, line = line + 1, reader.line_num
+        if not row:
+            continue
+        batch.append((start, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _column(header: list[str], name: str | None, required: bool) -> int | None:
+    if name is None:
+        return None
+    if name not in header:
+        if required:
+            raise ValidationError(f"column '{name}' not found in source header")
+        return None
+    return header.index(name)
+
+
+def _validate_batch(batch: list[tuple[int, list[str]]], cols: dict, mapping: ColumnMapping, result: ImportResult) -> list[Transaction]:
+    txs: list[Transaction] = []
+
+    def cell(row: list[str], key: str) -> str:
+        i = cols[key]
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    for line, row in batch:
+        try:
+            d = parse_date(cell(row, "date"), mapping.date_format)
+            amount: Decimal = parse_amount(cell(row, "amount"))
+            if mapping.negate:
+                amount = -amount
+            category = cell(row, "category") or mapping.default_category
+            currency = cell(row, "currency") or mapping.default_currency
+            txs.append(Transaction(cell(row, "id") or str(uuid.uuid4()), d, amount, category, cell(row, "description"), currency))
+        except ValidationError as e:
+            result.rejected += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                result.errors.append(f"line {line}: {e}")
+    return txs
+
+
+def import_statement(store, source: Path, mapping: ColumnMapping | None = None, batch_size: int = IMPORT_BATCH_SIZE) -> ImportResult:
+    """Stream an external statement CSV into the store in one atomic write.
+
+    Rows are validated in batches; rows whose id or content hash is already
+    in the ledger (or earlier in the same file) are counted as duplicates.
+    """
+    mapping = mapping or ColumnMapping()
+    source = Path(source)
+    result = ImportResult()
+    existing = store.iter_transactions() if hasattr(store, "iter_transactions") else store.load()
+    seen_ids: set[str] = set()
+    seen_hashes: set[str] = set()
+    for tx in existing:
+        seen_ids.add(tx.id)
+        seen_hashes.add(content_hash(tx))
+
+    accepted: list[Transaction] = []
+    try:
+        with source.open("r", encoding=ENCODING, newline="") as fh:
+            reader = csv.reader(fh, delimiter=mapping.delimiter)
+            header = [h.strip() for h in next(reader, [])]
+            cols = {
+                "date": _column(header, mapping.date, True),
+                "amount": _column(header, mapping.amount, True),
+                "category": _column(header, mapping.category, False),
+                "description": _column(header, mapping.description, False),
+                "id": _column(header, mapping.id, True),
+                "currency": _column(header, mapping.currency, False),
+            }
+            for batch in _batches(reader, batch_size):
+                for tx in _validate_batch(batch, cols, mapping, result):
+                    digest = content_hash(tx)
+                    if tx.id in seen_ids or digest in seen_hashes:
+                        result.duplicates += 1
+                        continue
+                    seen_ids.add(tx.id)
+                    seen_hashes.add(digest)
+                    accepted.append(tx)
+    except (OSError, csv.Error, UnicodeDecodeError) as ex:
+        raise StorageError(f"could not read {source}: {ex}")
+
+    if accepted:
+        store.extend(accepted)
+    result.accepted = len(accepted)
+    return result
@@ -0,0 +1,128 @@
+import atexit
+import os
+import sys
+from functools import wraps
+from time import perf_counter
+
+from expense_tracker.config import PROFILE_ENV, PROFILE_OUT_ENV
+
+# Opt-in timers and counters for the hot paths. While disabled, a timed
+# function costs one global lookup per call and count() returns at once.
+_enabled = False
+_timers: dict[str, list] = {}
+_counters: dict[str, int] = {}
+_profiler = None
+_pstats_path: str | None = None
+_exit_hook_registered = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(pstats_path: str | None = None, summary: bool = True):
+    """Start collecting; optionally run cProfile too and write its stats to `pstats_path` on exit."""
+    global _enabled, _profiler, _pstats_path, _exit_hook_registered
+    _enabled = True
+    if pstats_path and _profiler is None:
+        import cProfile
+
+        _pstats_path = pstats_path
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if summary and not _exit_hook_registered:
+        atexit.register(_at_exit)
+        _exit_hook_registered = True
+
+
+def disable():
+    global _enabled, _profiler
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler = None
+
+
+def reset():
+    _timers.clear()
+    _counters.clear()
+
+
+def record(name: str, seconds: float):
+    slot = _timers.get(name)
+    if slot is None:
+        slot = _timers[name] = [0, 0.0, 0.0]
+    slot[0] += 1
+    slot[1] += seconds
+    if seconds > slot[2]:
+        slot[2] = seconds
+
+
+def count(name: str, n: int = 1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(name: str):
+    """Decorator that records calls and wall time under `name` while instrumentation is on."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> dict:
+    return {
+        "timers": {k: {"calls": c, "total_s": t, "max_s": m} for k, (c, t, m) in _timers.items()},
+        "counters": dict(_counters),
+    }
+
+
+def summary(stream=None):
+    # timers are inclusive, so a load that runs inside a save shows up in both
+    stream = stream or sys.stderr
+    if not _timers and not _counters:
+        print("instrumentation: nothing recorded", file=stream)
+        return
+    if _timers:
+        print(f"{'timer':<34} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}", file=stream)
+        for name, (calls, total, longest) in sorted(_timers.items(), key=lambda kv: -kv[1][1]):
+            print(f"{name:<34} {calls:>7} {total * 1000:>10.2f} {total * 1000 / calls:>9.3f} {longest * 1000:>9.3f}", file=stream)
+    if _counters:
+        print(f"{'counter':<34} {'value':>7}", file=stream)
+        for name, value in sorted(_counters.items()):
+            print(f"{name:<34} {value:>7}", file=stream)
+
+
+def dump_pstats(path: str):
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(path)
+    print(f"instrumentation: cProfile stats written to {path} (view with: python -m pstats {path})", file=sys.stderr)
+
+
+def _at_exit():
+    if _profiler is not None and _pstats_path:
+        dump_pstats(_pstats_path)
+    summary()
+
+
+def enable_from_env():
+    # EXPENSE_TRACKER_PROFILE=1 turns on timers and counters; a
+    # EXPENSE_TRACKER_PROFILE_OUT path also records a cProfile dump
+    flag = os.environ.get(PROFILE_ENV, "").strip().lower()
+    out = os.environ.get(PROFILE_OUT_ENV, "").strip()
+    if out or flag not in ("", "0", "false", "no", "off"):
+        enable(out or None)
+
+
+enable_from_env()
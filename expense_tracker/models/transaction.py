@@ -1,21 +1,184 @@
-from dataclasses import dataclass
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 import uuid
 
+from expense_tracker.config import DEFAULT_CURRENCY
 from expense_tracker.exceptions import ValidationError
 
+# A ledger only spans a few thousand distinct days, so parsed dates are
+# memoized; the bound keeps a pathological file from growing it forever.
+_DATE_CACHE: dict[str, date] = {}
+_DATE_CACHE_LIMIT = 1 << 16
+
+
+def parse_ymd(s: str) -> date:
+    d = _DATE_CACHE.get(s)
+    if d is None:
+        if len(s) == 8 and s.isascii() and s.isdigit():
+            d = date(int(s[:4]), int(s[4:6]), int(s[6:]))
+        else:
+            d = datetime.strptime(s, "%Y%m%d").date()
+        if len(_DATE_CACHE) < _DATE_CACHE_LIMIT:
+            _DATE_CACHE[s] = d
+    return d
+
+
+def decimal_parts(amount: Decimal) -> tuple[int, int]:
+    # (units, exponent) with exponent <= 0, so that amount == units * 10**exponent
+    exp = amount.as_tuple().exponent
+    if not isinstance(exp, int):
+        raise ValueError(f"non-finite amount {amount}")
+    exp = min(exp, 0)
+    return int(amount.scaleb(-exp)), exp
+
+
+def from_decimal_parts(units: int, exponent: int) -> Decimal:
+    return Decimal(f"{units}E{exponent}")
+
+
+# Categories (and most descriptions) repeat across rows, so each distinct
+# string is stored once and shared; the bound works like the date cache's.
+_CATEGORY_POOL: dict[str, str] = {}
+_DESCRIPTION_POOL: dict[str, str] = {}
+_POOL_LIMIT = 1 << 16
+
+
+def _intern(pool: dict[str, str], s: str) -> str:
+    shared = pool.get(s)
+    if shared is None:
+        shared = s
+        if len(pool) < _POOL_LIMIT:
+            pool[s] = s
+    return shared
+
+
+def intern_category(category: str) -> str:
+    return _intern(_CATEGORY_POOL, category)
+
+
+def parse_currency(code: str | None) -> str | None:
+    # three-letter codes, uppercased; None stands for DEFAULT_CURRENCY, which
+    # is never stored, so ledgers that only use it look the way they always did
+    code = code.strip().upper() if code else ""
+    if not code:
+        return None
+    if len(code) != 3 or not code.isascii() or not code.isalpha():
+        raise ValidationError(f"invalid currency '{code}': expected a three-letter code such as EUR")
+    return None if code == DEFAULT_CURRENCY else code
+
+
+def _split_amount(amount: Decimal) -> tuple[int | Decimal, int | None]:
+    # Exact (units, exponent) keeping the original exponent, so the amount
+    # prints back exactly as it was written. Values that integers cannot
+    # represent (NaN, infinities, negative zero) are kept as the Decimal.
+    if not isinstance(amount, Decimal):
+        amount = Decimal(amount)
+    sign, digits, exp = amount.as_tuple()
+    if not isinstance(exp, int) or (sign and not any(digits)):
+        return amount, None
+    units = int("".join(map(str, digits)))
+    return (-units if sign else units), exp
+
+
+def _parse_amount(s: str) -> tuple[int | Decimal, int | None]:
+    # plain "-123.45" strings go straight to integers; anything else takes
+    # the Decimal route so the accepted syntax is unchanged
+    body = s[1:] if s[:1] == "-" else s
+    head, dot, tail = body.partition(".")
+    if head.isdigit() and head.isascii() and (not dot or (tail.isdigit() and tail.isascii())):
+        units = int(head + tail)
+        if units or body is s:
+            return (-units if body is not s else units), -len(tail)
+    amount = Decimal(s)
+    if not amount.is_finite():
+        raise ValidationError(f"invalid amount '{s}': must be a finite number")
+    return _split_amount(amount)
+
+
+def _format_amount(units: int, exp: int) -> str:
+    # str(Decimal) for the common plain-notation cases, without building one
+    if exp == 0:
+        return str(units)
+    if exp < 0:
+        digits = str(abs(units))
+        if len(digits) > -exp:
+            return ("-" if units < 0 else "") + digits[:exp] + "." + digits[exp:]
+    return str(from_decimal_parts(units, exp))
+
 
-@dataclass
 class Transaction:
-    id: str
-    date: date
-    amount: Decimal
-    category: str
-    description: str = ""
+    """One ledger entry.
+
+    The amount is held as integer units and a base-10 exponent and only
+    becomes a Decimal when `amount` is read; categories and descriptions
+    are interned, and dates come from the shared parse cache. `currency`
+    is None for amounts in DEFAULT_CURRENCY.
+    """
+
+    __slots__ = ("id", "date", "_units", "_exp", "category", "description", "currency")
+    __hash__ = None
+
+    def __init__(self, id: str, date: date, amount: Decimal, category: str, description: str = "", currency: str | None = None):
+        self.id = id
+        self.date = date
+        self._units, self._exp = _split_amount(amount)
+        self.category = intern_category(category)
+        self.description = _intern(_DESCRIPTION_POOL, description) if description else description
+        self.currency = parse_currency(currency)
 
     @classmethod
-    def from_input(cls, date_str: str, amount_str: str, category: str, description: str = "", id: str | None = None):
+    def from_parts(cls, id: str, date: date, units: int, exponent: int, category: str, description: str = "", currency: str | None = None) -> "Transaction":
+        tx = cls.__new__(cls)
+        tx.id = id
+        tx.date = date
+        tx._units = units
+        tx._exp = exponent
+        tx.category = intern_category(category)
+        tx.description = _intern(_DESCRIPTION_POOL, description) if description else description
+        tx.currency = parse_currency(currency) if currency else None
+        return tx
+
+    @property
+    def amount(self) -> Decimal:
+        if self._exp is None:
+            return self._units
+        return from_decimal_parts(self._units, self._exp)
+
+    @amount.setter
+    def amount(self, value: Decimal):
+        self._units, self._exp = _split_amount(value)
+
+    def amount_parts(self) -> tuple[int, int]:
+        # (units, exponent <= 0) like decimal_parts, without building a Decimal
+        if self._exp is None:
+            return decimal_parts(self._units)
+        if self._exp > 0:
+            return self._units * 10 ** self._exp, 0
+        return self._units, self._exp
+
+    def stored_amount_parts(self) -> tuple[int, int]:
+        # exactly as written, so the exponent may be positive (e.g. "1E+2")
+        if self._exp is None:
+            raise ValueError(f"amount {self._units} has no integer form")
+        return self._units, self._exp
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.id, self.date, self.amount, self.category, self.description, self.currency) == (other.id, other.date, other.amount, other.category, other.description, other.currency)
+
+    def __repr__(self) -> str:
+        currency = f", currency={self.currency!r}" if self.currency else ""
+        return f"Transaction(id={self.id!r}, date={self.date!r}, amount={self.amount!r}, category={self.category!r}, description={self.description!r}{currency})"
+
+    def __reduce__(self):
+        # pickled as parts, e.g. when parallel workers hand rows back
+        if self._exp is None:
+            return (Transaction, (self.id, self.date, self._units, self.category, self.description, self.currency))
+        return (Transaction.from_parts, (self.id, self.date, self._units, self._exp, self.category, self.description, self.currency))
+
+    @classmethod
+    def from_input(cls, date_str: str, amount_str: str, category: str, description: str = "", id: str | None = None, currency: str | None = None):
         if not date_str:
             raise ValidationError("date is required")
         try:
@@ -29,40 +192,50 @@ class Transaction:
             amt = Decimal(amount_str)
         except (InvalidOperation, ValueError):
             raise ValidationError(f"invalid amount '{amount_str}': expected decimal with dot as separator")
+        if not amt.is_finite():
+            raise ValidationError(f"invalid amount '{amount_str}': must be a finite number")
 
         if not category:
             raise ValidationError("category is required")
 
         tx_id = id if id else str(uuid.uuid4())
-        return cls(id=tx_id, date=d, amount=amt, category=category.strip(), description=description.strip() if description else "")
+        return cls(id=tx_id, date=d, amount=amt, category=category.strip(), description=description.strip() if description else "", currency=currency)
 
     def to_csv_row(self) -> dict:
-        return {
+        row = {
             "id": self.id,
             "date": self.date.strftime("%Y%m%d"),
-            "amount": f"{self.amount}",
+            "amount": f"{self._units}" if self._exp is None else _format_amount(self._units, self._exp),
             "category": self.category,
             "description": self.description or "",
         }
+        if self.currency:
+            row["currency"] = self.currency
+        return row
 
     @classmethod
     def from_csv_row(cls, row: dict):
+        return cls.from_csv_fields(row.get("id"), row.get("date"), row.get("amount"), row.get("category"), row.get("description"), row.get("currency"))
+
+    @classmethod
+    def from_csv_fields(cls, tx_id: str | None, date_s: str | None, amount_s: str | None, category: str | None, description: str | None, currency: str | None = None):
+        if not tx_id:
+            raise ValidationError("missing id in CSV row")
+        if not date_s:
+            raise ValidationError("missing date in CSV row")
+        if not amount_s:
+            raise ValidationError("missing amount in CSV row")
         try:
-            tx_id = row.get("id") or ""
-            date_s = row.get("date")
-            amount_s = row.get("amount")
-            category = row.get("category") or ""
-            description = row.get("description") or ""
-            if not tx_id:
-                raise ValidationError("missing id in CSV row")
-            if not date_s:
-                raise ValidationError("missing date in CSV row")
-            if not amount_s:
-                raise ValidationError("missing amount in CSV row")
-            d = datetime.strptime(date_s, "%Y%m%d").date()
-            a = Decimal(amount_s)
-            return cls(id=tx_id, date=d, amount=a, category=category, description=description)
-        except ValidationError:
-            raise
+            d = _DATE_CACHE.get(date_s) or parse_ymd(date_s)
+            units, exp = _parse_amount(amount_s)
+            tx = cls.__new__(cls)
+            tx.id = tx_id
+            tx.date = d
+            tx._units = units
+            tx._exp = exp
+            tx.category = _CATEGORY_POOL.get(category) or _intern(_CATEGORY_POOL, category or "")
+            tx.description = _DESCRIPTION_POOL.get(description) or _intern(_DESCRIPTION_POOL, description or "")
+            tx.currency = parse_currency(currency) if currency else None
+            return tx
         except Exception as ex:
             raise ValidationError(f"invalid CSV row: {ex}")
@@ -1,3 +1,5 @@
-from .report_service import ReportGenerator
+from .report_service import ReportGenerator, TransactionStream
+from .rollup import Rollup
+from .table import TransactionTable
 
-__all__ = ["ReportGenerator"]
+__all__ = ["ReportGenerator", "Rollup", "TransactionStream", "TransactionTable"]
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from expense_tracker.config import ENCODING, EXPORT_WORKERS
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.instrumentation import timed
+from expense_tracker.reporting.engine import ReportSpec
+from expense_tracker.reporting.report_service import ReportGenerator, render_csv, write_atomic
+from expense_tracker.utils import parse_amount, parse_date_ymd
+
+STATE_FORMAT = 1
+_JOB_KEYS = {"name", "output", "gzip", "group_by", "measures", "start", "end", "categories", "min_amount", "max_amount", "order_by", "top"}
+
+
+@dataclass
+class ReportExport:
+    """One report of a batch and the file it is written to."""
+
+    spec: ReportSpec
+    path: Path
+    compress: bool = False
+
+    def definition(self) -> str:
+        # everything that shapes the bytes of the file
+        s = self.spec
+        parts = [s.name, s.group_by, s.measures, s.start, s.end, s.categories, s.min_amount, s.max_amount, s.order_by, s.top, self.compress]
+        return hashlib.sha256(json.dumps(parts, default=str).encode(ENCODING)).hexdigest()
+
+
+@dataclass
+class ExportResult:
+    written: list[Path] = field(default_factory=list)
+    # recomputed to the same bytes, so the file was left alone
+    unchanged: list[Path] = field(default_factory=list)
+    # inputs unchanged since the last run, so not recomputed at all
+    skipped: list[Path] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+
+def _optional(entry: dict, key: str, parse):
+    value = entry.get(key)
+    return parse(str(value)) if value not in (None, "") else None
+
+
+def load_jobs(path: Path) -> list[ReportExport]:
+    """Read a JSON job file: {"reports": [{"name": ..., "output": ..., ...}, ...]}.
+
+    Each report takes the options of the report command (group_by,
+    measures, start, end, categories, min_amount, max_amount, order_by,
+    top) plus "gzip"; relative outputs are resolved against the job file.
+    """
+    path = Path(path)
+    try:
+        with path.open("r", encoding=ENCODING) as fh:
+            document = json.load(fh)
+    except OSError as ex:
+        raise StorageError(f"could not read job file {path}: {ex}")
+    except ValueError as ex:
+        raise ValidationError(f"job file {path} is not valid JSON: {ex}")
+    reports = document.get("reports") if isinstance(document, dict) else None
+    if not isinstance(reports, list) or not reports:
+        raise ValidationError(f"job file {path} needs a non-empty \"reports\" list")
+    exports: list[ReportExport] = []
+    names: set[str] = set()
+    outputs: set[Path] = set()
+    for n, entry in enumerate(reports, 1):
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("output"):
+            raise ValidationError(f"{path}: report {n} needs a name and an output")
+        name = str(entry["name"])
+        if name in names:
+            raise ValidationError(f"{path}: more than one report is named {name!r}")
+        names.add(name)
+        unknown = sorted(set(entry) - _JOB_KEYS)
+        if unknown:
+            raise ValidationError(f"{path}: report {name!r} has unknown option {unknown[0]!r}")
+        top = entry.get("top")
+        if top is not None and (not isinstance(top, int) or isinstance(top, bool)):
+            raise ValidationError(f"{path}: report {name!r}: top must be a whole number")
+        try:
+            spec = ReportSpec(
+                name,
+                entry.get("group_by", "month"),
+                entry.get("measures", "sum"),
+                _optional(entry, "start", parse_date_ymd),
+                _optional(entry, "end", parse_date_ymd),
+                categories=entry.get("categories"),
+                min_amount=_optional(entry, "min_amount", parse_amount),
+                max_amount=_optional(entry, "max_amount", parse_amount),
+                order_by=entry.get("order_by"),
+                top=top,
+            )
+        except ValidationError as ex:
+            raise ValidationError(f"{path}: report {name!r}: {ex}")
+        output = Path(entry["output"])
+        if not output.is_absolute():
+            output = path.parent / output
+        if output in outputs:
+            raise ValidationError(f"{path}: more than one report writes to {output}")
+        outputs.add(output)
+        exports.append(ReportExport(spec, output, bool(entry.get("gzip", output.suffix == ".gz"))))
+    return exports
+
+
+def _signature(path: Path) -> list | None:
+    # a file replaced or touched since the last run is written again
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _same(before: dict | None, entry: dict, output: list | None, key: str) -> bool:
+    # the last run's entry still describes this report and its file
+    return bool(before) and output is not None and before.get("output") == output and all(before.get(k) == entry[k] for k in ("definition", "conversion", key))
+
+
+def _load_state(path: Path) -> dict:
+    # a missing or unreadable state only means every report is computed again
+    try:
+        with Path(path).open("r", encoding=ENCODING) as fh:
+            state = json.load(fh)
+        if state.get("format") == STATE_FORMAT and isinstance(state.get("reports"), dict):
+            return state["reports"]
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def _save_state(path: Path, reports: dict):
+    data = json.dumps({"format": STATE_FORMAT, "reports": reports}, indent=1).encode(ENCODING)
+    write_atomic(Path(path), data)
+
+
+@timed("report.export_batch")
+def export_reports(
+    store,
+    exports: list[ReportExport],
+    state_path: Path | None = None,
+    force: bool = False,
+    workers: int = EXPORT_WORKERS,
+    reports: ReportGenerator | None = None,
+) -> ExportResult:
+    """Compute `exports` in one pass over `store` and write their files concurrently.
+
+    With `state_path`, a report whose definition, reporting currency and
+    rates file, the store files its date range reads and its output file
+    all match the last run is skipped
+    without being computed; a report recomputed to the same bytes leaves
+    its file untouched. `force` recomputes and rewrites everything.
+    """
+    reports = reports or ReportGenerator()
+    result = ExportResult()
+    previous = {} if force or state_path is None else _load_state(state_path)
+    state: dict = {}
+    pending = []
+    conversion = [reports.currency, _signature(reports.rates_path)]
+    for export in exports:
+        key = str(export.path)
+        # taken before the scan: a write landing during it makes the next run recompute
+        entry = {"definition": export.definition(), "conversion": conversion, "inputs": store.input_signature(export.spec.start, export.spec.end)}
+        before = previous.get(key)
+        if _same(before, entry, _signature(export.path), "inputs"):
+            state[key] = before
+            result.skipped.append(export.path)
+        else:
+            pending.append((export, entry))
+
+    if pending:
+        computed = reports.run_for_store(store, [export.spec for export, _ in pending])
+
+        def write(export: ReportExport, entry: dict) -> tuple[str, dict]:
+            report = computed[export.spec.name]
+            data = render_csv(report.text_rows(), report.headers)
+            entry["digest"] = hashlib.sha256(data).hexdigest()
+            output = _signature(export.path)
+            if _same(previous.get(str(export.path)), entry, output, "digest"):
+                entry["output"] = output
+                return "unchanged", entry
+            write_atomic(export.path, data, export.compress)
+            entry["output"] = _signature(export.path)
+            return "written", entry
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            futures = [(export, pool.submit(write, export, entry)) for export, entry in pending]
+            for export, future in futures:
+                try:
+                    outcome, entry = future.result()
+                except StorageError as ex:
+                    # left out of the state, so the next run tries it again
+                    result.errors.append(str(ex))
+                    continue
+                state[str(export.path)] = entry
+                getattr(result, outcome).append(export.path)
+
+    if state_path is not None:
+        _save_state(state_path, state)
+    return result
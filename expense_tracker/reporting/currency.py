@@ -0,0 +1,107 @@
+import csv
+import os
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from expense_tracker.config import DEFAULT_CURRENCY, ENCODING, RATE_CACHE_SIZE
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.models.transaction import decimal_parts, from_decimal_parts, parse_currency, parse_ymd
+from expense_tracker.utils import parse_amount, positional_rows, report_invalid_row
+
+RATES_HEADER = ["date", "from", "to", "rate"]
+
+
+def _code(code: str | None) -> str:
+    if not code or not code.strip():
+        raise ValidationError("currency is required")
+    return parse_currency(code) or DEFAULT_CURRENCY
+
+
+def _signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _check_rate(base: str, quote: str, rate: Decimal):
+    if not rate.is_finite() or rate <= 0:
+        raise ValidationError(f"invalid {base} to {quote} rate {rate}: must be greater than zero")
+
+
+class RateTable:
+    """Dated exchange rates: from `date` on, one `from` is worth `rate` `to`.
+
+    Each currency pair keeps its dates sorted, so a lookup is a binary
+    search for the latest rate on or before the day, and lookups go through
+    a bounded cache, since a ledger asks for the same few (day, currency)
+    pairs over and over. Rates stay exact (units, exponent) integers.
+    """
+
+    def __init__(self, rates: Iterable[tuple[date, str, str, Decimal]] = (), source=None):
+        pairs: dict[tuple[str, str], dict[date, tuple[int, int]]] = {}
+        for on, base, quote, rate in rates:
+            _check_rate(base, quote, rate)
+            # normalized, so 1.2700 does not carry two more places into every product
+            pairs.setdefault((base, quote), {})[on] = decimal_parts(rate.normalize())
+        self._dates = {pair: sorted(by_date) for pair, by_date in pairs.items()}
+        self._rates = {pair: [by_date[d] for d in self._dates[pair]] for pair, by_date in pairs.items()}
+        self.source = source
+        self.rate = lru_cache(maxsize=RATE_CACHE_SIZE)(self._lookup)
+
+    def _lookup(self, on: date, currency: str, target: str) -> tuple[int, int]:
+        # (units, exponent) of the rate in force on `on`
+        if currency == target:
+            return 1, 0
+        days = self._dates.get((currency, target))
+        i = bisect_right(days, on) if days else 0
+        if not i:
+            raise ValidationError(f"no {currency} to {target} exchange rate on or before {on:%Y%m%d}")
+        return self._rates[(currency, target)][i - 1]
+
+    def convert(self, amount: Decimal, on: date, currency: str, target: str) -> Decimal:
+        units, exp = self.rate(on, currency, target)
+        try:
+            amount_units, amount_exp = decimal_parts(amount)
+        except ValueError:
+            # NaN and infinities only exist as Decimals
+            return amount * from_decimal_parts(units, exp)
+        return from_decimal_parts(amount_units * units, amount_exp + exp)
+
+    @classmethod
+    def load(cls, path: Path) -> "RateTable":
+        # a CSV with a date,from,to,rate header; invalid rows are skipped like ledger rows
+        path = Path(path)
+        source = _signature(path)
+        rates = []
+        try:
+            with path.open("r", encoding=ENCODING, newline="") as fh:
+                reader = csv.reader(fh)
+                fieldnames = next(reader, None) or []
+                missing = [c for c in RATES_HEADER if c not in fieldnames]
+                if missing:
+                    raise ValidationError(f"exchange rates {path} have no {missing[0]!r} column")
+                for day, base, quote, rate in positional_rows(reader, fieldnames, RATES_HEADER):
+                    try:
+                        if not day:
+                            raise ValidationError("date is required")
+                        entry = (parse_ymd(day), _code(base), _code(quote), parse_amount(rate or ""))
+                        _check_rate(*entry[1:])
+                        rates.append(entry)
+                    except (ValueError, ValidationError) as e:
+                        report_invalid_row(e, "rate")
+        except OSError as ex:
+            raise StorageError(f"could not read exchange rates {path}: {ex}")
+        return cls(rates, source)
+
+
+def load_rates(path: Path, previous: RateTable | None = None) -> RateTable:
+    """The rates in `path`, reusing `previous` (and its cache) while the file is unchanged."""
+    if previous is not None and previous.source is not None and previous.source == _signature(path):
+        return previous
+    return RateTable.load(path)
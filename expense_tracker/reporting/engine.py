@@ -0,0 +1,478 @@
+import math
+from datetime import date
+from decimal import Decimal
+from itertools import chain
+from typing import Callable, Iterable
+
+from expense_tracker.config import DEFAULT_CURRENCY
+from expense_tracker.exceptions import ValidationError
+from expense_tracker.models.transaction import Transaction, decimal_parts, from_decimal_parts
+from expense_tracker.reporting.rollup import Rollup, month_key
+
+DIMENSIONS = ("day", "week", "month", "year", "category")
+MEASURES = ("sum", "count", "mean", "min", "max", "median")
+# the sum column keeps the header the fixed reports always had
+MEASURE_LABELS = {"sum": "total"}
+# what the month x category totals of a Rollup can answer on their own
+_ROLLUP_DIMENSIONS = {"month", "year", "category"}
+_ROLLUP_MEASURES = {"sum", "count", "mean"}
+
+
+def _percentile(measure: str) -> int | None:
+    if measure == "median":
+        return 50
+    if measure[:1] == "p" and measure[1:].isdigit() and 0 < int(measure[1:]) <= 100:
+        return int(measure[1:])
+    return None
+
+
+def _names(value) -> tuple[str, ...]:
+    # accepts "month,category" as well as a sequence of names
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(v.strip().lower() for v in value if v.strip())
+
+
+class ReportSpec:
+    """One report: a row per distinct `group_by` key, a column per measure.
+
+    Dimensions are day, week (ISO), month, year and category, in any
+    combination; no dimension at all gives a single grand-total row.
+    Measures are sum, count, mean, min, max and percentiles (p1 to p100 by
+    nearest rank, median for p50). Rows can be limited to a date range,
+    to categories and to an amount range; with `order_by` rows are ranked
+    by that measure's absolute value, and `top` keeps the first N.
+    """
+
+    # a plain class rather than a dataclass: the report command imports this
+    # module, and dataclasses would pull inspect into its startup
+    def __init__(
+        self,
+        name: str,
+        group_by: Iterable[str] | str = ("month",),
+        measures: Iterable[str] | str = ("sum",),
+        start: date | None = None,
+        end: date | None = None,
+        categories: Iterable[str] | str | None = None,
+        min_amount: Decimal | None = None,
+        max_amount: Decimal | None = None,
+        order_by: str | None = None,
+        top: int | None = None,
+    ):
+        self.name = name
+        self.group_by = _names(group_by)
+        self.measures = _names(measures) or ("sum",)
+        self.start, self.end = start, end
+        if isinstance(categories, str):
+            categories = categories.split(",")
+        self.categories = tuple(c.strip() for c in categories if c.strip()) or None if categories is not None else None
+        self.min_amount, self.max_amount = min_amount, max_amount
+        self.order_by, self.top = order_by, top
+        unknown = [g for g in self.group_by if g not in DIMENSIONS]
+        if unknown:
+            raise ValidationError(f"unknown dimension {unknown[0]!r}: use {', '.join(DIMENSIONS)}")
+        if len(set(self.group_by)) != len(self.group_by):
+            raise ValidationError("a dimension can only be grouped by once")
+        unknown = [m for m in self.measures if m not in MEASURES and _percentile(m) is None]
+        if unknown:
+            raise ValidationError(f"unknown measure {unknown[0]!r}: use {', '.join(MEASURES)} or p1..p100")
+        if self.start and self.end and self.start > self.end:
+            raise ValidationError("start date is after end date")
+        if self.top is not None and self.top < 1:
+            raise ValidationError("top must be at least 1")
+        if self.order_by is None and self.top is not None:
+            self.order_by = self.measures[0]
+        if self.order_by is not None and self.order_by not in self.measures:
+            raise ValidationError(f"order_by {self.order_by!r} is not one of the measures")
+
+    @property
+    def headers(self) -> list[str]:
+        return list(self.group_by) + [MEASURE_LABELS.get(m, m) for m in self.measures]
+
+    @property
+    def amount_filter(self) -> tuple[Decimal | None, Decimal | None]:
+        return self.min_amount, self.max_amount
+
+    def answerable_by_rollup(self) -> bool:
+        return (
+            _ROLLUP_DIMENSIONS.issuperset(self.group_by)
+            and _ROLLUP_MEASURES.issuperset(self.measures)
+            and self.amount_filter == (None, None)
+            and Rollup.covers(self.start, self.end)
+        )
+
+
+class ReportResult:
+    def __init__(self, spec: ReportSpec, rows: list[list]):
+        self.spec = spec
+        self.rows = rows
+
+    @property
+    def headers(self) -> list[str]:
+        return self.spec.headers
+
+    def text_rows(self) -> list[list[str]]:
+        return [["" if v is None else f"{v}" for v in row] for row in self.rows]
+
+
+def monthly_totals(start: date | None = None, end: date | None = None) -> ReportSpec:
+    return ReportSpec("monthly", ("month",), start=start, end=end)
+
+
+def category_totals(start: date | None = None, end: date | None = None) -> ReportSpec:
+    return ReportSpec("category", ("category",), start=start, end=end, order_by="sum")
+
+
+def summary_specs(start: date | None = None, end: date | None = None) -> list[ReportSpec]:
+    return [
+        ReportSpec("yearly", ("year",), ("sum", "count"), start, end),
+        monthly_totals(start, end),
+        ReportSpec("weekly", ("week",), ("sum", "count"), start, end),
+        category_totals(start, end),
+        ReportSpec("month x category", ("month", "category"), start=start, end=end),
+    ]
+
+
+def scan_bounds(specs: Iterable[ReportSpec]) -> tuple[date | None, date | None]:
+    # the smallest date range that covers every spec, for the store to prune with
+    specs = list(specs)
+    starts = [s.start for s in specs]
+    ends = [s.end for s in specs]
+    return (None if None in starts or not starts else min(starts)), (None if None in ends or not ends else max(ends))
+
+
+class _Base:
+    # Finest-grain accumulators shared by every spec with the same amount
+    # filter: (date, category) -> [count, {exponent: units}, non-finite sum,
+    # min, max, amounts]. Specs are rolled up from these groups, so another
+    # report costs a pass over the groups, not over the rows.
+
+    def __init__(self, min_amount: Decimal | None, max_amount: Decimal | None):
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.extremes = False
+        self.values = False
+        self.groups: dict[tuple, list] = {}
+        self._grains: dict[str, tuple[dict, int]] = {}
+
+    @property
+    def simple(self) -> bool:
+        return not (self.extremes or self.values or self.min_amount is not None or self.max_amount is not None)
+
+    def convert(self, target: str, rates: Callable[[], "RateTable"] | None):
+        # Rows in another currency were grouped apart under (date, category,
+        # currency). Every row of such a group shares one rate, so the group
+        # is converted as a whole, exact integer products, and merged into
+        # its (date, category) group.
+        foreign = [k for k in self.groups if len(k) == 3]
+        if not foreign:
+            return
+        rate = _rate_table(rates, foreign[0][2], target).rate
+        groups = self.groups
+        for key in foreign:
+            converted = groups.pop(key)
+            d, category, currency = key
+            units, exp = rate(d, currency, target)
+            converted[1] = {e + exp: u * units for e, u in converted[1].items()}
+            if converted[2] is not None:
+                converted[2] *= from_decimal_parts(units, exp)
+            if converted[3] is not None:
+                # a positive rate keeps the order, so the extremes stay extremes
+                converted[3], converted[4] = _scaled(converted[3], units, exp), _scaled(converted[4], units, exp)
+            if converted[5] is not None:
+                converted[5] = [_scaled(v, units, exp) for v in converted[5]]
+            group = groups.get((d, category))
+            if group is None:
+                groups[(d, category)] = converted
+                continue
+            count, parts, special, low, high, values = converted
+            group[0] += count
+            for e, u in parts.items():
+                group[1][e] = group[1].get(e, 0) + u
+            if special is not None:
+                group[2] = special if group[2] is None else group[2] + special
+            if low is not None:
+                if group[3] is None or low < group[3]:
+                    group[3] = low
+                if group[4] is None or high > group[4]:
+                    group[4] = high
+            if values is not None:
+                group[5].extend(values)
+
+    def records(self) -> tuple[dict[tuple, list], int]:
+        # the groups as records at one common scale (see _records)
+        grain = self._grains.get("day")
+        if grain is None:
+            scale = max(0, -min((e for g in self.groups.values() for e in g[1]), default=0))
+            records = {}
+            for key, (count, parts, special, low, high, values) in self.groups.items():
+                units = sum(u * 10 ** (scale + e) for e, u in parts.items())
+                records[key] = [units, min(parts, default=0), count, special, low, high, [values] if values is not None else None]
+            grain = self._grains["day"] = (records, scale)
+        return grain
+
+    def coarsened(self, name: str) -> tuple[dict[tuple, list], int]:
+        # the day groups rolled up to weeks or months once, for every spec aligned to them
+        grain = self._grains.get(name)
+        if grain is None:
+            records, scale = self.records()
+            key_of = _GRAINS[name][0]
+            keys: dict[date, str] = {}
+            coarse: dict[tuple, list] = {}
+            for (d, category), record in records.items():
+                k = keys.get(d)
+                if k is None:
+                    k = keys[d] = key_of(d)
+                _merge(coarse, (k, category), record)
+            grain = self._grains[name] = (coarse, scale)
+        return grain
+
+
+# A record is [units at the common scale, smallest exponent, count,
+# non-finite sum or None, min, max, list of amount lists or None]: sums
+# stay integers until the end, where the smallest exponent gives the
+# Decimal exactly what adding the amounts one by one would have.
+
+def _merge(into: dict, key, record: list):
+    slot = into.get(key)
+    if slot is None:
+        into[key] = [record[0], record[1], record[2], record[3], record[4], record[5], list(record[6]) if record[6] is not None else None]
+        return
+    slot[0] += record[0]
+    if record[1] < slot[1]:
+        slot[1] = record[1]
+    slot[2] += record[2]
+    if record[3] is not None:
+        slot[3] = record[3] if slot[3] is None else slot[3] + record[3]
+    if record[4] is not None and (slot[4] is None or record[4] < slot[4]):
+        slot[4] = record[4]
+    if record[5] is not None and (slot[5] is None or record[5] > slot[5]):
+        slot[5] = record[5]
+    if record[6] is not None:
+        slot[6].extend(record[6])
+
+
+def _rollup_records(rollup: Rollup) -> tuple[dict[tuple, list], int]:
+    parts = {}
+    special = {}
+    for key, (total, count) in rollup.by_month_category.items():
+        try:
+            parts[key] = (decimal_parts(total), count)
+        except ValueError:
+            special[key] = (total, count)
+    scale = max(0, -min((e for (_, e), _ in parts.values()), default=0))
+    records = {key: [u * 10 ** (scale + e), e, count, None, None, None, None] for key, ((u, e), count) in parts.items()}
+    for key, (total, count) in special.items():
+        records[key] = [0, 0, count, total, None, None, None]
+    return records, scale
+
+
+def _scaled(amount: Decimal, units: int, exp: int) -> Decimal:
+    # amount * rate, exactly
+    amount_units, amount_exp = decimal_parts(amount)
+    return from_decimal_parts(amount_units * units, amount_exp + exp)
+
+
+def _rate_table(rates: Callable[[], "RateTable"] | None, currency: str, target: str) -> "RateTable":
+    if rates is None:
+        raise ValidationError(f"reporting {currency} amounts in {target} needs exchange rates")
+    return rates()
+
+
+def _scan(transactions: Iterable[Transaction], bases: list[_Base], currency: str = DEFAULT_CURRENCY, rates: Callable[[], "RateTable"] | None = None):
+    # the value of tx.currency that needs no conversion
+    own = None if currency == DEFAULT_CURRENCY else currency
+    if len(bases) == 1 and bases[0].simple:
+        # the common case, sums and counts without amount filters, kept tight
+        groups = bases[0].groups
+        for tx in transactions:
+            key = (tx.date, tx.category) if tx.currency == own else (tx.date, tx.category, tx.currency or DEFAULT_CURRENCY)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, {}, None, None, None, None]
+            group[0] += 1
+            try:
+                units, exp = tx.amount_parts()
+            except ValueError:
+                # NaN and infinities only exist as Decimals
+                group[2] = tx.amount if group[2] is None else group[2] + tx.amount
+                continue
+            parts = group[1]
+            parts[exp] = parts.get(exp, 0) + units
+        return
+    table = None
+    for tx in transactions:
+        amount = compared = tx.amount
+        if tx.currency == own:
+            key = (tx.date, tx.category)
+        else:
+            key = (tx.date, tx.category, tx.currency or DEFAULT_CURRENCY)
+            if table is None:
+                table = _rate_table(rates, key[2], currency)
+            # amount filters apply to what the row is worth in the report's currency
+            compared = table.convert(amount, tx.date, key[2], currency)
+        try:
+            units, exp = tx.amount_parts()
+        except ValueError:
+            units = None
+        for base in bases:
+            if base.min_amount is not None or base.max_amount is not None:
+                if units is None or (base.min_amount is not None and compared < base.min_amount) or (base.max_amount is not None and compared > base.max_amount):
+                    continue
+            group = base.groups.get(key)
+            if group is None:
+                group = base.groups[key] = [0, {}, None, None, None, [] if base.values else None]
+            group[0] += 1
+            if units is None:
+                group[2] = amount if group[2] is None else group[2] + amount
+                continue
+            parts = group[1]
+            parts[exp] = parts.get(exp, 0) + units
+            if base.extremes:
+                if group[3] is None or amount < group[3]:
+                    group[3] = amount
+                if group[4] is None or amount > group[4]:
+                    group[4] = amount
+            if base.values:
+                group[5].append(amount)
+
+
+def _week_key(d: date) -> str:
+    year, week, _ = d.isocalendar()
+    return f"{year:04d}-W{week:02d}"
+
+
+def _day_dims(d: date) -> dict[str, str]:
+    return {"day": f"{d.year:04d}{d.month:02d}{d.day:02d}", "week": _week_key(d), "month": month_key(d), "year": f"{d.year:04d}"}
+
+
+def _week_aligned(start: date | None, end: date | None) -> bool:
+    return (start is None or start.isoweekday() == 1) and (end is None or end.isoweekday() == 7)
+
+
+# coarser grains a spec can be rolled up from: key of a date, the dimensions
+# a key answers, and whether a date range falls on the grain's boundaries
+_GRAINS = {
+    "month": (month_key, lambda k: {"month": k, "year": k[:4]}, Rollup.covers),
+    "week": (_week_key, lambda k: {"week": k}, _week_aligned),
+}
+
+
+def _grain_for(spec: ReportSpec) -> str:
+    dims = set(spec.group_by) - {"category"}
+    for name, (_, dims_of, aligned) in _GRAINS.items():
+        if dims.issubset(dims_of(name)) and aligned(spec.start, spec.end):
+            return name
+    return "day"
+
+
+def _mean(total: Decimal, count: int) -> Decimal | None:
+    if not count:
+        return None
+    mean = total / count
+    # to the precision of the amounts themselves, like the totals
+    return mean.quantize(Decimal(1).scaleb(min(total.as_tuple().exponent, 0))) if total.is_finite() else mean
+
+
+def _finish(spec: ReportSpec, records: dict[tuple, list], scale: int, grain: str) -> ReportResult:
+    wanted = {c.lower() for c in spec.categories} if spec.categories else None
+    if grain == "day":
+        dims_of = _day_dims
+        lo, hi = spec.start, spec.end
+    else:
+        key_of, dims_of, _ = _GRAINS[grain]
+        lo = key_of(spec.start) if spec.start else None
+        hi = key_of(spec.end) if spec.end else None
+    dims_cache: dict = {}
+    merged: dict[tuple, list] = {}
+    for (when, category), record in records.items():
+        if (lo is not None and when < lo) or (hi is not None and when > hi):
+            continue
+        if wanted is not None and category.lower() not in wanted:
+            continue
+        dims = dims_cache.get(when)
+        if dims is None:
+            dims = dims_cache[when] = dims_of(when)
+        _merge(merged, tuple(category if g == "category" else dims[g] for g in spec.group_by), record)
+    rows = []
+    for key, (units, exp, count, special, low, high, chunks) in merged.items():
+        total = from_decimal_parts(units // 10 ** (scale + exp), exp)
+        if special is not None:
+            total += special
+        row = list(key)
+        ordered = None
+        for m in spec.measures:
+            if m == "sum":
+                row.append(total)
+            elif m == "count":
+                row.append(count)
+            elif m == "mean":
+                row.append(_mean(total, count))
+            elif m == "min":
+                row.append(low)
+            elif m == "max":
+                row.append(high)
+            else:
+                if ordered is None:
+                    ordered = sorted(chain.from_iterable(chunks))
+                rank = math.ceil(_percentile(m) * len(ordered) / 100)
+                row.append(ordered[max(rank, 1) - 1] if ordered else None)
+        rows.append(row)
+    if spec.order_by is not None:
+        col = len(spec.group_by) + spec.measures.index(spec.order_by)
+        rows.sort(key=lambda r: -abs(r[col]) if r[col] is not None else 0)
+    else:
+        rows.sort(key=lambda r: r[:len(spec.group_by)])
+    if spec.top is not None:
+        del rows[spec.top:]
+    return ReportResult(spec, rows)
+
+
+def run_reports(
+    specs: list[ReportSpec],
+    transactions: Iterable[Transaction],
+    rollup: Callable[[], Rollup] | None = None,
+    currency: str = DEFAULT_CURRENCY,
+    rates: Callable[[], "RateTable"] | None = None,
+) -> dict[str, ReportResult]:
+    """Plan and compute all `specs` together, keyed by spec name.
+
+    Specs that only need whole-month sums, counts or means by month, year
+    or category are answered from `rollup()` when it is given. The rest
+    share a single pass over `transactions`, which is not iterated at all
+    when nothing needs it, and each is then rolled up from the coarsest
+    grain (day, ISO week or month) its dimensions and date range allow.
+
+    Amounts are reported in `currency`; the others are converted with the
+    rates of `rates()`, which is only called when some row needs it.
+    """
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValidationError("report names must be unique")
+    results: dict[str, ReportResult] = {}
+    # the rollup adds amounts as recorded, so it only answers for a ledger with nothing to convert
+    from_rollup = [s for s in specs if rollup is not None and currency == DEFAULT_CURRENCY and s.answerable_by_rollup()]
+    if from_rollup:
+        totals = rollup()
+        if not totals.foreign:
+            records, scale = _rollup_records(totals)
+            for spec in from_rollup:
+                results[spec.name] = _finish(spec, records, scale, "month")
+    scanned = [s for s in specs if s.name not in results]
+    if scanned:
+        bases: dict[tuple, _Base] = {}
+        for spec in scanned:
+            base = bases.get(spec.amount_filter)
+            if base is None:
+                base = bases[spec.amount_filter] = _Base(*spec.amount_filter)
+            base.extremes = base.extremes or "min" in spec.measures or "max" in spec.measures
+            base.values = base.values or any(_percentile(m) is not None for m in spec.measures)
+        _scan(transactions, list(bases.values()), currency, rates)
+        for base in bases.values():
+            base.convert(currency, rates)
+        for spec in scanned:
+            base = bases[spec.amount_filter]
+            grain = _grain_for(spec)
+            records, scale = base.records() if grain == "day" else base.coarsened(grain)
+            results[spec.name] = _finish(spec, records, scale, grain)
+    return {name: results[name] for name in names}
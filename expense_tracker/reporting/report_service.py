@@ -3,47 +3,170 @@ from decimal import Decimal
 from datetime import date
 from pathlib import Path
 import csv
+import io
 import os
 import tempfile
+from typing import Callable, Iterable
 
-from expense_tracker.models.transaction import Transaction
-from expense_tracker.exceptions import StorageError
-from expense_tracker.config import ENCODING
+from expense_tracker.models.transaction import Transaction, from_decimal_parts, parse_currency
+from expense_tracker.reporting.rollup import Rollup
+from expense_tracker.reporting.table import TransactionTable
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.config import DEFAULT_CURRENCY, ENCODING, RATES_FILE
+from expense_tracker.instrumentation import timed
 
 
-class ReportGenerator:
-    def aggregate_by_month(self, transactions: list[Transaction]) -> dict[str, Decimal]:
-        agg: dict[str, Decimal] = {}
-        temp = defaultdict(Decimal)
-        for tx in transactions:
-            key = tx.date.strftime("%Y%m")
-            temp[key] += tx.amount
-        for k, v in temp.items():
-            agg[k] = v
-        return agg
-
-    def aggregate_by_category(self, transactions: list[Transaction], start: date | None = None, end: date | None = None) -> dict[str, Decimal]:
-        temp = defaultdict(Decimal)
-        for tx in transactions:
-            if start and tx.date < start:
+class TransactionStream:
+    """Report source for one pass over an iterator of transactions.
+
+    Memory is bounded by the number of groups, not rows.
+    """
+
+    def __init__(self, transactions: Iterable[Transaction]):
+        self.transactions = transactions
+
+    @staticmethod
+    def _totals(groups: dict, special: dict) -> dict[str, Decimal]:
+        # integer units per (group, exponent) add up to exactly what a
+        # row-by-row Decimal sum gives, exponent included
+        totals = {}
+        for key, parts in groups.items():
+            total = Decimal(0)
+            for exp, units in parts.items():
+                total += from_decimal_parts(units, exp)
+            totals[key] = total + special[key] if key in special else total
+        return totals
+
+    def _fold(self, key_of, keep=None) -> dict:
+        groups: dict = {}
+        special: dict = defaultdict(Decimal)
+        for tx in self.transactions:
+            if keep is not None and not keep(tx):
                 continue
-            if end and tx.date > end:
+            key = key_of(tx)
+            if tx.currency:
+                # see split_key
+                key = (key, tx.date, tx.currency)
+            parts = groups.get(key)
+            if parts is None:
+                parts = groups[key] = {}
+            try:
+                units, exp = tx.amount_parts()
+            except ValueError:
+                # NaN and infinities only exist as Decimals
+                special[key] += tx.amount
                 continue
-            temp[tx.category] += tx.amount
-        return dict(temp)
-
-    def export_report_csv(self, path: Path, rows: list[list], headers: list[str]):
-        path = Path(path)
-        if not path.parent.exists():
-            path.parent.mkdir(parents=True, exist_ok=True)
-        dirpath = path.parent
-        try:
-            with tempfile.NamedTemporaryFile("w", encoding=ENCODING, delete=False, dir=str(dirpath), newline="") as tmp:
-                writer = csv.writer(tmp)
-                writer.writerow(headers)
-                for r in rows:
-                    writer.writerow(r)
-                tmp_name = tmp.name
-            os.replace(tmp_name, str(path))
-        except Exception as ex:
-            raise StorageError(f"could not export report to {path}: {ex}")
+            parts[exp] = parts.get(exp, 0) + units
+        return self._totals(groups, special)
+
+    def aggregate_by_month(self) -> dict:
+        return self._fold(lambda tx: f"{tx.date.year:04d}{tx.date.month:02d}")
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        keep = None
+        if start or end:
+            keep = lambda tx: (not start or tx.date >= start) and (not end or tx.date <= end)
+        return self._fold(lambda tx: tx.category, keep)
+
+
+def as_source(transactions: Iterable[Transaction] | TransactionTable | Rollup):
+    """What aggregate_by_month/aggregate_by_category can be called on for `transactions`.
+
+    Their totals keep rows in other currencies apart, see split_key.
+    """
+    # tables, rollups and stores that push aggregation down (e.g. SQLite)
+    # all expose aggregate_by_month/aggregate_by_category themselves
+    if hasattr(transactions, "aggregate_by_month"):
+        return transactions
+    if isinstance(transactions, (list, tuple)):
+        return TransactionTable.from_transactions(transactions)
+    return TransactionStream(transactions)
+
+
+class ReportGenerator:
+    def __init__(self, currency: str | None = None, rates_path: Path | None = None):
+        # planned reports come out in `currency`; other amounts are converted
+        # with the dated rates in `rates_path`, read the first time a row needs them
+        self.currency = parse_currency(currency) or DEFAULT_CURRENCY
+        self.rates_path = Path(rates_path) if rates_path is not None else RATES_FILE
+        self._rates = None
+
+    def rates(self) -> "RateTable":
+        from expense_tracker.reporting.currency import load_rates
+
+        # read again only when the file changed, so the lookup cache survives between runs
+        self._rates = load_rates(self.rates_path, self._rates)
+        return self._rates
+
+    def converted(self, totals: dict) -> dict[str, Decimal]:
+        """Source `totals` in `currency`: each (key, date, currency) group is converted and added to its key."""
+        if self.currency != DEFAULT_CURRENCY:
+            # the totals of DEFAULT_CURRENCY rows no longer say which day they come from
+            raise ValidationError(f"totals by month or category are kept in {DEFAULT_CURRENCY}; use a report spec to report in {self.currency}")
+        foreign = [key for key in totals if type(key) is tuple]
+        if not foreign:
+            return totals
+        totals = dict(totals)
+        rates = self.rates()
+        for key in foreign:
+            group, day, currency = key
+            amount = rates.convert(totals.pop(key), day, currency, self.currency)
+            totals[group] = totals[group] + amount if group in totals else amount
+        return totals
+
+    @timed("report.aggregate_by_month")
+    def aggregate_by_month(self, transactions: Iterable[Transaction] | TransactionTable | Rollup) -> dict[str, Decimal]:
+        return self.converted(as_source(transactions).aggregate_by_month())
+
+    @timed("report.aggregate_by_category")
+    def aggregate_by_category(self, transactions: Iterable[Transaction] | TransactionTable | Rollup, start: date | None = None, end: date | None = None) -> dict[str, Decimal]:
+        return self.converted(as_source(transactions).aggregate_by_category(start, end))
+
+    @timed("report.run")
+    def run(self, specs: list["ReportSpec"], transactions: Iterable[Transaction], rollup: Callable[[], Rollup] | None = None) -> dict[str, "ReportResult"]:
+        # imported here: every store imports this module, most runs never plan a report
+        from expense_tracker.reporting.engine import run_reports
+
+        return run_reports(specs, transactions, rollup, self.currency, self.rates)
+
+    def run_for_store(self, store, specs: list["ReportSpec"]) -> dict[str, "ReportResult"]:
+        from expense_tracker.reporting.engine import scan_bounds
+
+        # a store that keeps rollups answers whole-month totals without reading
+        # rows; the rest is one scan over just the dates the specs ask for
+        rollup = store.rollup if getattr(store, "rollups", False) else None
+        return self.run(specs, store.iter_transactions(*scan_bounds(specs)), rollup)
+
+    @timed("report.export_csv")
+    def export_report_csv(self, path: Path, rows: Iterable[list], headers: list[str], compress: bool = False):
+        write_atomic(Path(path), render_csv(rows, headers), compress)
+
+    def export_batch(self, store, exports: list["ReportExport"], state_path: Path | None = None, force: bool = False) -> "ExportResult":
+        from expense_tracker.reporting.batch import export_reports
+
+        return export_reports(store, exports, state_path, force, reports=self)
+
+
+def render_csv(rows: Iterable[list], headers: list[str]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    return buf.getvalue().encode(ENCODING)
+
+
+def write_atomic(path: Path, data: bytes, compress: bool = False):
+    # temp file in the same directory, then os.replace: readers see the old file or the new one, never a partial one
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if compress:
+            import gzip
+
+            # mtime=0 keeps the bytes identical for identical reports
+            data = gzip.compress(data, mtime=0)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent)) as tmp:
+            tmp.write(data)
+            tmp_name = tmp.name
+        os.replace(tmp_name, str(path))
+    except Exception as ex:
+        raise StorageError(f"could not export report to {path}: {ex}")
@@ -0,0 +1,175 @@
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Iterable
+import hashlib
+import json
+import os
+import tempfile
+
+from expense_tracker.config import ENCODING
+from expense_tracker.exceptions import StorageError
+from expense_tracker.models.transaction import Transaction, parse_ymd
+
+ROLLUP_FORMAT = 3
+
+
+def month_key(d: date) -> str:
+    """The YYYYMM key rollups and budgets file a day's totals under."""
+    return f"{d.year:04d}{d.month:02d}"
+
+
+def split_key(key, tx: Transaction):
+    """The group `tx` adds to in report totals.
+
+    Rows in a currency other than DEFAULT_CURRENCY are kept apart under
+    (key, date, currency), for ReportGenerator to convert at that day's rate.
+    """
+    return (key, tx.date, tx.currency) if tx.currency else key
+
+
+class Rollup:
+    """Materialized per-month, per-category and per-month x category totals.
+
+    Each group holds [total, count]; the count lets a group disappear once
+    its last transaction is removed. The totals only hold DEFAULT_CURRENCY
+    rows; the others are kept in `foreign` per month x category, then per
+    (date, currency), so they can still be converted at each day's rate.
+    """
+
+    def __init__(self):
+        self.by_month: dict[str, list] = {}
+        self.by_category: dict[str, list] = {}
+        self.by_month_category: dict[tuple[str, str], list] = {}
+        self.foreign: dict[tuple[str, str], dict[tuple[date, str], list]] = {}
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> "Rollup":
+        rollup = cls()
+        for tx in transactions:
+            rollup.add(tx)
+        return rollup
+
+    @staticmethod
+    def _apply(groups: dict, key, amount: Decimal, count: int):
+        slot = groups.get(key)
+        if slot is None:
+            slot = groups[key] = [Decimal(0), 0]
+        slot[0] += amount
+        slot[1] += count
+        if slot[1] <= 0:
+            del groups[key]
+
+    def add_totals(self, month: str, category: str, amount: Decimal, count: int):
+        """Add `count` rows totalling `amount` to one month x category group; negative counts remove them."""
+        self._apply(self.by_month, month, amount, count)
+        self._apply(self.by_category, category, amount, count)
+        self._apply(self.by_month_category, (month, category), amount, count)
+
+    def add_foreign(self, month: str, category: str, day: date, currency: str, amount: Decimal, count: int):
+        days = self.foreign.setdefault((month, category), {})
+        self._apply(days, (day, currency), amount, count)
+        if not days:
+            del self.foreign[(month, category)]
+
+    def add(self, tx: Transaction):
+        if tx.currency:
+            self.add_foreign(month_key(tx.date), tx.category, tx.date, tx.currency, tx.amount, 1)
+        else:
+            self.add_totals(month_key(tx.date), tx.category, tx.amount, 1)
+
+    def remove(self, tx: Transaction):
+        if tx.currency:
+            self.add_foreign(month_key(tx.date), tx.category, tx.date, tx.currency, -tx.amount, -1)
+        else:
+            self.add_totals(month_key(tx.date), tx.category, -tx.amount, -1)
+
+    @staticmethod
+    def covers(start: date | None, end: date | None) -> bool:
+        # only whole months can be answered from the month x category totals
+        if start is not None and start.day != 1:
+            return False
+        if end is not None and end.day != monthrange(end.year, end.month)[1]:
+            return False
+        return True
+
+    def _with_foreign(self, totals: dict, group, lo: str = "", hi: str = "999999") -> dict:
+        # adds the foreign groups of the months in [lo, hi], see split_key
+        for (month, category), days in self.foreign.items():
+            if lo <= month <= hi:
+                key = group(month, category)
+                for (day, currency), (total, _) in days.items():
+                    split = (key, day, currency)
+                    totals[split] = totals[split] + total if split in totals else total
+        return totals
+
+    def aggregate_by_month(self) -> dict:
+        return self._with_foreign({k: v[0] for k, v in self.by_month.items()}, lambda month, _: month)
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        if start is None and end is None:
+            return self._with_foreign({k: v[0] for k, v in self.by_category.items()}, lambda _, category: category)
+        if not self.covers(start, end):
+            raise ValueError("rollup totals only cover whole months")
+        lo = month_key(start) if start else ""
+        hi = month_key(end) if end else "999999"
+        totals: dict = {}
+        for (month, category), (total, _) in self.by_month_category.items():
+            if lo <= month <= hi:
+                totals[category] = totals.get(category, Decimal(0)) + total
+        return self._with_foreign(totals, lambda _, category: category, lo, hi)
+
+    def month_category_totals(self, month: str, category: str) -> dict:
+        """One month of one category, split like aggregate_by_category."""
+        slot = self.by_month_category.get((month, category))
+        totals = {category: slot[0]} if slot else {}
+        for (day, currency), (total, _) in self.foreign.get((month, category), {}).items():
+            totals[(category, day, currency)] = total
+        return totals
+
+    def _payload(self) -> dict:
+        return {
+            "months": {k: [str(t), c] for k, (t, c) in self.by_month.items()},
+            "categories": {k: [str(t), c] for k, (t, c) in self.by_category.items()},
+            "month_categories": [[m, cat, str(t), c] for (m, cat), (t, c) in self.by_month_category.items()],
+            "foreign": [[m, cat, f"{d:%Y%m%d}", cur, str(t), c] for (m, cat), days in self.foreign.items() for (d, cur), (t, c) in days.items()],
+        }
+
+    @staticmethod
+    def _checksum(payload: dict) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode(ENCODING)).hexdigest()
+
+    def save(self, path: Path, source):
+        path = Path(path)
+        payload = self._payload()
+        document = {"format": ROLLUP_FORMAT, "source": source, "checksum": self._checksum(payload), "data": payload}
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding=ENCODING, delete=False, dir=str(path.parent)) as tmp:
+                json.dump(document, tmp)
+                tmp_name = tmp.name
+            os.replace(tmp_name, str(path))
+        except Exception as ex:
+            raise StorageError(f"could not write rollup {path}: {ex}")
+
+    @classmethod
+    def load(cls, path: Path, source) -> "Rollup | None":
+        # None means the sidecar is missing, stale or corrupt and must be rebuilt
+        try:
+            with Path(path).open("r", encoding=ENCODING) as fh:
+                document = json.load(fh)
+            if document.get("format") != ROLLUP_FORMAT or document.get("source") != source:
+                return None
+            payload = document["data"]
+            if cls._checksum(payload) != document.get("checksum"):
+                return None
+            rollup = cls()
+            rollup.by_month = {k: [Decimal(t), c] for k, (t, c) in payload["months"].items()}
+            rollup.by_category = {k: [Decimal(t), c] for k, (t, c) in payload["categories"].items()}
+            rollup.by_month_category = {(m, cat): [Decimal(t), c] for m, cat, t, c in payload["month_categories"]}
+            for m, cat, d, cur, t, c in payload["foreign"]:
+                rollup.foreign.setdefault((m, cat), {})[(parse_ymd(d), cur)] = [Decimal(t), c]
+            return rollup
+        except (OSError, ValueError, KeyError, TypeError, InvalidOperation):
+            return None
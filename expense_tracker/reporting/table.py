@@ -0,0 +1,177 @@
+from array import array
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Iterable
+import csv
+
+from expense_tracker.config import ENCODING, CSV_HEADER, CURRENCY_COLUMN
+from expense_tracker.exceptions import StorageError, ValidationError
+from expense_tracker.models.transaction import Transaction, decimal_parts, from_decimal_parts, parse_currency, parse_ymd
+from expense_tracker.utils import positional_rows, report_invalid_row
+
+
+def _to_decimal(units: int, scale: int, exponent: int) -> Decimal:
+    # A Decimal sum takes the smallest exponent of its terms (and of the
+    # Decimal(0) start value), so rebuild the total at exactly that exponent.
+    return from_decimal_parts(units // 10 ** (scale + exponent), exponent)
+
+
+class TransactionTable:
+    """Column-oriented copy of a ledger for fast group-by aggregation.
+
+    Dates are kept as ordinals and yyyymm codes, amounts as integer minor
+    units at a common scale, and months and categories are dictionary-encoded.
+    Rows in other currencies than DEFAULT_CURRENCY are kept aside in
+    `foreign` and come out of the aggregations apart, see split_key.
+    """
+
+    def __init__(self):
+        self.ordinals = array("l")
+        self.month_ids = array("L")
+        self.category_ids = array("L")
+        self.units: array | list = array("q")
+        self.exponents = array("h")
+        self.scale = 0
+        self.months: list[int] = []
+        self.categories: list[str] = []
+        self._month_lookup: dict[int, int] = {}
+        self._category_lookup: dict[str, int] = {}
+        # set by read-only tables that already know their exponents, e.g. snapshots
+        self.known_exponents: set[int] | None = None
+        self.foreign: list[tuple[date, str, str, Decimal]] = []
+
+    def __len__(self) -> int:
+        return len(self.ordinals) + len(self.foreign)
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> "TransactionTable":
+        table = cls()
+        add = table.add_parts
+        for tx in transactions:
+            if tx.currency:
+                table.foreign.append((tx.date, tx.category, tx.currency, tx.amount))
+                continue
+            units, exp = tx.amount_parts()
+            add(tx.date, units, exp, tx.category)
+        return table
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "TransactionTable":
+        path = Path(path)
+        table = cls()
+        if not path.exists():
+            return table
+        try:
+            with path.open("r", encoding=ENCODING, newline="") as fh:
+                reader = csv.reader(fh)
+                fieldnames = next(reader, None)
+                if fieldnames is None:
+                    return table
+                expected = CSV_HEADER + [CURRENCY_COLUMN] if CURRENCY_COLUMN in fieldnames else CSV_HEADER
+                for tx_id, date_s, amount_s, category, _, *currency in positional_rows(reader, fieldnames, expected):
+                    try:
+                        if not tx_id:
+                            raise ValueError("missing id in CSV row")
+                        currency = parse_currency(currency[0]) if currency else None
+                        if currency:
+                            table.foreign.append((parse_ymd(date_s or ""), category or "", currency, Decimal(amount_s or "")))
+                        else:
+                            table.add(parse_ymd(date_s or ""), Decimal(amount_s or ""), category or "")
+                    except (ValueError, InvalidOperation, ValidationError) as e:
+                        report_invalid_row(e)
+        except Exception as ex:
+            raise StorageError(f"could not read {path}: {ex}")
+        return table
+
+    def add(self, d: date, amount: Decimal, category: str):
+        units, exp = decimal_parts(amount)
+        self.add_parts(d, units, exp, category)
+
+    def add_parts(self, d: date, units: int, exp: int, category: str):
+        if -exp > self.scale:
+            self._rescale(-exp)
+        units *= 10 ** (self.scale + exp)
+        month = d.year * 100 + d.month
+        month_id = self._month_lookup.get(month)
+        if month_id is None:
+            month_id = self._month_lookup[month] = len(self.months)
+            self.months.append(month)
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            category_id = self._category_lookup[category] = len(self.categories)
+            self.categories.append(category)
+        try:
+            self.units.append(units)
+        except OverflowError:
+            self.units = list(self.units)
+            self.units.append(units)
+        self.ordinals.append(d.toordinal())
+        self.month_ids.append(month_id)
+        self.category_ids.append(category_id)
+        self.exponents.append(exp)
+
+    def _rescale(self, scale: int):
+        factor = 10 ** (scale - self.scale)
+        scaled = [u * factor for u in self.units]
+        try:
+            self.units = array("q", scaled)
+        except OverflowError:
+            self.units = scaled
+        self.scale = scale
+
+    def _group_sum(self, group_ids, n_groups: int, start: date | None, end: date | None) -> tuple[list[int], list[int], list[bool]]:
+        sums = [0] * n_groups
+        seen = [False] * n_groups
+        if start is None and end is None:
+            for g, u in zip(group_ids, self.units):
+                sums[g] += u
+            for g in set(group_ids):
+                seen[g] = True
+            rows = None
+        else:
+            lo = start.toordinal() if start else -1
+            hi = end.toordinal() if end else 1 << 62
+            rows = [i for i, o in enumerate(self.ordinals) if lo <= o <= hi]
+            units = self.units
+            for i in rows:
+                g = group_ids[i]
+                sums[g] += units[i]
+                seen[g] = True
+        distinct = self.known_exponents if self.known_exponents is not None else set(self.exponents)
+        # most ledgers use a single precision, which makes the exponent pass unnecessary
+        mins = [min(distinct, default=0)] * n_groups
+        if len(distinct) > 1:
+            mins = [0] * n_groups
+            exps = self.exponents
+            for i in (rows if rows is not None else range(len(exps))):
+                e = exps[i]
+                g = group_ids[i]
+                if e < mins[g]:
+                    mins[g] = e
+        return sums, mins, seen
+
+    def _with_foreign(self, totals: dict, group, start: date | None = None, end: date | None = None) -> dict:
+        for d, category, currency, amount in self.foreign:
+            if (start is None or d >= start) and (end is None or d <= end):
+                key = (group(d, category), d, currency)
+                totals[key] = totals[key] + amount if key in totals else amount
+        return totals
+
+    def aggregate_by_month(self) -> dict:
+        sums, mins, seen = self._group_sum(self.month_ids, len(self.months), None, None)
+        totals = {
+            f"{m // 100:04d}{m % 100:02d}": _to_decimal(s, self.scale, e)
+            for m, s, e, ok in zip(self.months, sums, mins, seen)
+            if ok
+        }
+        return self._with_foreign(totals, lambda d, _: f"{d.year:04d}{d.month:02d}")
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        sums, mins, seen = self._group_sum(self.category_ids, len(self.categories), start, end)
+        totals = {
+            c: _to_decimal(s, self.scale, e)
+            for c, s, e, ok in zip(self.categories, sums, mins, seen)
+            if ok
+        }
+        return self._with_foreign(totals, lambda _, category: category, start, end)
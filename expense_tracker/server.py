@@ -0,0 +1,271 @@
+# JSON API over one shared store, on asyncio streams from the standard
+# library. Requests are parsed on the event loop; every store call runs on a
+# thread pool, so a slow aggregation never stalls other connections, and
+# writes arriving together land in the store's group commit as one batch.
+import asyncio
+import json
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from expense_tracker.config import (
+    API_DEFAULT_PAGE_SIZE,
+    API_HOST,
+    API_MAX_BODY_BYTES,
+    API_MAX_PAGE_SIZE,
+    API_PORT,
+    API_READ_THREADS,
+    API_WRITE_THREADS,
+    DEFAULT_CURRENCY,
+    RATES_FILE,
+)
+from expense_tracker.exceptions import ConflictError, StorageError, ValidationError
+from expense_tracker.models.transaction import Transaction, parse_currency
+from expense_tracker.reporting import ReportGenerator
+from expense_tracker.reporting.engine import category_totals, monthly_totals
+from expense_tracker.utils import parse_date_ymd
+
+TX_FIELDS = ("date", "amount", "category", "description", "currency")
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _tx_json(tx: Transaction) -> dict:
+    # amounts stay strings so no precision is lost to JSON floats
+    return dict(tx.to_csv_row(), currency=tx.currency or DEFAULT_CURRENCY)
+
+
+def _int_param(params: dict, name: str, default: int, low: int, high: int | None = None) -> int:
+    raw = params.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}" if high else f"{name} must be at least {low}")
+    return value
+
+
+def _date_param(params: dict, name: str):
+    raw = params.get(name)
+    return parse_date_ymd(raw) if raw else None
+
+
+def _json_body(body: bytes) -> dict:
+    try:
+        # numbers keep their exact text, so 0.1 reaches Decimal as "0.1"
+        data = json.loads(body or b"{}", parse_float=str, parse_int=str)
+    except (UnicodeDecodeError, json.JSONDecodeError) as ex:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"invalid JSON body: {ex}")
+    if not isinstance(data, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+    for key, value in data.items():
+        if value is not None and not isinstance(value, str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} must be a string or number")
+    return data
+
+
+class ApiServer:
+    """Serves the ledger in `store` over HTTP/1.1 with keep-alive.
+
+    Routes:
+      GET    /transactions?start=&end=&category=&q=&page=&page_size=
+      POST   /transactions
+      GET    /transactions/{id}
+      PATCH  /transactions/{id}
+      DELETE /transactions/{id}
+      GET    /reports/monthly?currency=
+      GET    /reports/category?start=&end=&currency=
+    """
+
+    def __init__(self, store, read_threads: int = API_READ_THREADS, write_threads: int = API_WRITE_THREADS):
+        self.store = store
+        self.rates_path = store.path.with_name(RATES_FILE.name)
+        self.reports = ReportGenerator(rates_path=self.rates_path)
+        # one generator per reporting currency asked for, each with its rate cache
+        self._converting: dict[str, ReportGenerator] = {}
+        # writers get their own, larger pool: each one blocks until its group
+        # commit lands, and reads must not queue behind them
+        self._readers = ThreadPoolExecutor(read_threads, thread_name_prefix="api-read")
+        self._writers = ThreadPoolExecutor(write_threads, thread_name_prefix="api-write")
+
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+
+    async def _write(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._writers, fn, *args)
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, object]:
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = [unquote(s) for s in url.path.strip("/").split("/")]
+        try:
+            if path == ["transactions"]:
+                if method == "GET":
+                    return HTTPStatus.OK, await self.list_transactions(params)
+                if method == "POST":
+                    return HTTPStatus.CREATED, await self.add_transaction(_json_body(body))
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on /transactions")
+            if len(path) == 2 and path[0] == "transactions" and path[1]:
+                if method == "GET":
+                    return HTTPStatus.OK, _tx_json(await self._existing(path[1]))
+                if method == "PATCH":
+                    return HTTPStatus.OK, await self.edit_transaction(path[1], _json_body(body))
+                if method == "DELETE":
+                    await self.delete_transaction(path[1])
+                    return HTTPStatus.NO_CONTENT, None
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on /transactions/{{id}}")
+            if len(path) == 2 and path[0] == "reports" and path[1] in ("monthly", "category"):
+                if method != "GET":
+                    raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on reports")
+                rows = await self._read(self.report_rows, path[1], _date_param(params, "start"), _date_param(params, "end"), params.get("currency"))
+                return HTTPStatus.OK, {"rows": rows}
+            raise HttpError(HTTPStatus.NOT_FOUND, f"no route for {url.path}")
+        except HttpError as ex:
+            return ex.status, {"error": str(ex)}
+        except ValidationError as ex:
+            return HTTPStatus.BAD_REQUEST, {"error": str(ex)}
+        except ConflictError as ex:
+            return HTTPStatus.CONFLICT, {"error": str(ex)}
+        except StorageError as ex:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(ex)}
+        except Exception:
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}
+
+    async def _existing(self, tx_id: str) -> Transaction:
+        tx = await self._read(self.store.get, tx_id)
+        if tx is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"transaction {tx_id} not found")
+        return tx
+
+    async def list_transactions(self, params: dict) -> dict:
+        page = _int_param(params, "page", 1, 1)
+        page_size = _int_param(params, "page_size", API_DEFAULT_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+        start, end = _date_param(params, "start"), _date_param(params, "end")
+        if params.get("q"):
+            matches = await self._read(self.store.search, params["q"], start, end, params.get("category") or None)
+        else:
+            matches = await self._read(self.store.query, start, end, params.get("category") or None)
+        first = (page - 1) * page_size
+        return {
+            "items": [_tx_json(tx) for tx in matches[first:first + page_size]],
+            "page": page,
+            "page_size": page_size,
+            "total": len(matches),
+        }
+
+    async def add_transaction(self, data: dict) -> dict:
+        missing = [f for f in ("date", "amount", "category") if not data.get(f)]
+        if missing:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"missing fields: {', '.join(missing)}")
+        tx = Transaction.from_input(data["date"], data["amount"], data["category"], data.get("description") or "", id=data.get("id"), currency=data.get("currency"))
+        # a client-chosen id must be new; the store checks it under its write lock
+        await self._write(lambda: self.store.append(tx, unique=bool(data.get("id"))))
+        return _tx_json(tx)
+
+    async def edit_transaction(self, tx_id: str, data: dict) -> dict:
+        old = await self._existing(tx_id)
+        current = _tx_json(old)
+        fields = {f: current[f] if data.get(f) is None else data[f] for f in TX_FIELDS}
+        tx = Transaction.from_input(fields["date"], fields["amount"], fields["category"], fields["description"], id=old.id, currency=fields["currency"])
+        # a concurrent edit of the same record makes this a 409, not a lost update
+        await self._write(lambda: self.store.update(tx, expected=old))
+        return _tx_json(tx)
+
+    async def delete_transaction(self, tx_id: str):
+        old = await self._existing(tx_id)
+        await self._write(lambda: self.store.delete(tx_id, expected=old))
+
+    def report_rows(self, kind: str, start, end, currency: str | None = None) -> list[dict]:
+        spec = monthly_totals() if kind == "monthly" else category_totals(start, end)
+        currency = parse_currency(currency)
+        reports = self.reports
+        if currency is not None:
+            reports = self._converting.get(currency) or self._converting.setdefault(currency, ReportGenerator(currency, self.rates_path))
+        result = reports.run_for_store(self.store, [spec])[spec.name]
+        return [dict(zip(result.headers, row)) for row in result.text_rows()]
+
+    @staticmethod
+    def _response(status: HTTPStatus, payload, keep_alive: bool) -> bytes:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        head = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            head.append("Content-Type: application/json")
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+                    writer.write(self._response(HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False))
+                    break
+                method, target, version = parts
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                if "transfer-encoding" in headers:
+                    writer.write(self._response(HTTPStatus.NOT_IMPLEMENTED, {"error": "send a Content-Length body"}, False))
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > API_MAX_BODY_BYTES:
+                    status = HTTPStatus.BAD_REQUEST if length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    writer.write(self._response(status, {"error": "bad Content-Length"}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method.upper(), target, body)
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # client went away mid-request, or sent a line over the stream limit
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve_forever(self, host: str = API_HOST, port: int = API_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        addresses = ", ".join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+        print(f"Serving {self.store.path} on {addresses}", file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        self._writers.shutdown(wait=True)
+
+
+def serve(store, host: str = API_HOST, port: int = API_PORT):
+    """Run the API until interrupted; the caller still owns and closes `store`."""
+    api = ApiServer(store)
+    try:
+        asyncio.run(api.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
@@ -1,3 +1,5 @@
 from .csv_storage import StorageManager
+from .sqlite_storage import SqliteStorageManager
+from .partitioned import PartitionedStorageManager
 
-__all__ = ["StorageManager"]
+__all__ = ["StorageManager", "SqliteStorageManager", "PartitionedStorageManager"]
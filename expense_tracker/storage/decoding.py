@@ -0,0 +1,54 @@
+from typing import Callable, Iterable, Iterator, List
+
+from expense_tracker.config import CSV_HEADER, CURRENCY_COLUMN, JOURNAL_HEADER
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.exceptions import ValidationError
+from expense_tracker.instrumentation import count, timed
+from expense_tracker.utils import positional_rows, report_invalid_row
+
+OP_UPSERT = "U"
+OP_DELETE = "D"
+
+
+def _expected(header: list[str], fieldnames: list[str]) -> list[str]:
+    # files written before currencies existed have no column for them and
+    # keep being read through the positional fast path
+    return header + [CURRENCY_COLUMN] if CURRENCY_COLUMN in fieldnames else header
+
+
+def iter_decode_transactions(rows: Iterable[list[str]], fieldnames: list[str], report: Callable[[Exception], None] = report_invalid_row) -> Iterator[Transaction]:
+    make = Transaction.from_csv_fields
+    parsed = 0
+    try:
+        for fields in positional_rows(rows, fieldnames, _expected(CSV_HEADER, fieldnames)):
+            try:
+                tx = make(*fields)
+            except ValidationError as e:
+                report(e)
+                continue
+            parsed += 1
+            yield tx
+    finally:
+        count("rows.parsed", parsed)
+
+
+@timed("decode.transactions")
+def decode_transactions(rows: Iterable[list[str]], fieldnames: list[str], report: Callable[[Exception], None] = report_invalid_row) -> List[Transaction]:
+    return list(iter_decode_transactions(rows, fieldnames, report))
+
+
+def decode_journal_ops(rows: Iterable[list[str]], fieldnames: list[str]) -> list[tuple[str, str, Transaction | None]]:
+    ops: list[tuple[str, str, Transaction | None]] = []
+    make = Transaction.from_csv_fields
+    for op, *fields in positional_rows(rows, fieldnames, _expected(JOURNAL_HEADER[:-1], fieldnames)):
+        tx_id = fields[0]
+        try:
+            if op == OP_DELETE and tx_id:
+                ops.append((op, tx_id, None))
+            elif op == OP_UPSERT:
+                ops.append((op, tx_id, make(*fields)))
+            else:
+                raise ValidationError(f"unknown op '{op}'")
+        except ValidationError as e:
+            report_invalid_row(e, "journal record")
+    return ops
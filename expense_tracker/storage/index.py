@@ -0,0 +1,79 @@
+from bisect import bisect_left
+from datetime import date
+from itertools import count
+from typing import Iterable, List
+
+from expense_tracker.models.transaction import Transaction
+
+
+class _SortedRun:
+    """Transactions kept sorted by (date ordinal, insertion sequence)."""
+
+    def __init__(self):
+        self.keys: list[tuple[int, int]] = []
+        self.txs: List[Transaction] = []
+
+    def insert(self, key: tuple[int, int], tx: Transaction):
+        pos = bisect_left(self.keys, key)
+        self.keys.insert(pos, key)
+        self.txs.insert(pos, tx)
+
+    def remove(self, key: tuple[int, int]):
+        pos = bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            del self.keys[pos]
+            del self.txs[pos]
+
+    def between(self, start: date | None, end: date | None) -> List[Transaction]:
+        lo = bisect_left(self.keys, (start.toordinal(),)) if start else 0
+        hi = bisect_left(self.keys, (end.toordinal() + 1,)) if end else len(self.keys)
+        return self.txs[lo:hi]
+
+
+class DateIndex:
+    """Date-sorted view of a ledger with a per-category secondary index.
+
+    Range lookups bisect the sorted keys, so they cost O(log n + k).
+    Categories are matched case-insensitively, like the list filter.
+    """
+
+    def __init__(self, transactions: Iterable[Transaction] = ()):
+        self._seq = count()
+        self._all = _SortedRun()
+        self._by_category: dict[str, _SortedRun] = {}
+        self._keys: dict[str, tuple[int, int]] = {}
+        pairs = [((tx.date.toordinal(), next(self._seq)), tx) for tx in transactions]
+        pairs.sort(key=lambda p: p[0])
+        for key, tx in pairs:
+            self._keys[tx.id] = key
+            self._all.keys.append(key)
+            self._all.txs.append(tx)
+            run = self._by_category.setdefault(tx.category.lower(), _SortedRun())
+            run.keys.append(key)
+            run.txs.append(tx)
+
+    def __len__(self) -> int:
+        return len(self._all.keys)
+
+    def add(self, tx: Transaction):
+        key = (tx.date.toordinal(), next(self._seq))
+        self._keys[tx.id] = key
+        self._all.insert(key, tx)
+        self._by_category.setdefault(tx.category.lower(), _SortedRun()).insert(key, tx)
+
+    def remove(self, tx: Transaction):
+        key = self._keys.pop(tx.id, None)
+        if key is None:
+            return
+        self._all.remove(key)
+        run = self._by_category.get(tx.category.lower())
+        if run is not None:
+            run.remove(key)
+            if not run.keys:
+                del self._by_category[tx.category.lower()]
+
+    def query(self, start: date | None = None, end: date | None = None, category: str | None = None) -> List[Transaction]:
+        if category:
+            run = self._by_category.get(category.lower())
+            return run.between(start, end) if run is not None else []
+        return self._all.between(start, end)
@@ -0,0 +1,67 @@
+import time
+from pathlib import Path
+
+from expense_tracker.config import LOCK_TIMEOUT_S
+from expense_tracker.exceptions import StorageError
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks (Windows): writers are then only serialized within a process
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive advisory lock held on a sidecar file by whichever process is writing.
+
+    Re-entrant for its holder, so a write that calls another write (extend
+    calling save, say) takes it once. Not thread-safe on its own; the
+    storage managers only touch it while holding their own RLock.
+    """
+
+    def __init__(self, path: Path, timeout: float = LOCK_TIMEOUT_S):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._fh = None
+        self._depth = 0
+
+    def acquire(self):
+        if self._depth:
+            self._depth += 1
+            return
+        if fcntl is not None:
+            try:
+                fh = self.path.open("ab")
+            except OSError as ex:
+                raise StorageError(f"could not open lock file {self.path}: {ex}")
+            deadline = time.monotonic() + self.timeout
+            delay = 0.001
+            while True:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        fh.close()
+                        raise StorageError(f"timed out after {self.timeout:g}s waiting for {self.path}")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.05)
+            self._fh = fh
+        self._depth = 1
+
+    def release(self):
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0 and self._fh is not None:
+            # closing the handle drops the lock; the file itself stays for the next writer
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
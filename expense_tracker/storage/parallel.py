@@ -0,0 +1,186 @@
+import csv
+import io
+import os
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+from expense_tracker.config import ENCODING, PARALLEL_WORKERS
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.exceptions import StorageError
+from expense_tracker.storage.decoding import iter_decode_transactions
+from expense_tracker.reporting.report_service import TransactionStream
+from expense_tracker.reporting.rollup import split_key
+
+
+def _workers(workers: int | None) -> int:
+    return max(1, workers or PARALLEL_WORKERS or os.cpu_count() or 1)
+
+
+def read_header(path: Path) -> tuple[list[str] | None, int]:
+    # the header row and the byte offset where data rows begin
+    with Path(path).open("rb") as fh:
+        line = fh.readline()
+        while line and not line.strip():
+            line = fh.readline()
+        if not line:
+            return None, fh.tell()
+        return next(csv.reader([line.decode(ENCODING)])), fh.tell()
+
+
+def _last_line_end(fh, size: int) -> int:
+    # offset just past the last newline; a trailing partial record is left for later
+    pos = size
+    while pos > 0:
+        block = min(1 << 16, pos)
+        fh.seek(pos - block)
+        idx = fh.read(block).rfind(b"\n")
+        if idx >= 0:
+            return pos - block + idx + 1
+        pos -= block
+    return 0
+
+
+def _quotes(data: bytes) -> int:
+    return data.count(b'"') & 1
+
+
+def chunk_ranges(path: Path, parts: int, start: int = 0) -> list[tuple[int, int]]:
+    # Split [start, last newline) into byte ranges that each end at a record
+    # boundary. A newline ends a record only after an even number of quote
+    # characters (escaped quotes come in pairs), so a quoted description
+    # spanning lines stays in one range; the quotes are counted on the way.
+    with Path(path).open("rb") as fh:
+        size = _last_line_end(fh, os.path.getsize(path))
+        if size <= start:
+            return []
+        step = max(1, (size - start) // parts)
+        bounds = [start]
+        fh.seek(start)
+        odd = 0
+        for i in range(1, parts):
+            ahead = start + i * step - fh.tell()
+            while ahead > 0:
+                block = fh.read(min(ahead, 1 << 20))
+                odd ^= _quotes(block)
+                ahead -= len(block)
+            line = fh.readline()
+            odd ^= _quotes(line)
+            while odd and line:
+                # that newline was inside a quoted field
+                line = fh.readline()
+                odd ^= _quotes(line)
+            pos = fh.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _read_range(path: str, lo: int, hi: int, fieldnames: list[str]):
+    with open(path, "rb") as fh:
+        fh.seek(lo)
+        data = fh.read(hi - lo)
+    return iter_decode_transactions(csv.reader(io.StringIO(data.decode(ENCODING), newline="")), fieldnames)
+
+
+def _apply_overrides(txs, overrides: dict[str, Transaction | None], seen: set[str]):
+    for tx in txs:
+        if overrides and tx.id in overrides:
+            seen.add(tx.id)
+            tx = overrides[tx.id]
+            if tx is None:
+                continue
+        yield tx
+
+
+def _load_range(path: str, lo: int, hi: int, fieldnames: list[str]) -> List[Transaction]:
+    return list(_read_range(path, lo, hi, fieldnames))
+
+
+def _aggregate_range(path: str, lo: int, hi: int, fieldnames: list[str], kind: str, start: date | None, end: date | None, overrides: dict):
+    seen: set[str] = set()
+    stream = TransactionStream(_apply_overrides(_read_range(path, lo, hi, fieldnames), overrides, seen))
+    partial = stream.aggregate_by_month() if kind == "month" else stream.aggregate_by_category(start, end)
+    return partial, seen
+
+
+def parallel_load(path: Path, workers: int | None = None) -> tuple[List[Transaction], list[str] | None, int]:
+    """Parse the CSV in newline-aligned chunks across processes.
+
+    Returns the transactions in file order, the header and the byte offset
+    parsed up to.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    path = Path(path)
+    try:
+        fieldnames, data_start = read_header(path)
+        if fieldnames is None:
+            return [], None, data_start
+        ranges = chunk_ranges(path, _workers(workers), data_start)
+        with ProcessPoolExecutor(max_workers=len(ranges) or 1) as pool:
+            parts = pool.map(_load_range, *zip(*[(str(path), lo, hi, fieldnames) for lo, hi in ranges])) if ranges else []
+            txs: List[Transaction] = []
+            for part in parts:
+                txs.extend(part)
+    except StorageError:
+        raise
+    except Exception as ex:
+        raise StorageError(f"could not read {path}: {ex}")
+    return txs, fieldnames, ranges[-1][1] if ranges else data_start
+
+
+class ParallelScan:
+    """Report source that aggregates a CSV ledger with one process per chunk.
+
+    Each worker returns partial totals for its byte range; merging them in
+    file order gives exactly the serial ReportGenerator results.
+    """
+
+    def __init__(self, path: Path, overrides: dict[str, Transaction | None] | None = None, workers: int | None = None):
+        self.path = Path(path)
+        self.overrides = overrides or {}
+        self.workers = _workers(workers)
+
+    def _run(self, kind: str, start: date | None = None, end: date | None = None) -> dict:
+        # imported here: multiprocessing is costly to import and most runs never fork
+        from concurrent.futures import ProcessPoolExecutor
+
+        try:
+            fieldnames, data_start = read_header(self.path)
+            ranges = chunk_ranges(self.path, self.workers, data_start) if fieldnames else []
+            merged: dict = defaultdict(Decimal)
+            seen: set[str] = set()
+            if ranges:
+                jobs = [(str(self.path), lo, hi, fieldnames, kind, start, end, self.overrides) for lo, hi in ranges]
+                with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                    for partial, part_seen in pool.map(_aggregate_range, *zip(*jobs)):
+                        for key, total in partial.items():
+                            merged[key] += total
+                        seen |= part_seen
+        except FileNotFoundError:
+            merged, seen = defaultdict(Decimal), set()
+        except StorageError:
+            raise
+        except Exception as ex:
+            raise StorageError(f"could not read {self.path}: {ex}")
+        # journal upserts for ids that are not in the CSV are new rows at the end
+        for tx_id, tx in self.overrides.items():
+            if tx is None or tx_id in seen:
+                continue
+            if kind == "month":
+                merged[split_key(f"{tx.date.year:04d}{tx.date.month:02d}", tx)] += tx.amount
+            elif (not start or tx.date >= start) and (not end or tx.date <= end):
+                merged[split_key(tx.category, tx)] += tx.amount
+        return dict(merged)
+
+    def aggregate_by_month(self) -> dict:
+        return self._run("month")
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        return self._run("category", start, end)
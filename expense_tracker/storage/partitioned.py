@@ -0,0 +1,408 @@
+import json
+import os
+import tempfile
+import threading
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List
+
+from expense_tracker.config import ENCODING, LOCK_SUFFIX, PARALLEL_THRESHOLD_BYTES, PARALLEL_WORKERS, PARTITION_GRANULARITY, PARTITION_MANIFEST
+from expense_tracker.exceptions import ConflictError, StorageError
+from expense_tracker.instrumentation import count, timed
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.reporting.report_service import as_source
+from expense_tracker.reporting.rollup import Rollup
+from expense_tracker.storage.csv_storage import StorageManager, _file_signature
+from expense_tracker.storage.locking import FileLock
+from expense_tracker.storage.parallel import _workers
+
+MANIFEST_FORMAT = 1
+GRANULARITIES = ("month", "year")
+
+
+def partition_key(d: date, granularity: str) -> str:
+    return f"{d.year:04d}-{d.month:02d}" if granularity == "month" else f"{d.year:04d}"
+
+
+def partition_bounds(key: str) -> tuple[date, date]:
+    # first and last day a partition can hold
+    year = int(key[:4])
+    if len(key) == 4:
+        return date(year, 1, 1), date(year, 12, 31)
+    month = int(key[5:7])
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def _clip(first: date, last: date, start: date | None, end: date | None) -> tuple[date | None, date | None] | None:
+    # None when [first, last] lies outside the range, else the bounds still
+    # needed inside it; a partition wholly inside the range needs none
+    if (start is not None and last < start) or (end is not None and first > end):
+        return None
+    return (start if start is not None and start > first else None, end if end is not None and end < last else None)
+
+
+def _open_partition(path: str, options: dict) -> StorageManager:
+    # in a worker: the partition as the parent opens it, without forking again
+    return StorageManager(Path(path), **{**options, "parallel_workers": 1})
+
+
+def _load_partition(path: str, options: dict) -> List[Transaction]:
+    return _open_partition(path, options).load()
+
+
+def _aggregate(source, kind: str, start: date | None, end: date | None) -> dict:
+    # totals as the source gives them; the caller's ReportGenerator converts currencies
+    source = as_source(source)
+    return source.aggregate_by_month() if kind == "month" else source.aggregate_by_category(start, end)
+
+
+def _aggregate_partition(path: str, options: dict, kind: str, start: date | None, end: date | None) -> dict:
+    return _aggregate(_open_partition(path, options).report_source(start, end), kind, start, end)
+
+
+class PartitionedScan:
+    """Report source over a set of partitions, given as (store, first day, last day).
+
+    A category report skips partitions outside its range and passes no
+    bounds to those wholly inside it, so their rollups can answer; only
+    the partitions at the edges filter rows. With more than one worker
+    every partition file is aggregated in its own process, opened there
+    with the same StorageManager `options`.
+    """
+
+    def __init__(self, parts: list[tuple[StorageManager, date, date]], workers: int = 1, options: dict | None = None):
+        self.parts = parts
+        self.workers = workers
+        self.options = options or {}
+
+    def _run(self, kind: str, start: date | None = None, end: date | None = None) -> dict:
+        jobs = []
+        for store, first, last in self.parts:
+            bounds = _clip(first, last, start, end)
+            if bounds is not None:
+                jobs.append((store, *bounds))
+        if self.workers > 1 and len(jobs) > 1:
+            # imported here: multiprocessing is costly to import and most runs never fork
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                partials = list(pool.map(_aggregate_partition, *zip(*[(str(store.path), self.options, kind, lo, hi) for store, lo, hi in jobs])))
+        else:
+            partials = [_aggregate(store.report_source(lo, hi), kind, lo, hi) for store, lo, hi in jobs]
+        merged: dict = defaultdict(Decimal)
+        for partial in partials:
+            for key, total in partial.items():
+                merged[key] += total
+        return dict(merged)
+
+    def aggregate_by_month(self) -> dict:
+        return self._run("month")
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        return self._run("category", start, end)
+
+
+class PartitionedStorageManager:
+    """A ledger split by date into one CSV per month (or year) under a directory.
+
+    Every partition is a StorageManager of its own, built with `options`, so
+    a write journals or rewrites only the partition that holds the row, and
+    queries and reports open only the partitions their date range overlaps.
+    `manifest.json` records the granularity, which wins over the argument
+    once the directory exists, and the partitions. Writes that span
+    partitions (save, extend, an edit that moves a row to another month)
+    are atomic per partition, not across them.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        granularity: str = PARTITION_GRANULARITY,
+        parallel_workers: int | None = PARALLEL_WORKERS,
+        parallel_threshold: int | None = PARALLEL_THRESHOLD_BYTES,
+        **options,
+    ):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        self.path = Path(path)
+        self.manifest_path = self.path / PARTITION_MANIFEST
+        self.granularity = granularity
+        self.parallel_workers = parallel_workers
+        self.parallel_threshold = parallel_threshold
+        self.options = options
+        self._lock = threading.RLock()
+        # held while the manifest is read-modified-written, across processes
+        self._manifest_lock = FileLock(self.path / (PARTITION_MANIFEST + LOCK_SUFFIX))
+        self._keys: list[str] = []
+        self._manifest_signature: tuple[int, int, int] | None = None
+        self._partitions: dict[str, StorageManager] = {}
+        # handed to every partition, which reports its own writes
+        self._watchers: list[Callable] = []
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+        except OSError as ex:
+            raise StorageError(f"could not create {self.path}: {ex}")
+        self._refresh_manifest(force=True)
+
+    def _refresh_manifest(self, force: bool = False):
+        # another process may have added partitions since we last looked
+        signature = _file_signature(self.manifest_path)
+        if signature == self._manifest_signature and not force:
+            return
+        keys: list[str] = []
+        if signature is not None:
+            try:
+                with self.manifest_path.open("r", encoding=ENCODING) as fh:
+                    document = json.load(fh)
+                if document.get("format") != MANIFEST_FORMAT or document.get("granularity") not in GRANULARITIES:
+                    raise StorageError(f"unsupported manifest {self.manifest_path}")
+                self.granularity = document["granularity"]
+                keys = sorted(document["partitions"])
+            except (OSError, ValueError, KeyError, TypeError) as ex:
+                raise StorageError(f"could not read {self.manifest_path}: {ex}")
+        self._keys = keys
+        self._manifest_signature = signature
+
+    def _write_manifest(self, keys: list[str]):
+        document = {"format": MANIFEST_FORMAT, "granularity": self.granularity, "partitions": keys}
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding=ENCODING, delete=False, dir=str(self.path)) as tmp:
+                json.dump(document, tmp, indent=1)
+                tmp_name = tmp.name
+            os.replace(tmp_name, str(self.manifest_path))
+        except Exception as ex:
+            raise StorageError(f"could not write {self.manifest_path}: {ex}")
+        self._keys = keys
+        self._manifest_signature = _file_signature(self.manifest_path)
+
+    def _add_partitions(self, keys: Iterable[str]):
+        # listed before any row is written to them, so the manifest never misses data
+        keys = set(keys)
+        if keys.issubset(self._keys):
+            return
+        with self._lock, self._manifest_lock:
+            self._refresh_manifest()
+            if not keys.issubset(self._keys):
+                self._write_manifest(sorted(keys.union(self._keys)))
+
+    def partition_path(self, key: str) -> Path:
+        return self.path / f"{key}.csv"
+
+    def _partition(self, key: str) -> StorageManager:
+        store = self._partitions.get(key)
+        if store is None:
+            with self._lock:
+                store = self._partitions.get(key)
+                if store is None:
+                    store = self._partitions[key] = StorageManager(self.partition_path(key), **self.options)
+                    for watcher in self._watchers:
+                        store.watch(watcher)
+        return store
+
+    def _overlapping(self, start: date | None, end: date | None) -> list[tuple[str, date | None, date | None]]:
+        # the partitions a range touches, each with the bounds still needed inside it
+        self._refresh_manifest()
+        parts = []
+        for key in self._keys:
+            bounds = _clip(*partition_bounds(key), start, end)
+            if bounds is None:
+                count("partitioned.pruned")
+                continue
+            parts.append((key, *bounds))
+        return parts
+
+    def _should_parallelize(self, keys: list[str]) -> bool:
+        if self.parallel_threshold is None or len(keys) < 2 or _workers(self.parallel_workers) == 1:
+            return False
+        size = 0
+        for key in keys:
+            sig = _file_signature(self.partition_path(key))
+            size += sig[1] if sig else 0
+        return size >= self.parallel_threshold
+
+    def _locate(self, tx_id: str, *hints: Transaction | None) -> tuple[str, Transaction] | None:
+        # a row lives in the partition of its date, so any known date finds it
+        # at once; otherwise look through the partitions, newest first
+        self._refresh_manifest()
+        keys = [partition_key(h.date, self.granularity) for h in hints if h is not None]
+        for key in dict.fromkeys(keys + self._keys[::-1]):
+            if key not in self._keys:
+                continue
+            tx = self._partition(key).get(tx_id)
+            if tx is not None:
+                return key, tx
+        return None
+
+    @timed("partitioned.load")
+    def load(self) -> List[Transaction]:
+        keys = [key for key, _, _ in self._overlapping(None, None)]
+        cold = [key for key in keys if key not in self._partitions]
+        txs: List[Transaction] = []
+        if len(cold) == len(keys) and self._should_parallelize(keys):
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(_workers(self.parallel_workers), len(keys))) as pool:
+                for part in pool.map(_load_partition, [str(self.partition_path(key)) for key in keys], [self.options] * len(keys)):
+                    txs.extend(part)
+            return txs
+        for key in keys:
+            txs.extend(self._partition(key).load())
+        return txs
+
+    def count(self) -> int:
+        return sum(self._partition(key).count() for key, _, _ in self._overlapping(None, None))
+
+    def get(self, tx_id: str) -> Transaction | None:
+        found = self._locate(tx_id)
+        return found[1] if found else None
+
+    def iter_transactions(self, start: date | None = None, end: date | None = None, category: str | None = None) -> Iterator[Transaction]:
+        for key, lo, hi in self._overlapping(start, end):
+            yield from self._partition(key).iter_transactions(lo, hi, category)
+
+    @timed("partitioned.query")
+    def query(self, start: date | None = None, end: date | None = None, category: str | None = None) -> List[Transaction]:
+        txs: List[Transaction] = []
+        for key, lo, hi in self._overlapping(start, end):
+            txs.extend(self._partition(key).query(lo, hi, category))
+        return txs
+
+    @timed("partitioned.search")
+    def search(self, text: str, start: date | None = None, end: date | None = None, category: str | None = None) -> List[Transaction]:
+        # partitions come in date order, so their date-sorted hits concatenate in order
+        txs: List[Transaction] = []
+        for key, lo, hi in self._overlapping(start, end):
+            txs.extend(self._partition(key).search(text, lo, hi, category))
+        return txs
+
+    def month_category_totals(self, month: str, category: str) -> dict:
+        key = partition_key(date(int(month[:4]), int(month[4:]), 1), self.granularity)
+        self._refresh_manifest()
+        if key not in self._keys:
+            return {}
+        return self._partition(key).month_category_totals(month, category)
+
+    def watch(self, callback: Callable[[list[tuple[Transaction | None, Transaction | None]]], None]):
+        # an edit that moves a row across partitions is reported as an add to the new one, then a delete from the old
+        with self._lock:
+            self._watchers.append(callback)
+            for store in self._partitions.values():
+                store.watch(callback)
+
+    def input_signature(self, start: date | None = None, end: date | None = None) -> list:
+        # only the partitions the range overlaps; writes to other months leave it unchanged
+        return [[key, self._partition(key).input_signature()] for key, _, _ in self._overlapping(start, end)]
+
+    def report_source(self, start: date | None = None, end: date | None = None) -> PartitionedScan:
+        parts = self._overlapping(start, end)
+        # rollups answer whole partitions without reading rows; forking only pays off without them
+        parallel = not self.options.get("rollups") and self._should_parallelize([key for key, _, _ in parts])
+        return PartitionedScan([(self._partition(key), *partition_bounds(key)) for key, _, _ in parts], _workers(self.parallel_workers) if parallel else 1, self.options)
+
+    @property
+    def rollups(self) -> bool:
+        return bool(self.options.get("rollups"))
+
+    def enable_rollups(self):
+        with self._lock:
+            self.options["rollups"] = True
+            for store in self._partitions.values():
+                store.enable_rollups()
+
+    def rollup(self) -> Rollup:
+        # partitions hold disjoint dates, so their totals simply add up
+        merged = Rollup()
+        for key, _, _ in self._overlapping(None, None):
+            part = self._partition(key).rollup()
+            for name in ("by_month", "by_category", "by_month_category"):
+                groups = getattr(merged, name)
+                for group, (total, n) in getattr(part, name).items():
+                    slot = groups.setdefault(group, [Decimal(0), 0])
+                    slot[0] += total
+                    slot[1] += n
+            # keyed by month first, so no two partitions share a key
+            merged.foreign.update(part.foreign)
+        return merged
+
+    def _grouped(self, transactions: Iterable[Transaction]) -> dict[str, List[Transaction]]:
+        groups: dict[str, List[Transaction]] = defaultdict(list)
+        for tx in transactions:
+            groups[partition_key(tx.date, self.granularity)].append(tx)
+        return groups
+
+    @timed("partitioned.save")
+    def save(self, transactions: List[Transaction]):
+        with self._lock:
+            groups = self._grouped(transactions)
+            self._add_partitions(groups)
+            for key in self._keys:
+                self._partition(key).save(groups.get(key, []))
+
+    def append(self, transaction: Transaction, unique: bool = False):
+        key = partition_key(transaction.date, self.granularity)
+        self._add_partitions([key])
+        if not unique:
+            self._partition(key).append(transaction)
+            return
+        with self._lock:
+            # the id may sit in any partition; the target one checks again under its file lock
+            if self._locate(transaction.id) is not None:
+                raise ConflictError(f"transaction {transaction.id} already exists")
+            self._partition(key).append(transaction, unique=True)
+
+    def extend(self, transactions: List[Transaction]):
+        groups = self._grouped(transactions)
+        self._add_partitions(groups)
+        for key in sorted(groups):
+            self._partition(key).extend(groups[key])
+
+    def update(self, transaction: Transaction, expected: Transaction | None = None):
+        found = self._locate(transaction.id, expected, transaction)
+        if found is None:
+            raise StorageError(f"transaction {transaction.id} not found")
+        old_key, current = found
+        new_key = partition_key(transaction.date, self.granularity)
+        if new_key == old_key:
+            self._partition(old_key).update(transaction, expected)
+            return
+        with self._lock:
+            if expected is not None and current != expected:
+                raise ConflictError(f"transaction {transaction.id} was changed by another writer")
+            # the new row goes in first: a crash in between leaves the
+            # transaction in both partitions rather than in neither
+            self._add_partitions([new_key])
+            self._partition(new_key).append(transaction)
+            try:
+                self._partition(old_key).delete(transaction.id, expected=current)
+            except StorageError:
+                self._partition(new_key).delete(transaction.id)
+                raise
+
+    def delete(self, tx_id: str, expected: Transaction | None = None):
+        found = self._locate(tx_id, expected)
+        if found is None:
+            raise StorageError(f"transaction {tx_id} not found")
+        self._partition(found[0]).delete(tx_id, expected)
+
+    def migrate_from_csv(self, csv_path: Path) -> int:
+        # one-shot, like the SQLite backend: only a ledger without partitions
+        # is filled from the single-file CSV, which is left untouched
+        csv_path = Path(csv_path)
+        with self._lock, self._manifest_lock:
+            self._refresh_manifest()
+            if self._keys or not csv_path.exists():
+                return 0
+            txs = StorageManager(csv_path, journaled=True).load()
+            self.save(txs)
+            return len(txs)
+
+    def compact(self):
+        for key in self._keys:
+            self._partition(key).compact()
+
+    def close(self):
+        for store in list(self._partitions.values()):
+            store.close()
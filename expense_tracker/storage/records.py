@@ -0,0 +1,63 @@
+import csv
+import io
+from pathlib import Path
+
+from expense_tracker.config import ENCODING, CSV_HEADER
+from expense_tracker.models.transaction import Transaction
+
+# a span is (row, byte offset, byte length); None marks an id that cannot be
+# patched in place, e.g. one that occurs more than once in the file
+Span = tuple[int, int, int]
+
+
+def encode_record(transaction: Transaction, fieldnames: list[str] = CSV_HEADER) -> bytes:
+    # in the column order of the file the record goes into
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=fieldnames).writerow(transaction.to_csv_row())
+    return buf.getvalue().encode(ENCODING)
+
+
+def blank_record(length: int) -> bytes:
+    # readers skip blank lines, so newlines are a tombstone of any length
+    return b"\n" * length
+
+
+def scan_records(path: Path) -> tuple[dict[str, Span | None], int, int]:
+    """Map every record id in the CSV to its span, with one pass over the bytes.
+
+    Also returns the number of data rows, which is the row number the next
+    appended record gets, and the bytes taken up by blank lines. A trailing
+    record without its newline is left out; a file ending that way is
+    rewritten rather than patched.
+    """
+    spans: dict[str, Span | None] = {}
+    id_col = None
+    row = 0
+    padding = 0
+    offset = 0
+    start = 0
+    pending = b""
+    with Path(path).open("rb") as fh:
+        for line in fh:
+            if not pending:
+                start = offset
+            pending += line
+            offset += len(line)
+            # an odd number of quotes means a quoted field continues on the next line
+            if not line.endswith(b"\n") or pending.count(b'"') % 2:
+                continue
+            record, pending = pending, b""
+            if not record.strip():
+                padding += len(record)
+                continue
+            fields = next(csv.reader([record.decode(ENCODING)]), [])
+            if id_col is None:
+                if "id" not in fields:
+                    return {}, 0, 0
+                id_col = fields.index("id")
+                continue
+            tx_id = fields[id_col] if id_col < len(fields) else ""
+            if tx_id:
+                spans[tx_id] = None if tx_id in spans else (row, start, offset - start)
+            row += 1
+    return spans, row, padding
@@ -0,0 +1,222 @@
+from bisect import bisect_left
+from itertools import count
+from pathlib import Path
+from typing import Iterable, List
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from expense_tracker.config import ENCODING
+from expense_tracker.exceptions import StorageError
+from expense_tracker.models.transaction import Transaction
+
+SEARCH_FORMAT = 1
+_WORD = re.compile(r"\w+")
+
+
+def parse_query(text: str | None) -> list[str]:
+    # terms are ANDed; "market" matches anywhere in a field, "text*" only at the start of a word
+    return text.lower().split() if text else []
+
+
+def _fields(tx: Transaction) -> tuple[str, str]:
+    return (tx.description or "").lower(), tx.category.lower()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _is_prefix(term: str) -> bool:
+    return len(term) > 1 and term.endswith("*")
+
+
+def matches(tx: Transaction, terms: list[str]) -> bool:
+    """Whether `tx` satisfies every parsed term; the reference the index must agree with."""
+    fields = _fields(tx)
+    for term in terms:
+        if _is_prefix(term):
+            prefix = term[:-1]
+            if not any(word.startswith(prefix) for f in fields for word in _WORD.findall(f)):
+                return False
+        elif not any(term in f for f in fields):
+            return False
+    return True
+
+
+class SearchIndex:
+    """Word and trigram postings over lowercased descriptions and categories.
+
+    Postings point at distinct field texts, not at transactions: a ledger
+    repeats the same descriptions over and over, so they stay small, and a
+    query only visits the texts that can match and then the ids under them.
+    """
+
+    def __init__(self, transactions: Iterable[Transaction] = ()):
+        self._ids: dict[str, set[str]] = {}
+        self._words: dict[str, set[str]] = {}
+        self._trigrams: dict[str, set[str]] = {}
+        # sorted words for prefix lookups, rebuilt after the vocabulary changes
+        self._vocabulary: list[str] | None = None
+        # id -> insertion sequence, so results come back in ledger order
+        self._order: dict[str, int] = {}
+        self._seq = count()
+        # what postings loaded from a sidecar still number into, see _decoded
+        self._loaded_texts: list[str] = []
+        self._loaded_ids: list[str] = []
+        for tx in transactions:
+            self.add(tx)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @staticmethod
+    def _decoded(postings: dict, key: str, table: list[str]) -> set[str] | None:
+        # postings from a sidecar stay lists of numbers until first used, so
+        # opening the index costs a JSON parse, not rebuilding every set
+        value = postings.get(key)
+        if isinstance(value, list):
+            value = postings[key] = {table[i] for i in value}
+        return value
+
+    def _texts(self, postings: dict, key: str) -> set[str] | None:
+        return self._decoded(postings, key, self._loaded_texts)
+
+    def _index_text(self, text: str):
+        for word in set(_WORD.findall(text)):
+            texts = self._texts(self._words, word)
+            if texts is None:
+                texts = self._words[word] = set()
+                self._vocabulary = None
+            texts.add(text)
+        for gram in _trigrams(text):
+            texts = self._texts(self._trigrams, gram)
+            if texts is None:
+                texts = self._trigrams[gram] = set()
+            texts.add(text)
+
+    def _unindex_text(self, text: str):
+        for postings, keys in ((self._words, set(_WORD.findall(text))), (self._trigrams, _trigrams(text))):
+            for key in keys:
+                texts = self._texts(postings, key)
+                texts.discard(text)
+                if not texts:
+                    del postings[key]
+                    if postings is self._words:
+                        self._vocabulary = None
+
+    def add(self, tx: Transaction):
+        self._order[tx.id] = next(self._seq)
+        for text in set(_fields(tx)):
+            if not text:
+                continue
+            ids = self._decoded(self._ids, text, self._loaded_ids)
+            if ids is None:
+                ids = self._ids[text] = set()
+                self._index_text(text)
+            ids.add(tx.id)
+
+    def remove(self, tx: Transaction):
+        if self._order.pop(tx.id, None) is None:
+            return
+        for text in set(_fields(tx)):
+            ids = self._decoded(self._ids, text, self._loaded_ids)
+            if ids is None:
+                continue
+            ids.discard(tx.id)
+            if not ids:
+                del self._ids[text]
+                self._unindex_text(text)
+
+    def update(self, old: Transaction | None, new: Transaction | None):
+        # an edit keeps the record's place in ledger order, as the ledger itself does
+        seq = self._order.get(old.id) if old is not None else None
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+            if seq is not None and new.id == old.id:
+                self._order[new.id] = seq
+
+    def _texts_for(self, term: str) -> Iterable[str]:
+        if _is_prefix(term):
+            prefix = term[:-1]
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self._words)
+            vocabulary = self._vocabulary
+            texts: set[str] = set()
+            i = bisect_left(vocabulary, prefix)
+            while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+                texts |= self._texts(self._words, vocabulary[i])
+                i += 1
+            return texts
+        if len(term) < 3:
+            # too short for a trigram; the distinct texts are still far fewer than the rows
+            return [text for text in self._ids if term in text]
+        postings = sorted((self._texts(self._trigrams, gram) or set() for gram in _trigrams(term)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        # every trigram can be present without the term itself ("abcbcd" for "abcd")
+        return [text for text in candidates if term in text]
+
+    def search(self, terms: list[str]) -> List[str]:
+        """Ids matching every term, in insertion order."""
+        matched: set[str] | None = None
+        for term in terms:
+            ids: set[str] = set()
+            for text in self._texts_for(term):
+                ids |= self._decoded(self._ids, text, self._loaded_ids)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+        return sorted(matched or (), key=self._order.__getitem__)
+
+    def _payload(self) -> dict:
+        texts = list(self._ids)
+        numbers = {text: i for i, text in enumerate(texts)}
+        ids = sorted(self._order, key=self._order.__getitem__)
+        rows = {tx_id: i for i, tx_id in enumerate(ids)}
+        return {
+            "ids": ids,
+            "texts": texts,
+            "rows": [[rows[i] for i in self._decoded(self._ids, text, self._loaded_ids)] for text in texts],
+            "words": {w: [numbers[t] for t in self._texts(self._words, w)] for w in self._words},
+            "trigrams": {g: [numbers[t] for t in self._texts(self._trigrams, g)] for g in self._trigrams},
+        }
+
+    def save(self, path: Path, source):
+        # one header line, then the postings; the checksum covers the raw
+        # bytes of the postings, so neither side re-serializes them to verify
+        path = Path(path)
+        body = json.dumps(self._payload(), separators=(",", ":")).encode(ENCODING)
+        header = {"format": SEARCH_FORMAT, "source": source, "checksum": hashlib.sha256(body).hexdigest()}
+        try:
+            with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent)) as tmp:
+                tmp.write(json.dumps(header).encode(ENCODING) + b"\n" + body)
+                tmp_name = tmp.name
+            os.replace(tmp_name, str(path))
+        except Exception as ex:
+            raise StorageError(f"could not write search index {path}: {ex}")
+
+    @classmethod
+    def load(cls, path: Path, source) -> "SearchIndex | None":
+        # None means the sidecar is missing, stale or corrupt and must be rebuilt
+        try:
+            with Path(path).open("rb") as fh:
+                header = json.loads(fh.readline())
+                if header.get("format") != SEARCH_FORMAT or header.get("source") != source:
+                    return None
+                body = fh.read()
+            if hashlib.sha256(body).hexdigest() != header.get("checksum"):
+                return None
+            payload = json.loads(body)
+            index = cls()
+            index._loaded_ids, index._loaded_texts = payload["ids"], payload["texts"]
+            index._order = {tx_id: next(index._seq) for tx_id in index._loaded_ids}
+            index._ids = dict(zip(index._loaded_texts, payload["rows"], strict=True))
+            index._words = payload["words"]
+            index._trigrams = payload["trigrams"]
+            return index
+        except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+            return None
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import date
+from itertools import accumulate
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from expense_tracker.config import ENCODING
+from expense_tracker.exceptions import StorageError
+from expense_tracker.instrumentation import timed
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.reporting.table import TransactionTable
+
+SNAPSHOT_MAGIC = b"ETSNAP\r\n"
+SNAPSHOT_FORMAT = 1
+# magic, format, then the CSV's inode, size, mtime_ns and sha256, then the metadata length
+_HEADER = struct.Struct("<8sIQQQ32sQ")
+_SIGNATURE_AT = 12
+# fixed-width columns in file order, each 8-byte aligned
+_COLUMNS = (
+    ("ordinals", "i"),
+    ("month_ids", "I"),
+    ("category_ids", "I"),
+    ("units", "q"),
+    ("exponents", "h"),
+    ("id_refs", "I"),
+    ("description_refs", "I"),
+)
+
+
+def file_checksum(path: Path) -> bytes:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _padding(n: int) -> bytes:
+    return b"\0" * (-n % 8)
+
+
+@timed("snapshot.write")
+def write_snapshot(path: Path, csv_path: Path, transactions: Iterable[Transaction], fieldnames: list[str], signature: tuple[int, int, int]) -> bool:
+    """Write a binary snapshot of `transactions`, which must be exactly what `csv_path` holds at `signature`.
+
+    Returns False without writing when the ledger holds amounts the format
+    cannot represent, amounts in another currency included, or the CSV
+    changed meanwhile.
+    """
+    path = Path(path)
+    txs = list(transactions)
+    if any(tx.currency for tx in txs):
+        return False
+    try:
+        # column at a time, so the per-row work stays in C where it can
+        parts = [tx.stored_amount_parts() for tx in txs]
+        exponents = array("h", map(itemgetter(1), parts))
+    except (ValueError, OverflowError):
+        # NaN, infinite or negative-zero amounts, or exponents beyond a 16-bit column
+        return False
+    distinct = set(exponents)
+    scale = max(0, -min(distinct, default=0))
+    if len(distinct) == 1:
+        factor = 10 ** (scale + exponents[0])
+        scaled = map(itemgetter(0), parts) if factor == 1 else [u * factor for u, _ in parts]
+    else:
+        scaled = [u * 10 ** (scale + e) for u, e in parts]
+    try:
+        scaled = array("q", scaled)
+    except OverflowError:
+        # units do not fit 64 bits at the common scale
+        return False
+    dates = [tx.date for tx in txs]
+    day_codes = {d: (d.toordinal(), d.year * 100 + d.month) for d in set(dates)}
+    months = sorted({month for _, month in day_codes.values()})
+    month_ids = {m: i for i, m in enumerate(months)}
+    day_ordinals = {d: code[0] for d, code in day_codes.items()}
+    day_months = {d: month_ids[code[1]] for d, code in day_codes.items()}
+    categories = list(dict.fromkeys(tx.category for tx in txs))
+    category_ids = {c: i for i, c in enumerate(categories)}
+    # ids are unique, so each gets its own string; descriptions repeat and are shared
+    strings = [tx.id for tx in txs]
+    descriptions = [tx.description or "" for tx in txs]
+    description_ids = {}
+    for d in descriptions:
+        if d not in description_ids:
+            description_ids[d] = len(strings)
+            strings.append(d)
+    try:
+        checksum = file_checksum(csv_path)
+    except OSError as ex:
+        raise StorageError(f"could not read {csv_path}: {ex}")
+    st = os.stat(csv_path)
+    if (st.st_ino, st.st_size, st.st_mtime_ns) != tuple(signature):
+        return False
+    text = "".join(strings)
+    blob = text.encode(ENCODING)
+    if len(blob) != len(text):
+        encoded = [s.encode(ENCODING) for s in strings]
+        blob = b"".join(encoded)
+        offsets = array("Q", accumulate(map(len, encoded), initial=0))
+    else:
+        offsets = array("Q", accumulate(map(len, strings), initial=0))
+    columns = {
+        "ordinals": array("i", map(day_ordinals.__getitem__, dates)),
+        "month_ids": array("I", map(day_months.__getitem__, dates)),
+        "category_ids": array("I", (category_ids[tx.category] for tx in txs)),
+        "units": scaled,
+        # as written, so amounts like 1E+2 load back unchanged; the table
+        # only looks at exponents below zero, which are the same either way
+        "exponents": exponents,
+        "id_refs": array("I", range(len(txs))),
+        "description_refs": array("I", map(description_ids.__getitem__, descriptions)),
+    }
+    meta = json.dumps({
+        "rows": len(txs),
+        "scale": scale,
+        "months": months,
+        "categories": categories,
+        "exponents": sorted({min(e, 0) for e in distinct}),
+        "strings": len(strings),
+        "fieldnames": fieldnames,
+        "byteorder": sys.byteorder,
+    }).encode(ENCODING)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, *signature, checksum, len(meta))
+    try:
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent)) as tmp:
+            tmp.write(header + meta + _padding(len(header) + len(meta)))
+            for name, _ in _COLUMNS:
+                data = columns[name].tobytes()
+                tmp.write(data + _padding(len(data)))
+            data = offsets.tobytes()
+            tmp.write(data + _padding(len(data)))
+            tmp.write(blob)
+            tmp_name = tmp.name
+        os.replace(tmp_name, str(path))
+    except Exception as ex:
+        raise StorageError(f"could not write snapshot {path}: {ex}")
+    return True
+
+
+class Snapshot:
+    """A memory-mapped binary copy of the CSV ledger.
+
+    `table` is a TransactionTable whose columns are memoryviews over the
+    mapping, so reports scan it without copying it or building
+    Transaction objects.
+    """
+
+    def __init__(self, mapping: mmap.mmap, signature: tuple[int, int, int], meta: dict, views: dict[str, memoryview], offsets: memoryview, blob_at: int):
+        self._mapping = mapping
+        self.signature = signature
+        self.fieldnames: list[str] = meta["fieldnames"]
+        self._views = views
+        self._offsets = offsets
+        self._blob_at = blob_at
+        table = TransactionTable()
+        table.ordinals = views["ordinals"]
+        table.month_ids = views["month_ids"]
+        table.category_ids = views["category_ids"]
+        table.units = views["units"]
+        table.exponents = views["exponents"]
+        table.known_exponents = set(meta["exponents"])
+        table.scale = meta["scale"]
+        table.months = meta["months"]
+        table.categories = meta["categories"]
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @classmethod
+    @timed("snapshot.open")
+    def open(cls, path: Path, csv_path: Path, signature: tuple[int, int, int]) -> "Snapshot | None":
+        # None means the snapshot is missing, damaged or describes another version of the CSV
+        try:
+            with Path(path).open("rb") as fh:
+                mapping = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, fmt, ino, size, mtime_ns, checksum, meta_len = _HEADER.unpack_from(mapping)
+            if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT or size != signature[1]:
+                return None
+            if (ino, size, mtime_ns) != tuple(signature):
+                # same size but touched, copied or rewritten: the content decides
+                if file_checksum(csv_path) != checksum:
+                    return None
+                cls._restamp(path, signature)
+            pos = _HEADER.size + meta_len
+            meta = json.loads(mapping[_HEADER.size:pos].decode(ENCODING))
+            if meta["byteorder"] != sys.byteorder:
+                return None
+            pos += -pos % 8
+            view = memoryview(mapping)
+            views = {}
+            for name, code in _COLUMNS:
+                end = pos + meta["rows"] * struct.calcsize(code)
+                views[name] = view[pos:end].cast(code)
+                pos = end + (-end % 8)
+            end = pos + (meta["strings"] + 1) * 8
+            offsets = view[pos:end].cast("Q")
+            blob_at = end + (-end % 8)
+            if len(offsets) != meta["strings"] + 1 or blob_at + offsets[-1] != len(mapping):
+                # truncated or padded: every section must end exactly where the next begins
+                return None
+            return cls(mapping, tuple(signature), meta, views, offsets, blob_at)
+        except (OSError, ValueError, KeyError, IndexError, TypeError, struct.error):
+            return None
+
+    @staticmethod
+    def _restamp(path: Path, signature: tuple[int, int, int]):
+        # record the new stat signature so the next open skips the checksum
+        try:
+            with Path(path).open("r+b") as fh:
+                fh.seek(_SIGNATURE_AT)
+                fh.write(struct.pack("<QQQ", *signature))
+        except OSError:
+            pass
+
+    def _strings(self) -> list[str]:
+        offsets = self._offsets
+        blob = self._mapping[self._blob_at:self._blob_at + offsets[-1]]
+        text = blob.decode(ENCODING)
+        if len(text) == len(blob):
+            # pure ASCII: byte offsets are character offsets
+            return [text[a:b] for a, b in zip(offsets, offsets[1:])]
+        return [blob[a:b].decode(ENCODING) for a, b in zip(offsets, offsets[1:])]
+
+    def transactions(self) -> Iterator[Transaction]:
+        table = self.table
+        strings = self._strings()
+        scale = table.scale
+        categories = table.categories
+        days = {ordinal: date.fromordinal(ordinal) for ordinal in set(table.ordinals)}
+        from_parts = Transaction.from_parts
+        for ordinal, category_id, units, exp, id_ref, description_ref in zip(
+            table.ordinals, table.category_ids, table.units, table.exponents, self._views["id_refs"], self._views["description_refs"]
+        ):
+            yield from_parts(strings[id_ref], days[ordinal], units // 10 ** (scale + exp), exp, categories[category_id], strings[description_ref])
@@ -0,0 +1,317 @@
+import sqlite3
+import threading
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+from expense_tracker.models.transaction import Transaction, from_decimal_parts
+from expense_tracker.exceptions import ConflictError, StorageError, ValidationError
+from expense_tracker.instrumentation import timed
+from expense_tracker.reporting.rollup import Rollup
+from expense_tracker.storage.csv_storage import StorageManager, _file_signature, _notify
+from expense_tracker.storage.search import matches, parse_query
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    day INTEGER NOT NULL,
+    units INTEGER NOT NULL,
+    exponent INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    currency TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions (day);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_day ON transactions (category COLLATE NOCASE, day);
+"""
+
+_COLUMNS = "id, day, units, exponent, category, description, currency"
+
+
+def _day(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def _date(day: int) -> date:
+    return date(day // 10000, day // 100 % 100, day % 100)
+
+
+def _to_row(tx: Transaction) -> tuple:
+    try:
+        units, exponent = tx.amount_parts()
+    except ValueError:
+        # NaN and infinities have no integer parts; parsed input never holds them
+        raise ValidationError(f"invalid amount '{tx.amount}' in transaction {tx.id}: must be a finite number")
+    return (tx.id, _day(tx.date), units, exponent, tx.category, tx.description or "", tx.currency)
+
+
+def _from_row(row: tuple) -> Transaction:
+    tx_id, day, units, exponent, category, description, currency = row
+    return Transaction.from_parts(tx_id, _date(day), units, exponent, category, description, currency)
+
+
+def _sum_parts(parts) -> Decimal:
+    # each (units, exponent) pair is an exact partial sum; adding them as
+    # Decimals reproduces the exponent a row-by-row Decimal sum would have
+    total = Decimal(0)
+    for units, exponent in parts:
+        total += from_decimal_parts(units, exponent)
+    return total
+
+
+class SqliteStorageManager:
+    """SQLite-backed store with the StorageManager surface plus indexed point operations.
+
+    Amounts are stored exactly as integer units and a base-10 exponent, and
+    report aggregations run as GROUP BY queries inside the database.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._watchers: list[Callable] = []
+        try:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            if "currency" not in {column[1] for column in self._conn.execute("PRAGMA table_info(transactions)")}:
+                # a database created before currencies existed; NULL is DEFAULT_CURRENCY
+                self._conn.execute("ALTER TABLE transactions ADD COLUMN currency TEXT")
+        except sqlite3.Error as ex:
+            raise StorageError(f"could not open {self.path}: {ex}")
+
+    def _cursor(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            try:
+                with self._conn:
+                    return self._conn.execute(sql, params)
+            except (sqlite3.Error, OverflowError) as ex:
+                raise StorageError(f"database error on {self.path}: {ex}")
+
+    def _execute(self, sql: str, params=()) -> list:
+        return self._cursor(sql, params).fetchall()
+
+    @timed("sqlite.load")
+    def load(self) -> List[Transaction]:
+        return [_from_row(r) for r in self._execute(f"SELECT {_COLUMNS} FROM transactions ORDER BY seq")]
+
+    def count(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM transactions")[0][0]
+
+    @timed("sqlite.save")
+    def save(self, transactions: List[Transaction]):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("DELETE FROM transactions")
+                    self._conn.executemany(f"INSERT OR REPLACE INTO transactions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", map(_to_row, transactions))
+            except (sqlite3.Error, OverflowError) as ex:
+                raise StorageError(f"could not write to {self.path}: {ex}")
+
+    @timed("sqlite.append")
+    def append(self, transaction: Transaction, unique: bool = False):
+        # ids are UNIQUE in the schema, so every append refuses a duplicate
+        row = _to_row(transaction)
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(f"INSERT INTO transactions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            except sqlite3.IntegrityError:
+                raise ConflictError(f"transaction {transaction.id} already exists")
+            except (sqlite3.Error, OverflowError) as ex:
+                raise StorageError(f"database error on {self.path}: {ex}")
+        _notify(self._watchers, [(None, transaction)])
+
+    @timed("sqlite.extend")
+    def extend(self, transactions: List[Transaction]):
+        transactions = list(transactions)
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany(f"INSERT INTO transactions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", map(_to_row, transactions))
+            except (sqlite3.Error, OverflowError) as ex:
+                raise StorageError(f"could not write to {self.path}: {ex}")
+        _notify(self._watchers, [(None, tx) for tx in transactions])
+
+    def get(self, tx_id: str) -> Transaction | None:
+        rows = self._execute(f"SELECT {_COLUMNS} FROM transactions WHERE id = ?", (tx_id,))
+        return _from_row(rows[0]) if rows else None
+
+    def _write_checked(self, tx_id: str, expected: Transaction | None, sql: str, params) -> tuple[int, Transaction | None]:
+        # the rows written, and the row as it was when a check or a watcher needs it
+        if expected is None and not self._watchers:
+            return self._cursor(sql, params).rowcount, None
+        # BEGIN IMMEDIATE takes the write lock before the read, so no other
+        # connection can change the row between the check and the write
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    rows = self._conn.execute(f"SELECT {_COLUMNS} FROM transactions WHERE id = ?", (tx_id,)).fetchall()
+                    old = _from_row(rows[0]) if rows else None
+                    if expected is not None and old is not None and old != expected:
+                        raise ConflictError(f"transaction {tx_id} was changed by another writer")
+                    return self._conn.execute(sql, params).rowcount, old
+            except (sqlite3.Error, OverflowError) as ex:
+                raise StorageError(f"database error on {self.path}: {ex}")
+
+    @timed("sqlite.update")
+    def update(self, transaction: Transaction, expected: Transaction | None = None):
+        tx_id, day, units, exponent, category, description, currency = _to_row(transaction)
+        updated, old = self._write_checked(
+            tx_id,
+            expected,
+            "UPDATE transactions SET day = ?, units = ?, exponent = ?, category = ?, description = ?, currency = ? WHERE id = ?",
+            (day, units, exponent, category, description, currency, tx_id),
+        )
+        if updated == 0:
+            raise StorageError(f"transaction {tx_id} not found")
+        _notify(self._watchers, [(old, transaction)])
+
+    @timed("sqlite.delete")
+    def delete(self, tx_id: str, expected: Transaction | None = None):
+        deleted, old = self._write_checked(tx_id, expected, "DELETE FROM transactions WHERE id = ?", (tx_id,))
+        if deleted == 0:
+            raise StorageError(f"transaction {tx_id} not found")
+        _notify(self._watchers, [(old, None)])
+
+    @staticmethod
+    def _where(start: date | None, end: date | None, category: str | None = None) -> tuple[str, list]:
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ? COLLATE NOCASE")
+            params.append(category)
+        if start:
+            clauses.append("day >= ?")
+            params.append(_day(start))
+        if end:
+            clauses.append("day <= ?")
+            params.append(_day(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @timed("sqlite.query")
+    def query(self, start: date | None = None, end: date | None = None, category: str | None = None) -> List[Transaction]:
+        where, params = self._where(start, end, category)
+        rows = self._execute(f"SELECT {_COLUMNS} FROM transactions{where} ORDER BY day, seq", params)
+        txs = [_from_row(r) for r in rows]
+        if category:
+            # NOCASE only folds ASCII; match the CSV store's str.lower() semantics exactly
+            txs = [tx for tx in txs if tx.category.lower() == category.lower()]
+        return txs
+
+    @timed("sqlite.search")
+    def search(self, text: str, start: date | None = None, end: date | None = None, category: str | None = None) -> List[Transaction]:
+        terms = parse_query(text)
+        if not terms:
+            return self.query(start, end, category)
+        where, params = self._where(start, end, category)
+        clauses = [where[len(" WHERE "):]] if where else []
+        for term in terms:
+            # LIKE narrows the rows inside SQLite; it only folds ASCII case, so other terms are left to matches()
+            if term.isascii():
+                pattern = "%" + term.rstrip("*").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(description LIKE ? ESCAPE '\\' OR category LIKE ? ESCAPE '\\')")
+                params += [pattern, pattern]
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self._execute(f"SELECT {_COLUMNS} FROM transactions{where} ORDER BY day, seq", params)
+        wanted = category.lower() if category else None
+        return [tx for tx in map(_from_row, rows) if matches(tx, terms) and (wanted is None or tx.category.lower() == wanted)]
+
+    def iter_transactions(self, start: date | None = None, end: date | None = None, category: str | None = None) -> Iterator[Transaction]:
+        # a separate connection streams rows lazily while WAL lets writers carry on
+        where, params = self._where(start, end, category)
+        wanted = category.lower() if category else None
+        try:
+            conn = sqlite3.connect(str(self.path))
+        except sqlite3.Error as ex:
+            raise StorageError(f"could not open {self.path}: {ex}")
+        try:
+            for row in conn.execute(f"SELECT {_COLUMNS} FROM transactions{where} ORDER BY day, seq", params):
+                tx = _from_row(row)
+                if wanted is None or tx.category.lower() == wanted:
+                    yield tx
+        except sqlite3.Error as ex:
+            raise StorageError(f"database error on {self.path}: {ex}")
+        finally:
+            conn.close()
+
+    def _grouped(self, key: str, where: str, params: list, name=lambda group: group) -> dict:
+        # rows in other currencies are grouped per day and currency too, see split_key
+        rows = self._execute(
+            f"SELECT {key}, CASE WHEN currency IS NULL THEN NULL ELSE day END, currency, exponent, SUM(units) FROM transactions{where} "
+            f"GROUP BY 1, 2, 3, exponent ORDER BY MIN(seq)",
+            params,
+        )
+        parts: dict = {}
+        for group, day, currency, exponent, units in rows:
+            group = name(group) if currency is None else (name(group), _date(day), currency)
+            parts.setdefault(group, []).append((units, exponent))
+        return {group: _sum_parts(p) for group, p in parts.items()}
+
+    def aggregate_by_month(self) -> dict:
+        return self._grouped("day / 100", "", [], lambda month: f"{month:06d}")
+
+    def aggregate_by_category(self, start: date | None = None, end: date | None = None) -> dict:
+        where, params = self._where(start, end)
+        return self._grouped("category", where, params)
+
+    # month x category totals come out of one GROUP BY, so the report engine
+    # can use them the way it uses a CSV store's materialized rollup
+    rollups = True
+
+    def rollup(self) -> Rollup:
+        rows = self._execute(
+            "SELECT day / 100, category, CASE WHEN currency IS NULL THEN NULL ELSE day END, currency, exponent, SUM(units), COUNT(*) FROM transactions "
+            "GROUP BY 1, 2, 3, currency, exponent ORDER BY MIN(seq)"
+        )
+        parts: dict[tuple, list] = {}
+        for month, category, day, currency, exponent, units, n in rows:
+            parts.setdefault((f"{month:06d}", category, day, currency), []).append((units, exponent, n))
+        rollup = Rollup()
+        for (month, category, day, currency), p in parts.items():
+            total, n = _sum_parts((u, e) for u, e, _ in p), sum(c for _, _, c in p)
+            if currency is None:
+                rollup.add_totals(month, category, total, n)
+            else:
+                rollup.add_foreign(month, category, _date(day), currency, total, n)
+        return rollup
+
+    def month_category_totals(self, month: str, category: str) -> dict:
+        # one month of one category, read through the (category, day) index;
+        # NOCASE also matches other spellings, which are left out here
+        first = int(month) * 100
+        where = " WHERE category = ? COLLATE NOCASE AND day BETWEEN ? AND ?"
+        totals = self._grouped("category", where, [category, first + 1, first + 31])
+        return {key: total for key, total in totals.items() if (key[0] if type(key) is tuple else key) == category}
+
+    def watch(self, callback: Callable[[list[tuple[Transaction | None, Transaction | None]]], None]):
+        # same contract as StorageManager.watch
+        self._watchers.append(callback)
+
+    def input_signature(self, start: date | None = None, end: date | None = None) -> list:
+        # committed writes land in the -wal file first and in the database at
+        # checkpoints; every connection touches an empty -wal, so that one counts as absent
+        wal = _file_signature(self.path.with_name(self.path.name + "-wal"))
+        return [list(sig) if sig else None for sig in (_file_signature(self.path), wal if wal and wal[1] else None)]
+
+    def report_source(self, start: date | None = None, end: date | None = None) -> "SqliteStorageManager":
+        # aggregations are pushed down into SQL, so the store is its own report source
+        return self
+
+    def migrate_from_csv(self, csv_path: Path) -> int:
+        # one-shot: only an empty database is populated from the CSV ledger
+        csv_path = Path(csv_path)
+        if self.count() or not csv_path.exists():
+            return 0
+        txs = StorageManager(csv_path).load()
+        self.save(txs)
+        return len(txs)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
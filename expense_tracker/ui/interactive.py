@@ -1,12 +1,16 @@
+from datetime import date
 from pathlib import Path
-from typing import List
+from typing import Iterable
 
-from expense_tracker.config import DEFAULT_CSV
-from expense_tracker.models.transaction import Transaction
+from expense_tracker.config import DEFAULT_CSV, DEFAULT_CURRENCY, EXPORT_STATE_SUFFIX
+from expense_tracker.models.transaction import Transaction, parse_currency
 from expense_tracker.exceptions import ValidationError, StorageError, OperationCancelled
-from expense_tracker.utils import parse_date_ymd, parse_amount, confirm, pretty_print_table
+from expense_tracker.utils import Pager, parse_date_ymd, parse_amount, confirm, pretty_print_table
 from expense_tracker.storage import StorageManager
 from expense_tracker.reporting import ReportGenerator
+from expense_tracker.reporting.engine import DIMENSIONS, ReportResult, ReportSpec, category_totals, monthly_totals, summary_specs
+from expense_tracker.importer import ColumnMapping, import_statement
+from expense_tracker.budgets import BudgetMonitor, Budgets, budgets_path
 
 
 CANCEL_KEYWORDS = {"q", "quit", "cancel"}
@@ -23,6 +27,14 @@ class CLIApp:
     def __init__(self, storage_manager: StorageManager, report_generator: ReportGenerator):
         self.store = storage_manager
         self.reports = report_generator
+        self.budgets_path = budgets_path(storage_manager.path)
+        try:
+            budgets = Budgets.load(self.budgets_path)
+        except (ValidationError, StorageError) as e:
+            print(f"Warning: {e}")
+            budgets = Budgets()
+        # alerts print as soon as a write crosses a limit
+        self.budgets = BudgetMonitor(storage_manager, budgets, notify=print)
 
     # Prompt helpers (immediate validation + cancel)
     def _prompt_date(self, prompt_text: str, allow_empty: bool = False, default: str | None = None) -> str | None:
@@ -66,6 +78,18 @@ class CLIApp:
                 continue
             return raw
 
+    def _prompt_currency(self, prompt_text: str, default: str | None = None) -> str | None:
+        # Enter keeps `default`; None is DEFAULT_CURRENCY
+        while True:
+            raw = input(prompt_text).strip()
+            if raw == "":
+                return default
+            _check_cancel(raw)
+            try:
+                return parse_currency(raw)
+            except ValidationError as e:
+                print(f"Invalid currency: {e}. Please try again or 'q' to cancel.")
+
     def _prompt_path(self, prompt_text: str, allow_empty: bool = False) -> str | None:
         while True:
             raw = input(prompt_text).strip()
@@ -86,7 +110,8 @@ class CLIApp:
             category = self._prompt_nonempty("Category: ")
             description = input("Description (optional): ").strip()
             _check_cancel(description)
-            tx = Transaction.from_input(date_str, amount_str, category, description)
+            currency = self._prompt_currency(f"Currency (Enter for {DEFAULT_CURRENCY}): ")
+            tx = Transaction.from_input(date_str, amount_str, category, description, currency=currency)
             self.store.append(tx)
             print(f"Transaction added with id {tx.id}")
         except OperationCancelled:
@@ -98,14 +123,14 @@ class CLIApp:
 
     def list_transactions(self):
         print("\nList Transactions (type 'q' to cancel filters)")
-        txs = self.store.load()
-        if not txs:
+        if not self.store.count():
             print("No transactions found.")
             return
         try:
             start = self._prompt_date("Start date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
             end = self._prompt_date("End date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
             category = self._prompt_nonempty("Filter category or Enter to skip: ", allow_empty=True)
+            text = self._prompt_nonempty("Search descriptions/categories (e.g. market, text*) or Enter to skip: ", allow_empty=True)
         except OperationCancelled:
             print("Listing cancelled. Returning to main menu.")
             return
@@ -113,59 +138,60 @@ class CLIApp:
         start_date = parse_date_ymd(start) if start else None
         end_date = parse_date_ymd(end) if end else None
 
-        filtered: List[Transaction] = []
-        for tx in txs:
-            if start_date and tx.date < start_date:
-                continue
-            if end_date and tx.date > end_date:
-                continue
-            if category and tx.category.lower() != category.lower():
-                continue
-            filtered.append(tx)
-
-        rows = [
-            [str(i + 1), tx.id, tx.date.strftime("%Y%m%d"), f"{tx.amount}", tx.category, tx.description or ""]
-            for i, tx in enumerate(filtered)
-        ]
-        headers = ["#", "id", "date", "amount", "category", "description"]
-        pretty_print_table(rows, headers)
+        # rows are pulled and formatted a page at a time
+        if text:
+            filtered = self.store.search(text, start_date, end_date, category)
+        else:
+            filtered = self.store.iter_transactions(start_date, end_date, category)
+        headers = ["#", "id", "date", "amount", "currency", "category", "description"]
+        Pager(
+            filtered,
+            headers,
+            lambda i, tx: [str(i), tx.id, tx.date.strftime("%Y%m%d"), f"{tx.amount}", tx.currency or DEFAULT_CURRENCY, tx.category, tx.description or ""],
+        ).browse()
 
-    def _select_transaction_loop(self, txs: List[Transaction]):
-        if not txs:
+    def _select_transaction_loop(self, txs: Iterable[Transaction]):
+        headers = ["#", "id", "date", "amount", "category"]
+        pager = Pager(txs, headers, lambda i, tx: [str(i), tx.id, tx.date.strftime("%Y%m%d"), f"{tx.amount}", tx.category])
+        if pager.is_empty():
             print("No transactions available.")
             return None, None
-        headers = ["#", "id", "date", "amount", "category"]
+        pager.render()
+        prompt = "Choose by number or enter transaction id (or 'q' to cancel): "
+        if not pager.single_page():
+            prompt = "Choose by number or id, [n]ext, [p]rev, [g]o N (or 'q' to cancel): "
         while True:
-            rows = [[str(i + 1), tx.id, tx.date.strftime("%Y%m%d"), f"{tx.amount}", tx.category] for i, tx in enumerate(txs)]
-            pretty_print_table(rows, headers)
-            choice = input("Choose by number or enter transaction id (or 'q' to cancel): ").strip()
+            choice = input(prompt).strip()
             if not choice:
                 print("No selection made. Enter a number, an id, or 'q' to cancel.")
                 continue
             if choice.lower() in CANCEL_KEYWORDS:
                 print("Selection cancelled.")
                 return None, None
+            if pager.navigate(choice):
+                continue
             try:
                 idx = int(choice) - 1
-                if 0 <= idx < len(txs):
-                    return idx, txs[idx]
+                tx = pager.item(idx + 1)
+                if tx is not None:
+                    return idx, tx
                 else:
                     print("Number out of range; try again or 'q' to cancel.")
                     continue
             except ValueError:
                 pass
-            for i, tx in enumerate(txs):
-                if tx.id == choice:
-                    return i, tx
+            # ids are looked up in the store rather than by scanning the listed rows
+            tx = self.store.get(choice)
+            if tx is not None:
+                return None, tx
             print("Selection not found; try again or 'q' to cancel.")
 
     def edit_transaction(self):
         print("\nEdit Transaction (type 'q' to cancel at any prompt)")
-        txs = self.store.load()
-        if not txs:
+        if not self.store.count():
             print("No transactions to edit.")
             return
-        idx, tx = self._select_transaction_loop(txs)
+        idx, tx = self._select_transaction_loop(self.store.iter_transactions())
         if tx is None:
             return
         print("Press Enter to leave a field unchanged. Type 'q' to cancel.")
@@ -195,9 +221,10 @@ class CLIApp:
             _check_cancel(raw_desc)
             description = raw_desc if raw_desc != "" else tx.description
 
-            new_tx = Transaction.from_input(date_str, amount_str, category, description, id=tx.id)
-            txs[idx] = new_tx
-            self.store.save(txs)
+            currency = self._prompt_currency(f"Currency ({tx.currency or DEFAULT_CURRENCY}): ", default=tx.currency)
+
+            new_tx = Transaction.from_input(date_str, amount_str, category, description, id=tx.id, currency=currency)
+            self.store.update(new_tx, expected=tx)
             print("Transaction updated.")
         except OperationCancelled:
             print("Edit cancelled. Returning to main menu.")
@@ -208,11 +235,10 @@ class CLIApp:
 
     def delete_transaction(self):
         print("\nDelete Transaction (type 'q' to cancel)")
-        txs = self.store.load()
-        if not txs:
+        if not self.store.count():
             print("No transactions to delete.")
             return
-        idx, tx = self._select_transaction_loop(txs)
+        idx, tx = self._select_transaction_loop(self.store.iter_transactions())
         if tx is None:
             return
         confirmed = confirm(f"Delete transaction {tx.id} of {tx.amount} on {tx.date.strftime('%Y%m%d')}? (y/n): ")
@@ -220,85 +246,230 @@ class CLIApp:
             print("Delete cancelled.")
             return
         try:
-            del txs[idx]
-            self.store.save(txs)
+            self.store.delete(tx.id, expected=tx)
             print("Transaction deleted.")
         except StorageError as e:
             print(f"Storage error: {e}")
 
+    def _prompt_range(self) -> tuple:
+        start = self._prompt_date("Start date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
+        end = self._prompt_date("End date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
+        return (parse_date_ymd(start) if start else None), (parse_date_ymd(end) if end else None)
+
+    def _prompt_custom_spec(self) -> ReportSpec | None:
+        while True:
+            group_by = input(f"Group by ({', '.join(DIMENSIONS)}; comma-separated) [month]: ").strip() or "month"
+            _check_cancel(group_by)
+            measures = input("Measures (sum, count, mean, min, max, median, p90, ...) [sum]: ").strip() or "sum"
+            _check_cancel(measures)
+            start, end = self._prompt_range()
+            categories = input("Only these categories (comma-separated) or Enter for all: ").strip()
+            _check_cancel(categories)
+            top = input("Keep the top N rows or Enter for all: ").strip()
+            _check_cancel(top)
+            try:
+                if top and not top.isdigit():
+                    raise ValidationError("top must be a whole number")
+                return ReportSpec("custom", group_by, measures, start, end, categories=categories or None, top=int(top) if top else None)
+            except ValidationError as e:
+                print(f"Invalid report: {e}. Please try again or 'q' to cancel.")
+
+    def _show(self, result: ReportResult | None, title: str | None = None):
+        if result is None:
+            return
+        if title:
+            print(f"\n{title}")
+        pretty_print_table(result.text_rows(), result.headers)
+
+    def _run(self, specs: list[ReportSpec]) -> dict[str, ReportResult]:
+        try:
+            return self.reports.run_for_store(self.store, specs)
+        except (ValidationError, StorageError) as e:
+            # e.g. an amount in a currency the rates file has no rate for
+            print(f"Report failed: {e}")
+            return {}
+
+    def _run_one(self, spec: ReportSpec) -> ReportResult | None:
+        return self._run([spec]).get(spec.name)
+
+    def _export_batch(self):
+        from expense_tracker.reporting.batch import load_jobs
+
+        try:
+            jobs = Path(self._prompt_path("Job file path (e.g. reports/nightly.json): "))
+            exports = load_jobs(jobs)
+            result = self.reports.export_batch(self.store, exports, jobs.with_name(jobs.name + EXPORT_STATE_SUFFIX))
+        except OperationCancelled:
+            print("Export cancelled.")
+            return
+        except (ValidationError, StorageError) as e:
+            print(f"Export failed: {e}")
+            return
+        print(f"Written {len(result.written)}, unchanged {len(result.unchanged)}, skipped {len(result.skipped)} of {len(exports)} reports")
+        for err in result.errors:
+            print(f"Export failed: {err}")
+
     def reports_menu(self):
         while True:
             print("\nReports Menu")
             print("1) Monthly totals (YYYYMM)")
             print("2) Category totals (date range)")
-            print("3) Export an aggregated report to CSV")
-            print("4) Back to main menu")
+            print("3) Summary: yearly, monthly, weekly, category and month x category")
+            print("4) Custom report")
+            print("5) Export an aggregated report to CSV")
+            print("6) Back to main menu")
             choice = input("Choose: ").strip()
-            txs = self.store.load()
 
             if choice == "1":
-                agg = self.reports.aggregate_by_month(txs)
-                rows = [[month, f"{total}"] for month, total in sorted(agg.items())]
-                pretty_print_table(rows, ["month", "total"])
+                self._show(self._run_one(monthly_totals()))
 
             elif choice == "2":
                 try:
-                    start = self._prompt_date("Start date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
-                    end = self._prompt_date("End date (YYYYMMDD) or Enter to skip: ", allow_empty=True)
+                    s, e = self._prompt_range()
                 except OperationCancelled:
                     print("Report date entry cancelled. Returning to Reports menu.")
                     continue
-                s = parse_date_ymd(start) if start else None
-                e = parse_date_ymd(end) if end else None
-                agg = self.reports.aggregate_by_category(txs, s, e)
-                rows = [[cat, f"{total}"] for cat, total in sorted(agg.items(), key=lambda x: -abs(x[1]))]
-                pretty_print_table(rows, ["category", "total"])
+                self._show(self._run_one(category_totals(s, e)))
 
             elif choice == "3":
+                try:
+                    s, e = self._prompt_range()
+                except OperationCancelled:
+                    print("Report date entry cancelled. Returning to Reports menu.")
+                    continue
+                # every view comes out of the same pass over the data
+                for name, result in self._run(summary_specs(s, e)).items():
+                    self._show(result, name.capitalize())
+
+            elif choice == "4":
+                try:
+                    spec = self._prompt_custom_spec()
+                except OperationCancelled:
+                    print("Custom report cancelled. Returning to Reports menu.")
+                    continue
+                self._show(self._run_one(spec))
+
+            elif choice == "5":
                 print("Export an aggregated report to CSV (type 'q' to cancel any prompt)")
-                opt = input("choose a) monthly totals  b) category totals  (a/b): ").strip().lower()
+                opt = input("choose a) monthly totals  b) category totals  c) custom report  d) every report in a job file  (a/b/c/d): ").strip().lower()
                 if opt.lower() in CANCEL_KEYWORDS:
                     print("Export cancelled.")
                     continue
-                if opt == "a":
-                    agg = self.reports.aggregate_by_month(txs)
-                    rows = [[m, f"{t}"] for m, t in sorted(agg.items())]
-                    try:
+                if opt not in ("a", "b", "c", "d"):
+                    print("Invalid option. Enter 'a', 'b', 'c', 'd' or 'q' to cancel.")
+                    continue
+                if opt == "d":
+                    self._export_batch()
+                    continue
+                try:
+                    if opt == "a":
+                        spec = monthly_totals()
                         path_str = self._prompt_path("Export file path (e.g. reports/monthly.csv): ")
-                    except OperationCancelled:
-                        print("Export cancelled.")
-                        continue
-                    try:
-                        self.reports.export_report_csv(Path(path_str), rows, ["month", "total"])
-                        print(f"Exported to {path_str}")
-                    except StorageError as e:
-                        print(f"Export failed: {e}")
-
-                elif opt == "b":
-                    try:
+                    elif opt == "b":
                         start = self._prompt_date("Start date (YYYYMMDD): ")
                         end = self._prompt_date("End date (YYYYMMDD): ")
+                        spec = category_totals(parse_date_ymd(start), parse_date_ymd(end))
                         path_str = self._prompt_path("Export file path (e.g. reports/by_category.csv): ")
-                    except OperationCancelled:
-                        print("Export cancelled.")
-                        continue
-                    s = parse_date_ymd(start)
-                    e = parse_date_ymd(end)
-                    agg = self.reports.aggregate_by_category(txs, s, e)
-                    rows = [[c, f"{t}"] for c, t in sorted(agg.items(), key=lambda x: -abs(x[1]))]
-                    try:
-                        self.reports.export_report_csv(Path(path_str), rows, ["category", "total"])
-                        print(f"Exported to {path_str}")
-                    except StorageError as e:
-                        print(f"Export failed: {e}")
-                else:
-                    print("Invalid option. Enter 'a' or 'b' or 'q' to cancel.")
+                    else:
+                        spec = self._prompt_custom_spec()
+                        path_str = self._prompt_path("Export file path (e.g. reports/custom.csv): ")
+                except OperationCancelled:
+                    print("Export cancelled.")
+                    continue
+                except ValidationError as e:
+                    print(f"Export failed: {e}")
+                    continue
+                result = self._run_one(spec)
+                if result is None:
+                    continue
+                try:
+                    self.reports.export_report_csv(Path(path_str), result.text_rows(), result.headers)
+                    print(f"Exported to {path_str}")
+                except StorageError as e:
+                    print(f"Export failed: {e}")
 
-            elif choice == "4":
+            elif choice == "6":
                 return
             else:
                 print("Invalid choice.")
 
+    def import_statement(self):
+        print("\nImport Statement (type 'q' to cancel at any prompt)")
+        try:
+            path_str = self._prompt_path("Statement CSV path: ")
+            defaults = ColumnMapping()
+            date_col = self._prompt_nonempty(f"Date column [{defaults.date}]: ", default=defaults.date)
+            date_format = self._prompt_nonempty(f"Date format [{defaults.date_format}]: ", default=defaults.date_format)
+            amount_col = self._prompt_nonempty(f"Amount column [{defaults.amount}]: ", default=defaults.amount)
+            category_col = self._prompt_nonempty(f"Category column [{defaults.category}]: ", default=defaults.category)
+            description_col = self._prompt_nonempty(f"Description column [{defaults.description}]: ", default=defaults.description)
+        except OperationCancelled:
+            print("Import cancelled. Returning to main menu.")
+            return
+        negate = confirm("Are expenses negative in this statement? (y/n): ")
+        mapping = ColumnMapping(date=date_col, amount=amount_col, category=category_col, description=description_col, date_format=date_format, negate=negate)
+        try:
+            result = import_statement(self.store, Path(path_str), mapping)
+        except ValidationError as e:
+            print(f"Invalid statement: {e}")
+            return
+        except StorageError as e:
+            print(f"Import failed: {e}")
+            return
+        print(f"Imported {result.accepted} transactions ({result.rejected} rejected, {result.duplicates} duplicates).")
+        for err in result.errors:
+            print(f"  {err}")
+
+    def _prompt_month(self, prompt_text: str, default: str | None = None) -> str | None:
+        while True:
+            raw = input(prompt_text).strip()
+            if raw == "":
+                return default
+            _check_cancel(raw)
+            try:
+                parse_date_ymd(raw + "01")
+                return raw
+            except ValidationError:
+                print("Invalid month. Please enter YYYYMM or 'q' to cancel.")
+
+    def budgets_menu(self):
+        while True:
+            print("\nBudgets Menu")
+            print("1) Status for a month")
+            print("2) Set a category limit")
+            print("3) Remove a category limit")
+            print("4) Back to main menu")
+            choice = input("Choose: ").strip()
+            try:
+                if choice == "1":
+                    today = date.today()
+                    current = f"{today.year:04d}{today.month:02d}"
+                    month = self._prompt_month(f"Month (YYYYMM) [{current}]: ", default=current)
+                    rows = self.budgets.status(month)
+                    if not rows:
+                        print("No budgets set.")
+                        continue
+                    pretty_print_table([[f"{v}" for v in row] for row in rows], ["category", "limit", "spent", "remaining", "used"])
+                elif choice in ("2", "3"):
+                    category = self._prompt_nonempty("Category: ")
+                    month = self._prompt_month("Only for month (YYYYMM) or Enter for every month: ")
+                    if choice == "2":
+                        amount = parse_amount(self._prompt_amount("Monthly limit (e.g. 300.00): "))
+                        self.budgets.budgets.set_limit(category, amount, month)
+                    elif not self.budgets.budgets.remove_limit(category, month):
+                        print(f"No limit set for {category}.")
+                        continue
+                    self.budgets.budgets.save(self.budgets_path)
+                    print("Budgets saved.")
+                elif choice == "4":
+                    return
+                else:
+                    print("Invalid choice.")
+            except OperationCancelled:
+                print("Cancelled. Returning to Budgets menu.")
+            except (ValidationError, StorageError) as e:
+                print(f"Budget update failed: {e}")
+
     def run(self):
         while True:
             print("\nPersonal Expense Tracker")
@@ -307,7 +478,9 @@ class CLIApp:
             print("3) Edit transaction")
             print("4) Delete transaction")
             print("5) Reports")
-            print("6) Exit")
+            print("6) Import statement")
+            print("7) Budgets")
+            print("8) Exit")
             choice = input("Choose: ").strip()
             if choice == "1":
                 self.add_transaction()
@@ -320,7 +493,11 @@ class CLIApp:
             elif choice == "5":
                 self.reports_menu()
             elif choice == "6":
+                self.import_statement()
+            elif choice == "7":
+                self.budgets_menu()
+            elif choice == "8":
                 print("Have a Good Day.")
                 break
             else:
-                print("Invalid choice. Enter a number 1-6.")
+                print("Invalid choice. Enter a number 1-8.")
@@ -1,8 +1,11 @@
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
-from typing import List
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List
 
+from expense_tracker.config import PAGE_SIZE, TABLE_WIDTH_SAMPLE, MAX_COLUMN_WIDTH
 from expense_tracker.exceptions import ValidationError
+from expense_tracker.instrumentation import count, timed
 
 
 def parse_date_ymd(s: str) -> date:
@@ -14,13 +17,49 @@ def parse_date_ymd(s: str) -> date:
         raise ValidationError(f"invalid date '{s}': expected YYYYMMDD")
 
 
+def parse_date(s: str, fmt: str = "%Y%m%d") -> date:
+    if fmt == "%Y%m%d":
+        return parse_date_ymd(s)
+    if not s:
+        raise ValidationError("date string empty")
+    try:
+        return datetime.strptime(s, fmt).date()
+    except Exception:
+        raise ValidationError(f"invalid date '{s}': expected format {fmt}")
+
+
 def parse_amount(s: str) -> Decimal:
     if not s:
         raise ValidationError("amount string empty")
     try:
-        return Decimal(s)
+        amount = Decimal(s)
     except (InvalidOperation, ValueError):
         raise ValidationError(f"invalid amount '{s}': expected decimal using dot as separator")
+    if not amount.is_finite():
+        raise ValidationError(f"invalid amount '{s}': must be a finite number")
+    return amount
+
+
+def report_invalid_row(error: Exception, what: str = "row") -> None:
+    count(f"rejected.{what.replace(' ', '_')}")
+    print(f"Warning: skipping invalid {what}: {error}")
+
+
+def positional_rows(rows: Iterable[list[str]], fieldnames: list[str], expected: list[str]) -> Iterator[list[str | None]]:
+    # The header is checked once; every row is then yielded with exactly the
+    # expected columns, in order, the same way DictReader would fill them.
+    width = len(expected)
+    if fieldnames == expected:
+        for row in rows:
+            if len(row) == width:
+                yield row
+            elif row:
+                yield (row + [None] * width)[:width]
+        return
+    index = [fieldnames.index(c) if c in fieldnames else None for c in expected]
+    for row in rows:
+        if row:
+            yield [row[i] if i is not None and i < len(row) else None for i in index]
 
 
 def confirm(prompt: str) -> bool:
@@ -28,6 +67,7 @@ def confirm(prompt: str) -> bool:
     return ans in ("y", "yes")
 
 
+@timed("render.table")
 def pretty_print_table(rows: List[list], headers: List[str]) -> None:
     # compute widths
     if not rows:
@@ -41,3 +81,129 @@ def pretty_print_table(rows: List[list], headers: List[str]) -> None:
     print(sep_line)
     for row in rows:
         print(" | ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def _fit(value, width: int) -> str:
+    text = str(value).replace("\n", " ")
+    if len(text) > width:
+        text = text[:max(width - 3, 0)] + "..."
+    return text.ljust(width)
+
+
+class Pager:
+    """Page through a lazily produced table without materializing it.
+
+    Items are pulled from the source only as pages are shown and formatted
+    per page; column widths come from the headers and the first
+    `width_sample` rows, capped at `max_width`.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Any],
+        headers: List[str],
+        format_row: Callable[[int, Any], list],
+        page_size: int = PAGE_SIZE,
+        width_sample: int = TABLE_WIDTH_SAMPLE,
+        max_width: int = MAX_COLUMN_WIDTH,
+    ):
+        self.headers = headers
+        self.format_row = format_row
+        self.page_size = max(1, page_size)
+        self.width_sample = width_sample
+        self.max_width = max_width
+        self.page = 0
+        self._source = iter(items)
+        self._items: list = []
+        self._exhausted = False
+        self._widths: list[int] | None = None
+
+    def _fill(self, n: int) -> None:
+        if not self._exhausted and len(self._items) < n:
+            self._items.extend(islice(self._source, n - len(self._items)))
+            self._exhausted = len(self._items) < n
+
+    def item(self, number: int) -> Any:
+        # 1-based, the way rows are numbered on screen; None when out of range
+        if number < 1:
+            return None
+        self._fill(number)
+        return self._items[number - 1] if number <= len(self._items) else None
+
+    def is_empty(self) -> bool:
+        self._fill(1)
+        return not self._items
+
+    def page_count(self) -> int | None:
+        # None until the source has been read to the end
+        if not self._exhausted:
+            return None
+        return max(1, -(-len(self._items) // self.page_size))
+
+    def _has_page(self, page: int) -> bool:
+        if page < 0:
+            return False
+        self._fill(page * self.page_size + 1)
+        return page == 0 or len(self._items) > page * self.page_size
+
+    def _column_widths(self) -> list[int]:
+        if self._widths is None:
+            self._fill(self.width_sample)
+            widths = [len(str(h)) for h in self.headers]
+            for i, item in enumerate(self._items[:self.width_sample]):
+                for c, cell in enumerate(self.format_row(i + 1, item)):
+                    widths[c] = max(widths[c], len(str(cell)))
+            self._widths = [min(w, max(self.max_width, len(str(h)))) for w, h in zip(widths, self.headers)]
+        return self._widths
+
+    @timed("render.page")
+    def render(self) -> None:
+        if self.is_empty():
+            print("No rows.")
+            return
+        widths = self._column_widths()
+        first = self.page * self.page_size
+        self._fill(first + self.page_size + 1)
+        print(" | ".join(_fit(h, w) for h, w in zip(self.headers, widths)))
+        print("-+-".join("-" * w for w in widths))
+        for i, item in enumerate(self._items[first:first + self.page_size], start=first + 1):
+            print(" | ".join(_fit(c, w) for c, w in zip(self.format_row(i, item), widths)))
+        if self.single_page():
+            return
+        total = self.page_count()
+        print(f"Page {self.page + 1} of {total if total is not None else 'many'}")
+
+    def single_page(self) -> bool:
+        return not self._has_page(1)
+
+    def navigate(self, command: str) -> bool:
+        """Handle n(ext), p(rev) and g(o) N; returns False if `command` is not one of them."""
+        parts = command.strip().lower().split()
+        if not parts or parts[0] not in ("n", "next", "p", "prev", "g", "go"):
+            return False
+        if parts[0] in ("n", "next"):
+            target = self.page + 1
+        elif parts[0] in ("p", "prev"):
+            target = self.page - 1
+        else:
+            try:
+                target = int(parts[1]) - 1 if len(parts) == 2 else -1
+            except ValueError:
+                target = -1
+        if self._has_page(target):
+            self.page = target
+            self.render()
+        else:
+            print("No such page.")
+        return True
+
+    def browse(self, prompt: str = "[n]ext, [p]rev, [g]o N, Enter to finish: ") -> None:
+        self.render()
+        if self.single_page():
+            return
+        while True:
+            command = input(prompt).strip()
+            if not command or command.lower() in ("q", "quit", "cancel"):
+                return
+            if not self.navigate(command):
+                print("Unknown command.")
@@ -0,0 +1,8 @@
+from datetime import date
+from decimal import Decimal
+
+from expense_tracker.models.transaction import Transaction
+
+
+def make_tx(n: int, day: date = date(2024, 1, 15), amount: str = "10.00", category: str = "Food", description: str = "", currency: str | None = None) -> Transaction:
+    return Transaction(f"tx{n}", day, Decimal(amount), category, description or f"item {n}", currency)
@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return tmp_path / "transactions.csv"
@@ -0,0 +1,35 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from expense_tracker.exceptions import ValidationError
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.storage import SqliteStorageManager, StorageManager
+from expense_tracker.utils import parse_amount
+from tests import make_tx
+
+NON_FINITE = ["NaN", "-nan", "sNaN", "Infinity", "-inf"]
+
+
+@pytest.mark.parametrize("amount", NON_FINITE)
+def test_non_finite_input_is_rejected(amount):
+    with pytest.raises(ValidationError):
+        Transaction.from_input("20240101", amount, "Food")
+    with pytest.raises(ValidationError):
+        parse_amount(amount)
+
+
+def test_non_finite_csv_rows_are_skipped(ledger):
+    StorageManager(ledger).save([make_tx(1)])
+    with ledger.open("ab") as fh:
+        fh.write(b"tx2,20240115,NaN,Food,x\ntx3,20240115,-Infinity,Food,y\n")
+    assert [tx.id for tx in StorageManager(ledger).load()] == ["tx1"]
+
+
+def test_sqlite_refuses_a_non_finite_amount(tmp_path):
+    store = SqliteStorageManager(tmp_path / "transactions.db")
+    with pytest.raises(ValidationError):
+        store.append(Transaction("tx1", date(2024, 1, 1), Decimal("NaN"), "Food"))
+    assert store.load() == []
+    store.close()
@@ -0,0 +1,74 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from expense_tracker.budgets import BudgetMonitor, Budgets
+from expense_tracker.storage import StorageManager
+from tests import make_tx
+
+
+@pytest.fixture
+def rates(tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,from,to,rate\n20240101,EUR,USD,1.10\n", encoding="utf-8")
+    return path
+
+
+def monitored(ledger, rates, budgets: Budgets, **options):
+    store = StorageManager(ledger, **options)
+    store.save([])
+    alerts = []
+    BudgetMonitor(store, budgets, notify=alerts.append, rates_path=rates)
+    return store, alerts
+
+
+@pytest.mark.parametrize("options", [{}, {"journaled": True, "rollups": True}])
+def test_alerts_fire_when_a_level_is_crossed(ledger, rates, options):
+    store, alerts = monitored(ledger, rates, Budgets(limits={"Food": Decimal("100")}), **options)
+    store.append(make_tx(1, amount="70.00"))
+    assert alerts == []
+    store.append(make_tx(2, amount="15.00"))
+    assert [(a.category, a.percent) for a in alerts] == [("Food", 80)]
+    store.append(make_tx(3, amount="50.00", category="Transport"))
+    store.append(make_tx(4, amount="1.00"))
+    assert len(alerts) == 1
+    store.update(make_tx(2, amount="40.00"))
+    assert [a.percent for a in alerts] == [80, 100]
+    assert alerts[-1].total == Decimal("111.00")
+
+
+def test_falling_back_below_a_level_rearms_it(ledger, rates):
+    store, alerts = monitored(ledger, rates, Budgets(limits={"Food": Decimal("100")}))
+    store.append(make_tx(1, amount="85.00"))
+    store.delete("tx1")
+    store.append(make_tx(2, amount="90.00"))
+    assert [a.percent for a in alerts] == [80, 80]
+
+
+def test_month_override_and_other_months(ledger, rates):
+    budgets = Budgets(limits={"Food": Decimal("100")}, months={"202402": {"Food": Decimal("20")}})
+    store, alerts = monitored(ledger, rates, budgets)
+    store.append(make_tx(1, date(2024, 2, 3), "20.00"))
+    store.append(make_tx(2, date(2024, 3, 3), "20.00"))
+    assert [(a.month, a.percent) for a in alerts] == [("202402", 80), ("202402", 100)]
+
+
+def test_a_restart_reads_the_persisted_totals(ledger, rates):
+    budgets = Budgets(limits={"Food": Decimal("100")})
+    store, alerts = monitored(ledger, rates, budgets, journaled=True)
+    assert store.rollups
+    store.append(make_tx(1, amount="70.00"))
+    restarted = StorageManager(ledger, journaled=True)
+    BudgetMonitor(restarted, budgets, notify=alerts.append, rates_path=rates)
+    restarted.append(make_tx(2, amount="15.00"))
+    assert [a.percent for a in alerts] == [80]
+    # the totals came from the sidecar; the ledger itself was never parsed
+    assert restarted.cache_stats["misses"] == 0
+
+
+def test_foreign_amounts_count_converted(ledger, rates):
+    store, alerts = monitored(ledger, rates, Budgets(limits={"Food": Decimal("100")}))
+    store.append(make_tx(1, amount="75.00", currency="EUR"))
+    assert [a.percent for a in alerts] == [80]
+    assert alerts[0].total == Decimal("82.50")
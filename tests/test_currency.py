@@ -0,0 +1,75 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from expense_tracker.exceptions import ValidationError
+from expense_tracker.reporting import ReportGenerator
+from expense_tracker.reporting.currency import RateTable
+from expense_tracker.storage import StorageManager
+from tests import make_tx
+
+RATES = "date,from,to,rate\n20240101,EUR,USD,1.10\n20240201,EUR,USD,1.20\n"
+
+
+@pytest.fixture
+def rates(tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text(RATES, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def store(ledger):
+    store = StorageManager(ledger, rollups=True)
+    store.save([
+        make_tx(1, date(2024, 1, 5), "10.00"),
+        make_tx(2, date(2024, 1, 15), "10.00", currency="EUR"),
+        make_tx(3, date(2024, 2, 10), "5.00", "Transport", currency="EUR"),
+        make_tx(4, date(2024, 2, 11), "2.50", "Transport"),
+    ])
+    return store
+
+
+def test_bad_rate_rows_are_skipped(tmp_path, capsys):
+    path = tmp_path / "rates.csv"
+    path.write_text(RATES + "20240301,EUR,USD,0\n20240401,EUR,USD,-1.5\n20240501,GBP,USD,1.25\n", encoding="utf-8")
+    table = RateTable.load(path)
+    assert table.convert(Decimal("10"), date(2024, 4, 15), "EUR", "USD") == Decimal("12.0")
+    assert table.convert(Decimal("10"), date(2024, 5, 1), "GBP", "USD") == Decimal("12.5")
+    assert capsys.readouterr().out.count("skipping invalid rate") == 2
+
+
+def test_rate_in_force_on_the_day():
+    table = RateTable([(date(2024, 1, 1), "EUR", "USD", Decimal("1.10")), (date(2024, 2, 1), "EUR", "USD", Decimal("1.20"))])
+    assert table.convert(Decimal("10"), date(2024, 1, 31), "EUR", "USD") == Decimal("11.0")
+    assert table.convert(Decimal("10"), date(2024, 2, 1), "EUR", "USD") == Decimal("12.0")
+    assert table.convert(Decimal("10"), date(2023, 1, 1), "USD", "USD") == Decimal("10")
+    with pytest.raises(ValidationError):
+        table.convert(Decimal("10"), date(2023, 12, 31), "EUR", "USD")
+
+
+@pytest.mark.parametrize("source", ["list", "table", "rollup", "stream"])
+def test_totals_convert_foreign_amounts(store, rates, source):
+    reports = ReportGenerator(rates_path=rates)
+    data = {"list": store.load, "table": store.load_table, "rollup": store.rollup, "stream": store.iter_transactions}[source]
+    assert reports.aggregate_by_month(data()) == {"202401": Decimal("21.00"), "202402": Decimal("8.50")}
+    assert reports.aggregate_by_category(data()) == {"Food": Decimal("21.00"), "Transport": Decimal("8.50")}
+
+
+def test_totals_refuse_another_target_currency(store, rates):
+    with pytest.raises(ValidationError):
+        ReportGenerator("EUR", rates).aggregate_by_month(store.load())
+
+
+def test_missing_rate_is_an_error(ledger, rates):
+    StorageManager(ledger).save([make_tx(1, date(2023, 12, 31), "1.00", currency="EUR")])
+    with pytest.raises(ValidationError):
+        ReportGenerator(rates_path=rates).aggregate_by_month(StorageManager(ledger).load())
+
+
+def test_currency_survives_a_round_trip(ledger):
+    StorageManager(ledger).save([make_tx(1), make_tx(2, currency="eur")])
+    reopened = StorageManager(ledger)
+    assert reopened.get("tx1").currency is None
+    assert reopened.get("tx2").currency == "EUR"
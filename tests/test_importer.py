@@ -0,0 +1,23 @@
+from expense_tracker.importer import import_statement
+from expense_tracker.storage import StorageManager
+
+STATEMENT = (
+    "date,amount,category,description\n"
+    "20240101,1.00,Food,ok\n"
+    "\n"
+    "bad,1.00,Food,x\n"
+    '20240102,2.00,Food,"two\n'
+    'lines"\n'
+    "20240103,oops,Food,y\n"
+    "20240101,1.00,Food,ok\n"
+)
+
+
+def test_import_reports_source_lines(ledger, tmp_path):
+    source = tmp_path / "statement.csv"
+    source.write_text(STATEMENT, encoding="utf-8")
+    store = StorageManager(ledger)
+    result = import_statement(store, source, batch_size=2)
+    assert (result.accepted, result.rejected, result.duplicates) == (2, 2, 1)
+    assert [e.split(":")[0] for e in result.errors] == ["line 4", "line 7"]
+    assert sorted(tx.description for tx in StorageManager(ledger).load()) == ["ok", "two\nlines"]
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from expense_tracker.storage import StorageManager
+from tests import make_tx
+
+
+def ids(store) -> list[str]:
+    return sorted(tx.id for tx in store.load())
+
+
+def test_journal_replays_on_open_and_compacts(ledger):
+    store = StorageManager(ledger, journaled=True)
+    store.save([make_tx(1), make_tx(2)])
+    store.append(make_tx(3))
+    store.update(make_tx(1, amount="12.50"))
+    store.delete("tx2")
+    assert store.journal_path.exists()
+    # the CSV still holds the saved rows; a fresh reader replays the journal over them
+    reopened = StorageManager(ledger)
+    assert ids(reopened) == ["tx1", "tx3"]
+    assert reopened.get("tx1").amount == Decimal("12.50")
+
+    store.compact()
+    assert not store.journal_path.exists()
+    assert ids(StorageManager(ledger)) == ["tx1", "tx3"]
+    assert StorageManager(ledger).get("tx1").amount == Decimal("12.50")
+
+
+def test_journal_compacts_at_threshold(ledger):
+    store = StorageManager(ledger, journaled=True, compact_threshold=3)
+    # records are counted as they are applied to the loaded ledger
+    store.load()
+    for n in range(3):
+        store.append(make_tx(n))
+    store.close()
+    assert not store.journal_path.exists()
+    assert ids(StorageManager(ledger)) == ["tx0", "tx1", "tx2"]
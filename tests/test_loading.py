@@ -0,0 +1,47 @@
+from datetime import date
+from decimal import Decimal
+
+from expense_tracker.models.transaction import Transaction
+from expense_tracker.storage import StorageManager
+from tests import make_tx
+
+HEADER = b"id,date,amount,category,description\n"
+
+
+def test_last_record_without_newline_is_loaded(ledger):
+    ledger.write_bytes(HEADER + b"a,20240101,1.00,Food,x\nb,20240102,2.00,Food,y")
+    store = StorageManager(ledger)
+    assert sorted(tx.id for tx in store.load()) == ["a", "b"]
+    store.append(make_tx(3))
+    assert sorted(tx.id for tx in StorageManager(ledger).load()) == ["a", "b", "tx3"]
+
+
+def test_edit_of_a_file_without_final_newline_keeps_every_record(ledger):
+    ledger.write_bytes(HEADER + b"a,20240101,1.00,Food,x\nb,20240102,2.00,Food,y")
+    store = StorageManager(ledger)
+    store.update(Transaction("a", date(2024, 1, 1), Decimal("1.00"), "Food", "a much longer description"))
+    reopened = StorageManager(ledger)
+    assert sorted(tx.id for tx in reopened.load()) == ["a", "b"]
+    assert reopened.get("b").amount == Decimal("2.00")
+
+
+def test_record_still_being_written_waits_for_its_newline(ledger):
+    StorageManager(ledger).save([make_tx(1)])
+    store = StorageManager(ledger)
+    store.load()
+    with ledger.open("ab") as fh:
+        fh.write(b"tx2,20240115,2.0")
+    assert [tx.id for tx in store.load()] == ["tx1"]
+    with ledger.open("ab") as fh:
+        fh.write(b"0,Food,late\n")
+    assert store.get("tx2").amount == Decimal("2.00")
+    assert store.cache_stats["partial"] == 2
+
+
+def test_growth_after_an_unterminated_record_reloads_it(ledger):
+    ledger.write_bytes(HEADER + b"a,20240101,1.00,Food,x")
+    store = StorageManager(ledger)
+    assert store.get("a").description == "x"
+    with ledger.open("ab") as fh:
+        fh.write(b"yz\n")
+    assert store.get("a").description == "xyz"
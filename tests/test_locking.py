@@ -0,0 +1,100 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from expense_tracker.exceptions import ConflictError, StorageError
+from expense_tracker.storage import StorageManager
+from expense_tracker.storage import locking
+from expense_tracker.storage.locking import FileLock
+from tests import make_tx
+
+WRITE_MODES = [{}, {"journaled": True}, {"group_commit": True}, {"journaled": True, "group_commit": True}]
+
+
+def ids(store) -> list[str]:
+    return sorted(tx.id for tx in store.load())
+
+
+@pytest.mark.parametrize("options", WRITE_MODES)
+def test_unknown_id_is_an_error(ledger, options):
+    store = StorageManager(ledger, **options)
+    store.save([make_tx(1)])
+    with pytest.raises(StorageError):
+        store.update(make_tx(99))
+    with pytest.raises(StorageError):
+        store.delete("tx99")
+    assert ids(StorageManager(ledger)) == ["tx1"]
+
+
+@pytest.mark.skipif(locking.fcntl is None, reason="advisory locks need fcntl")
+def test_file_lock_is_reentrant(tmp_path):
+    path = tmp_path / "ledger.lock"
+    lock = FileLock(path)
+    other = FileLock(path, timeout=0.05)
+    lock.acquire()
+    lock.acquire()
+    lock.release()
+    # still held once: a second holder times out
+    with pytest.raises(StorageError):
+        other.acquire()
+    lock.release()
+    other.acquire()
+    other.release()
+
+
+def test_nested_writes_take_the_lock_once(ledger):
+    # extend() saves under the lock it already holds
+    store = StorageManager(ledger)
+    store.extend([make_tx(1), make_tx(2)])
+    assert ids(StorageManager(ledger)) == ["tx1", "tx2"]
+
+
+def test_group_commit_rejects_stale_edits(ledger):
+    store = StorageManager(ledger, group_commit=True)
+    original = make_tx(1)
+    store.save([original])
+    barrier = threading.Barrier(2)
+    conflicts = []
+
+    def edit(amount: str):
+        barrier.wait()
+        try:
+            store.update(make_tx(1, amount=amount), expected=original)
+        except ConflictError as e:
+            conflicts.append(e)
+
+    threads = [threading.Thread(target=edit, args=(amount,)) for amount in ("11.00", "12.00")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(conflicts) == 1
+    assert StorageManager(ledger).get("tx1").amount in (Decimal("11.00"), Decimal("12.00"))
+
+
+def test_save_refuses_a_stale_version(ledger):
+    store = StorageManager(ledger)
+    store.save([make_tx(1)])
+    version = store.version()
+    StorageManager(ledger).append(make_tx(2))
+    with pytest.raises(ConflictError):
+        store.save([make_tx(3)], expected_version=version)
+    assert ids(StorageManager(ledger)) == ["tx1", "tx2"]
+
+
+def test_two_stores_interleave_edits_and_appends(ledger):
+    first, second = StorageManager(ledger), StorageManager(ledger)
+    first.save([make_tx(n) for n in range(4)])
+    expected = {tx.id: tx for tx in first.load()}
+    for n in range(12):
+        editor, appender = (first, second) if n % 2 == 0 else (second, first)
+        # every third edit outgrows its record and moves it to the end of the file
+        edited = make_tx(n % 4, amount=f"{n + 20}.00", description="x" * (n % 3 * 40))
+        editor.update(edited)
+        expected[edited.id] = edited
+        appended = make_tx(100 + n)
+        appender.append(appended)
+        expected[appended.id] = appended
+        for store in (first, second, StorageManager(ledger)):
+            assert {tx.id: tx for tx in store.load()} == expected
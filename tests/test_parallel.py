@@ -0,0 +1,32 @@
+import csv
+import io
+
+import pytest
+
+from expense_tracker.storage import StorageManager
+from expense_tracker.storage.parallel import chunk_ranges, read_header
+from tests import make_tx
+
+
+@pytest.fixture
+def quoted_ledger(ledger):
+    # descriptions with quotes, commas and newlines, so split points can land inside a field
+    descriptions = ['multi\nline', 'say "hi",\nthen\nleave', "plain", '""', 'a,"b"\n']
+    StorageManager(ledger).save([make_tx(n, description=descriptions[n % len(descriptions)] + str(n)) for n in range(300)])
+    return ledger
+
+
+@pytest.mark.parametrize("parts", [2, 3, 7, 16, 64])
+def test_chunks_end_on_record_boundaries(quoted_ledger, parts):
+    fieldnames, start = read_header(quoted_ledger)
+    data = quoted_ledger.read_bytes()
+    ranges = chunk_ranges(quoted_ledger, parts, start)
+    assert ranges[0][0] == start and ranges[-1][1] == len(data)
+    assert all(hi == lo for (_, hi), (lo, _) in zip(ranges, ranges[1:]))
+    rows = []
+    for lo, hi in ranges:
+        chunk = data[lo:hi]
+        assert chunk.count(b'"') % 2 == 0
+        rows.extend(csv.reader(io.StringIO(chunk.decode("utf-8"), newline="")))
+    expected = list(csv.reader(io.StringIO(data[start:].decode("utf-8"), newline="")))
+    assert rows == expected
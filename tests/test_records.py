@@ -0,0 +1,80 @@
+import os
+from decimal import Decimal
+
+from expense_tracker.config import RECORD_PAGE_BYTES, RECORD_PADDING_LIMIT
+from expense_tracker.storage import StorageManager
+from expense_tracker.storage.records import scan_records
+from tests import make_tx
+
+
+def ids(store) -> list[str]:
+    return sorted(tx.id for tx in store.load())
+
+
+def test_edits_patch_the_record_in_place(ledger):
+    store = StorageManager(ledger)
+    store.save([make_tx(n) for n in range(10)])
+    inode = os.stat(ledger).st_ino
+    store.update(make_tx(3, amount="99.99"))
+    store.update(make_tx(4, description="a much longer description than before"))
+    store.delete("tx5")
+    assert os.stat(ledger).st_ino == inode
+    reopened = StorageManager(ledger)
+    assert ids(reopened) == [f"tx{n}" for n in range(10) if n != 5]
+    assert reopened.get("tx3").amount == Decimal("99.99")
+    assert reopened.get("tx4").description == "a much longer description than before"
+
+
+def test_padding_is_compacted_past_the_limit(ledger):
+    store = StorageManager(ledger)
+    store.save([make_tx(n) for n in range(20)])
+    for n in range(15):
+        store.delete(f"tx{n}")
+        _, _, padding = scan_records(ledger)
+        assert padding <= RECORD_PADDING_LIMIT * ledger.stat().st_size
+    assert ids(StorageManager(ledger)) == [f"tx{n}" for n in range(15, 20)]
+
+
+def test_record_across_a_page_is_rewritten(ledger):
+    store = StorageManager(ledger)
+    store.save([make_tx(n) for n in range(200)])
+    spans, _, _ = scan_records(ledger)
+    tx_id = next(i for i, (_, offset, length) in spans.items() if offset // RECORD_PAGE_BYTES != (offset + length - 1) // RECORD_PAGE_BYTES)
+    inode = os.stat(ledger).st_ino
+    store.delete(tx_id)
+    assert os.stat(ledger).st_ino != inode
+    assert StorageManager(ledger).get(tx_id) is None
+
+
+def test_later_copy_of_a_record_wins(ledger):
+    # what a crash between appending a moved record and blanking the old one leaves
+    StorageManager(ledger).save([make_tx(1), make_tx(2)])
+    with ledger.open("ab") as fh:
+        fh.write(b"tx1,20240116,15.00,Food,moved\n")
+    store = StorageManager(ledger)
+    assert store.get("tx1").amount == Decimal("15.00")
+    store.update(make_tx(1, amount="16.00"))
+    assert ledger.read_bytes().count(b"tx1,") == 1
+    assert StorageManager(ledger).get("tx1").amount == Decimal("16.00")
+
+
+def test_other_stores_see_a_patch_followed_by_an_append(ledger):
+    StorageManager(ledger).save([make_tx(1, amount="13.95"), make_tx(2)])
+    reader, writer = StorageManager(ledger), StorageManager(ledger)
+    assert reader.get("tx1").amount == Decimal("13.95")
+    # same length, so it is patched in place; then tx2 grows and moves to the end
+    writer.update(make_tx(1, amount="14.95"))
+    writer.update(make_tx(2, description="a description long enough to move the record"))
+    assert reader.get("tx1").amount == Decimal("14.95")
+    assert reader.get("tx2").description == "a description long enough to move the record"
+    assert StorageManager(ledger).get("tx1").amount == Decimal("14.95")
+
+
+def test_appends_alone_are_still_read_incrementally(ledger):
+    store = StorageManager(ledger)
+    store.save([make_tx(1)])
+    store.update(make_tx(1, amount="11.00"))
+    with ledger.open("ab") as fh:
+        fh.write(b"tx2,20240115,2.00,Food,late\n")
+    assert ids(store) == ["tx1", "tx2"]
+    assert store.cache_stats["partial"] == 1
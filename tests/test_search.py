@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+import pytest
+
+from expense_tracker.storage import StorageManager
+from expense_tracker.storage.search import matches, parse_query
+from tests import make_tx
+
+DESCRIPTIONS = ["Costa coffee", "Pret flat white", "Local market fruits & veg", "Tesco Metro shop", "Bus day rover", "Café crème", "Coffee beans (market)", ""]
+CATEGORIES = ["Food", "Groceries", "Transport", "Coffee"]
+QUERIES = ["coffee", "COF", "cof*", "market fruit", "flat whi*", "food", "crème", "bus rover", "ee", "nothing", "e*", "(market)"]
+
+
+def linear(txs, query: str) -> list[str]:
+    terms = parse_query(query)
+    return sorted(tx.id for tx in txs if matches(tx, terms))
+
+
+def found(store, query: str) -> list[str]:
+    return sorted(tx.id for tx in store.search(query))
+
+
+@pytest.fixture
+def transactions():
+    return [
+        make_tx(n, date(2024, 1, 1) + timedelta(days=n % 60), category=CATEGORIES[n % len(CATEGORIES)], description=DESCRIPTIONS[n % len(DESCRIPTIONS)] or " ")
+        for n in range(120)
+    ]
+
+
+def test_index_matches_linear_scan(ledger, transactions):
+    StorageManager(ledger).save(transactions)
+    store = StorageManager(ledger, search_index=True)
+    for query in QUERIES:
+        assert found(store, query) == linear(transactions, query), query
+
+
+def test_index_follows_writes_and_reopens(ledger, transactions):
+    store = StorageManager(ledger, search_index=True)
+    store.save(transactions)
+    store.search("coffee")
+    store.update(make_tx(1, description="Espresso at the market"))
+    store.delete("tx2")
+    store.append(make_tx(500, category="Books", description="Coffee table book"))
+    store.close()
+    current = StorageManager(ledger).load()
+    for reopened in (store, StorageManager(ledger, search_index=True)):
+        for query in QUERIES + ["espresso", "book*"]:
+            assert found(reopened, query) == linear(current, query), query
+
+
+def test_search_with_filters(ledger, transactions):
+    StorageManager(ledger).save(transactions)
+    store = StorageManager(ledger, search_index=True)
+    start, end = date(2024, 1, 10), date(2024, 1, 20)
+    expected = sorted(tx.id for tx in transactions if start <= tx.date <= end and tx.category == "Food" and matches(tx, parse_query("coffee")))
+    assert sorted(tx.id for tx in store.search("coffee", start, end, "Food")) == expected
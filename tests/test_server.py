@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+import pytest
+
+from expense_tracker.exceptions import ConflictError
+from expense_tracker.server import ApiServer
+from expense_tracker.storage import PartitionedStorageManager, SqliteStorageManager, StorageManager
+from tests import make_tx
+
+STORES = {
+    "csv": lambda tmp_path: StorageManager(tmp_path / "transactions.csv"),
+    "journaled": lambda tmp_path: StorageManager(tmp_path / "transactions.csv", journaled=True),
+    "group-commit": lambda tmp_path: StorageManager(tmp_path / "transactions.csv", group_commit=True),
+    "sqlite": lambda tmp_path: SqliteStorageManager(tmp_path / "transactions.db"),
+    "partitioned": lambda tmp_path: PartitionedStorageManager(tmp_path / "transactions"),
+}
+
+
+@pytest.fixture(params=STORES)
+def store(request, tmp_path):
+    store = STORES[request.param](tmp_path)
+    yield store
+    store.close()
+
+
+def test_unique_append_refuses_an_existing_id(store):
+    store.append(make_tx(1))
+    with pytest.raises(ConflictError):
+        store.append(make_tx(1, amount="2.00"), unique=True)
+    assert [(tx.id, str(tx.amount)) for tx in store.load()] == [("tx1", "10.00")]
+
+
+def test_concurrent_unique_appends_add_one_record(store):
+    barrier = threading.Barrier(4)
+    conflicts = []
+
+    def add(n: int):
+        barrier.wait()
+        try:
+            store.append(make_tx(1, amount=f"{n}.00"), unique=True)
+        except ConflictError as e:
+            conflicts.append(e)
+
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(conflicts) == 3
+    assert [tx.id for tx in store.load()] == ["tx1"]
+
+
+def test_post_with_a_taken_id_is_a_conflict(tmp_path):
+    server = ApiServer(StorageManager(tmp_path / "transactions.csv", group_commit=True))
+    body = b'{"id": "tx1", "date": "20240115", "amount": "10.00", "category": "Food"}'
+
+    async def post_twice():
+        return await asyncio.gather(*(server.dispatch("POST", "/transactions", body) for _ in range(2)))
+
+    statuses = sorted(status for status, _ in asyncio.run(post_twice()))
+    assert [int(s) for s in statuses] == [201, 409]
+    assert [tx.id for tx in server.store.load()] == ["tx1"]
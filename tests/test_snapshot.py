@@ -0,0 +1,26 @@
+import os
+from decimal import Decimal
+
+from expense_tracker.config import SNAPSHOT_SUFFIX
+from expense_tracker.storage import StorageManager
+from tests import make_tx
+
+
+def ids(store) -> list[str]:
+    return sorted(tx.id for tx in store.load())
+
+
+def test_snapshot_is_dropped_when_the_csv_grows(ledger):
+    StorageManager(ledger, snapshot=True).save([make_tx(1), make_tx(2)])
+    assert ledger.with_name(ledger.name + SNAPSHOT_SUFFIX).exists()
+    StorageManager(ledger).append(make_tx(3))
+    assert ids(StorageManager(ledger, snapshot=True)) == ["tx1", "tx2", "tx3"]
+
+
+def test_snapshot_is_dropped_when_the_csv_changes_in_place(ledger):
+    StorageManager(ledger, snapshot=True).save([make_tx(1, amount="10.00")])
+    st = os.stat(ledger)
+    ledger.write_bytes(ledger.read_bytes().replace(b"10.00", b"20.00"))
+    # same size; a later mtime sends the open to the checksum
+    os.utime(ledger, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert StorageManager(ledger, snapshot=True).get("tx1").amount == Decimal("20.00")